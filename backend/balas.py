@@ -0,0 +1,167 @@
+# backend/balas.py
+# Balas en estructura de arreglos: posición, dirección, casilla, propietario y
+# marca de viva viven en listas paralelas indexadas por ranura. Disparar toma
+# una ranura de la lista libre en vez de crear un objeto, y avanzar() integra
+# todas en una sola pasada guardando la posición anterior. resolver_impactos()
+# recorre después, casilla a casilla, el tramo barrido en el paso (colisión
+# continua), así que una bala rápida o un dt grande no atraviesan nada.
+# Se usan listas y no array.array: leer un elemento de un array crea un objeto
+# nuevo cada vez y en este bucle eso lo hacía más lento que los modelos.
+from constantes import TILE_SIZE
+from backend.colisiones import rectangulos_se_solapan, casillas_recorridas
+
+CAPACIDAD_INICIAL_BALAS = 128
+
+
+class PoolBalas:
+    def __init__(self, capacidad=CAPACIDAD_INICIAL_BALAS):
+        self.capacidad = 0
+        self.x = []
+        self.y = []
+        self.x_anterior = []
+        self.y_anterior = []
+        self.dx = []
+        self.dy = []
+        self.tile_x = []
+        self.tile_y = []
+        self.ids = []
+        self.propietario = []
+        self.tipo_propietario = []
+        self.viva = bytearray()
+        self.libres = []
+        # Ranuras en orden de disparo; las muertas se limpian en compactar()
+        self.activas = []
+        self.vivas = 0
+        self._crecer(capacidad)
+
+    def __len__(self):
+        return self.vivas
+
+    def _crecer(self, extra):
+        inicio = self.capacidad
+        self.capacidad += extra
+        self.x.extend([0.0] * extra)
+        self.y.extend([0.0] * extra)
+        self.x_anterior.extend([0.0] * extra)
+        self.y_anterior.extend([0.0] * extra)
+        self.dx.extend([0] * extra)
+        self.dy.extend([0] * extra)
+        self.tile_x.extend([0] * extra)
+        self.tile_y.extend([0] * extra)
+        self.ids.extend([0] * extra)
+        self.propietario.extend([None] * extra)
+        self.tipo_propietario.extend([None] * extra)
+        self.viva.extend(bytes(extra))
+        # Se apilan al revés para reutilizar primero las ranuras más bajas
+        self.libres.extend(range(self.capacidad - 1, inicio - 1, -1))
+
+    def vaciar(self):
+        for slot in self.activas:
+            self.viva[slot] = 0
+            self.propietario[slot] = None
+        self.activas = []
+        self.libres = list(range(self.capacidad - 1, -1, -1))
+        self.vivas = 0
+
+    def crear(self, pixel_x, pixel_y, direccion, propietario_id, tipo_propietario, id_bala):
+        # id_bala sale del mismo AsignadorIds que los modelos para que la vista no los confunda
+        if not self.libres: self._crecer(self.capacidad or CAPACIDAD_INICIAL_BALAS)
+        slot = self.libres.pop()
+        self.x[slot] = self.x_anterior[slot] = pixel_x
+        self.y[slot] = self.y_anterior[slot] = pixel_y
+        self.dx[slot] = direccion[0]
+        self.dy[slot] = direccion[1]
+        self.tile_x[slot] = int(pixel_x / TILE_SIZE)
+        self.tile_y[slot] = int(pixel_y / TILE_SIZE)
+        self.ids[slot] = id_bala
+        self.propietario[slot] = propietario_id
+        self.tipo_propietario[slot] = tipo_propietario
+        self.viva[slot] = 1
+        self.activas.append(slot)
+        self.vivas += 1
+        return slot
+
+    def liberar(self, slot):
+        # La ranura vuelve a la lista libre en compactar(), así una bala creada
+        # antes de compactar no puede aparecer dos veces en activas
+        if self.viva[slot]:
+            self.viva[slot] = 0
+            self.vivas -= 1
+
+    def compactar(self):
+        muertas = [slot for slot in self.activas if not self.viva[slot]]
+        if muertas:
+            for slot in muertas:
+                self.propietario[slot] = None
+            self.activas = [slot for slot in self.activas if self.viva[slot]]
+            self.libres.extend(muertas)
+        return len(muertas)
+
+    def avanzar(self, distancia_px):
+        # Integra todas las balas vivas; los impactos y la salida del mapa se
+        # resuelven después en resolver_impactos()
+        x, y, dx, dy = self.x, self.y, self.dx, self.dy
+        x_anterior, y_anterior, viva = self.x_anterior, self.y_anterior, self.viva
+        for slot in self.activas:
+            if not viva[slot]: continue
+            x_anterior[slot] = x[slot]
+            y_anterior[slot] = y[slot]
+            x[slot] += dx[slot] * distancia_px
+            y[slot] += dy[slot] * distancia_px
+
+    def resolver_impactos(self, ocupacion, objetos, lado_bala):
+        # Recorre en orden las casillas que cruza la esquina de cada bala entre
+        # (x_anterior, y_anterior) y (x, y). El primer muro o borde la libera; el
+        # primer objeto cuyo rectángulo toca el barrido de la bala se devuelve como
+        # impacto [(slot, objeto)] para que el motor aplique el daño.
+        impactos = []
+        tam = TILE_SIZE
+        x, y, x_anterior, y_anterior = self.x, self.y, self.x_anterior, self.y_anterior
+        tile_x, tile_y, viva, propietario = self.tile_x, self.tile_y, self.viva, self.propietario
+        ancho, alto = ocupacion.ancho, ocupacion.alto
+        muros, ids_por_celda = ocupacion.muros, ocupacion.ids_por_celda
+        for slot in self.activas:
+            if not viva[slot]: continue
+            x1, y1 = x[slot], y[slot]
+            fin_x, fin_y = int(x1 // tam), int(y1 // tam)
+            if fin_x == tile_x[slot] and fin_y == tile_y[slot] and 0 <= fin_x < ancho and 0 <= fin_y < alto:
+                # Caso habitual: sigue en la casilla del paso anterior; si está vacía
+                # no hay nada que mirar. Una bala que nace fuera del mapa (tanque en
+                # el borde disparando hacia fuera) va por el camino general y se libera
+                indice = fin_y * ancho + fin_x
+                if not muros[indice] and not ids_por_celda[indice]: continue
+                casillas = ((fin_x, fin_y),)
+            else:
+                casillas = casillas_recorridas(x_anterior[slot], y_anterior[slot], x1, y1, tam)
+            impacto = None
+            for casilla_x, casilla_y in casillas:
+                if not (0 <= casilla_x < ancho and 0 <= casilla_y < alto):
+                    impacto = False
+                    break
+                indice = casilla_y * ancho + casilla_x
+                if muros[indice]:
+                    impacto = False
+                    break
+                ids = ids_por_celda[indice]
+                if not ids: continue
+                # Rectángulo barrido por la bala en el paso (se mueve en un solo eje)
+                x0, y0 = x_anterior[slot], y_anterior[slot]
+                barrido_x, barrido_y = min(x0, x1), min(y0, y1)
+                barrido_ancho, barrido_alto = abs(x1 - x0) + lado_bala, abs(y1 - y0) + lado_bala
+                propietario_id = propietario[slot]
+                for obj_id in ids:
+                    obj = objetos.get(obj_id)
+                    if obj is not None and obj_id != propietario_id and obj.activo and \
+                       rectangulos_se_solapan(barrido_x, barrido_y, barrido_ancho, barrido_alto,
+                                              obj.pixel_x, obj.pixel_y, tam, tam):
+                        impacto = obj
+                        break
+                if impacto is not None: break
+            if impacto is None:
+                tile_x[slot] = fin_x
+                tile_y[slot] = fin_y
+            else:
+                viva[slot] = 0
+                self.vivas -= 1
+                if impacto is not False: impactos.append((slot, impacto))
+        return impactos
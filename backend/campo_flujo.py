@@ -0,0 +1,91 @@
+# backend/campo_flujo.py
+# Campo de flujo (mapa de Dijkstra) compartido por todos los enemigos.
+# Un único BFS desde la casilla del jugador sobre la geometría estática deja en
+# cada casilla su distancia al jugador; cualquier enemigo obtiene su siguiente
+# paso en O(1) mirando qué vecino está más cerca. Con varios jugadores (modo
+# servidor) el BFS sale de todos a la vez y cada casilla apunta al más cercano.
+from array import array
+
+from constantes import DIRECTIONS, STAY
+
+SIN_DISTANCIA = -1
+
+
+class CampoFlujo:
+    def __init__(self, ocupacion):
+        self.ocupacion = ocupacion
+        self.distancias = array('i')
+        self.objetivo = None
+        self._version_muros = None
+        self.recalculos = 0
+
+    def invalidar(self):
+        self.objetivo = None
+
+    def actualizar(self, objetivo):
+        # objetivo es una casilla (x, y) o una tupla de casillas.
+        # Solo recalcula si cambió el objetivo o la capa de muros
+        ocupacion = self.ocupacion
+        if objetivo == self.objetivo and self._version_muros == ocupacion.version_muros \
+                and len(self.distancias) == ocupacion.ancho * ocupacion.alto:
+            return False
+        self.objetivo = objetivo
+        self._version_muros = ocupacion.version_muros
+        self.recalculos += 1
+        self._calcular_bfs(objetivo)
+        return True
+
+    def _calcular_bfs(self, objetivo):
+        ancho = self.ocupacion.ancho
+        total = ancho * self.ocupacion.alto
+        muros = self.ocupacion.muros
+        distancias = array('i', [SIN_DISTANCIA]) * total
+        self.distancias = distancias
+        if objetivo is None: return
+        fuentes = (objetivo,) if isinstance(objetivo[0], int) else objetivo
+
+        cola = []
+        for x_fuente, y_fuente in fuentes:
+            if not self.ocupacion.dentro(x_fuente, y_fuente): continue
+            inicio = y_fuente * ancho + x_fuente
+            if distancias[inicio] < 0:
+                distancias[inicio] = 0
+                cola.append(inicio)
+        # Recorrer la lista mientras crece funciona como cola FIFO sin coste extra
+        for indice in cola:
+            siguiente = distancias[indice] + 1
+            x = indice % ancho
+            if x > 0:
+                vecino = indice - 1
+                if distancias[vecino] < 0 and not muros[vecino]:
+                    distancias[vecino] = siguiente; cola.append(vecino)
+            if x < ancho - 1:
+                vecino = indice + 1
+                if distancias[vecino] < 0 and not muros[vecino]:
+                    distancias[vecino] = siguiente; cola.append(vecino)
+            if indice >= ancho:
+                vecino = indice - ancho
+                if distancias[vecino] < 0 and not muros[vecino]:
+                    distancias[vecino] = siguiente; cola.append(vecino)
+            if indice < total - ancho:
+                vecino = indice + ancho
+                if distancias[vecino] < 0 and not muros[vecino]:
+                    distancias[vecino] = siguiente; cola.append(vecino)
+
+    def distancia(self, x_tile, y_tile):
+        if not self.ocupacion.dentro(x_tile, y_tile) or not self.distancias: return SIN_DISTANCIA
+        return self.distancias[y_tile * self.ocupacion.ancho + x_tile]
+
+    def siguiente_paso(self, x_tile, y_tile, para_objeto_id=None):
+        # Devuelve la dirección que acerca al objetivo por una casilla libre,
+        # STAY si ya está en el objetivo o todos los pasos útiles están ocupados,
+        # o None si el objetivo es inalcanzable desde (x_tile, y_tile).
+        distancia_actual = self.distancia(x_tile, y_tile)
+        if distancia_actual == SIN_DISTANCIA: return None
+        if distancia_actual == 0: return STAY
+        for direccion in DIRECTIONS:
+            vecino_x, vecino_y = x_tile + direccion[0], y_tile + direccion[1]
+            if self.distancia(vecino_x, vecino_y) == distancia_actual - 1 and \
+                    self.ocupacion.esta_libre(vecino_x, vecino_y, para_objeto_id):
+                return direccion
+        return STAY
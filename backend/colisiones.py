@@ -0,0 +1,42 @@
+# backend/colisiones.py
+# Geometría de colisiones en Python puro para que el motor no dependa de pygame.Rect.
+
+
+def rectangulos_se_solapan(ax, ay, a_ancho, a_alto, bx, by, b_ancho, b_alto):
+    # Mismo criterio que pygame.Rect.colliderect: tocarse en el borde no cuenta
+    return ax < bx + b_ancho and bx < ax + a_ancho and ay < by + b_alto and by < ay + a_alto
+
+
+
+def casillas_recorridas(x0, y0, x1, y1, tam_casilla):
+    # DDA (Amanatides-Woo): casillas que cruza el segmento (x0,y0)-(x1,y1), en orden y
+    # empezando por la inicial. Un paso por casilla, sin importar la longitud del segmento.
+    casilla_x, casilla_y = int(x0 // tam_casilla), int(y0 // tam_casilla)
+    fin_x, fin_y = int(x1 // tam_casilla), int(y1 // tam_casilla)
+    # Segmentos horizontales o verticales (las balas): basta con un rango
+    if casilla_y == fin_y:
+        paso = 1 if fin_x >= casilla_x else -1
+        return [(cx, casilla_y) for cx in range(casilla_x, fin_x + paso, paso)]
+    if casilla_x == fin_x:
+        paso = 1 if fin_y >= casilla_y else -1
+        return [(casilla_x, cy) for cy in range(casilla_y, fin_y + paso, paso)]
+    casillas = [(casilla_x, casilla_y)]
+    dx, dy = x1 - x0, y1 - y0
+    paso_x = 1 if dx > 0 else -1
+    paso_y = 1 if dy > 0 else -1
+    infinito = float('inf')
+    # t (0..1 a lo largo del segmento) en que se cruza el siguiente borde vertical/horizontal
+    t_max_x = ((casilla_x + (dx > 0)) * tam_casilla - x0) / dx if dx else infinito
+    t_max_y = ((casilla_y + (dy > 0)) * tam_casilla - y0) / dy if dy else infinito
+    t_delta_x = tam_casilla / abs(dx) if dx else infinito
+    t_delta_y = tam_casilla / abs(dy) if dy else infinito
+    for _ in range(abs(fin_x - casilla_x) + abs(fin_y - casilla_y)):
+        if t_max_x < t_max_y:
+            casilla_x += paso_x
+            t_max_x += t_delta_x
+        else:
+            casilla_y += paso_y
+            t_max_y += t_delta_y
+        casillas.append((casilla_x, casilla_y))
+    return casillas
+
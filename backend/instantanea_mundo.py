@@ -0,0 +1,221 @@
+# backend/instantanea_mundo.py
+# Instantáneas del mundo para el servidor autoritativo.
+# - instantanea_mundo(motor): el servidor resume el estado de un MotorJuego en
+#   listas compactas (tipos y direcciones como índices de tabla, píxeles
+#   enteros); los muros solo se incluyen cuando se piden (al unirse alguien o
+#   al cambiar version_muros).
+# - InterpoladorMundo: el cliente guarda las últimas instantáneas recibidas y
+#   arma con ellas el mismo diccionario que get_estado_para_vista, dibujando
+#   RETRASO_INTERPOLACION_RED_MS por detrás e interpolando tanques y balas
+#   entre las dos instantáneas que rodean ese instante. El tanque propio no va
+#   con retraso: se dibuja donde lo deja PrediccionLocal (backend/sincronizacion.py),
+#   que se reconcilia con cada instantánea nueva.
+from collections import deque
+
+from constantes import (
+    TIPO_JUGADOR, TIPO_ENEMIGO_NORMAL, TIPO_ENEMIGO_RAPIDO, TIPO_ENEMIGO_FUERTE,
+    TIPO_OBJETIVO1, TIPO_OBJETIVO2, TIPO_BALA, TILE_SIZE, GRID_WIDTH, GRID_HEIGHT, JUGANDO,
+    CAPACIDAD_INSTANTANEAS_RED, RETRASO_INTERPOLACION_RED_MS
+)
+from protocolo_red import DIRECCIONES_RED
+from backend.sincronizacion import PrediccionLocal
+
+# Las tablas solo pueden crecer por el final
+TIPOS_MUNDO = (TIPO_JUGADOR, TIPO_ENEMIGO_NORMAL, TIPO_ENEMIGO_RAPIDO, TIPO_ENEMIGO_FUERTE,
+               TIPO_OBJETIVO1, TIPO_OBJETIVO2)
+_INDICE_TIPO = {tipo: i for i, tipo in enumerate(TIPOS_MUNDO)}
+_INDICE_DIRECCION = {direccion: i for i, direccion in enumerate(DIRECCIONES_RED)}
+
+
+def instantanea_mundo(motor, estado=JUGANDO, entradas=None, incluir_muros=False):
+    # entradas: {id de tanque: última secuencia de entrada aplicada}; el cliente
+    # las usa para reconciliar su predicción
+    ahora_ms = motor.reloj_ms()
+    tanques, destruyendose = [], []
+    for tanque in motor.tanques.values():
+        if getattr(tanque, "fue_destruido_visual", False):
+            if ahora_ms - tanque.tiempo_destruccion_visual <= tanque.duracion_explosion_visual:
+                destruyendose.append((tanque.id, tanque.x_tile, tanque.y_tile))
+            continue
+        if not tanque.activo: continue
+        tanques.append((tanque.id, _INDICE_TIPO[tanque.tipo_objeto], tanque.x_tile, tanque.y_tile,
+                        round(tanque.pixel_x), round(tanque.pixel_y),
+                        _INDICE_DIRECCION.get(tuple(tanque.direccion_actual), 0), tanque.vidas,
+                        1 if tanque.is_moving else 0))
+    objetivos = [(objetivo.id, _INDICE_TIPO[objetivo.tipo_objeto], objetivo.x_tile, objetivo.y_tile)
+                 for objetivo in motor.objetivos.values() if objetivo.activo]
+    balas = motor.balas
+    lista_balas = [(balas.ids[slot], round(balas.x[slot]), round(balas.y[slot]), balas.tile_x[slot], balas.tile_y[slot])
+                   for slot in balas.activas if balas.viva[slot]]
+
+    instantanea = {
+        "type": "instantanea",
+        "tick": motor.ticks_logicos_actuales,
+        "t": motor.tiempo_ms_juego,
+        "estado": estado,
+        "nivel": motor.nivel_actual_numero,
+        "objetivos_vivos": motor.objetivos_vivos,
+        "objetivos_totales": motor.objetivos_totales,
+        "tanques": tanques,
+        "objetivos": objetivos,
+        "balas": lista_balas,
+        "destruyendose": destruyendose,
+        "entradas": list((entradas or {}).items()),
+    }
+    if incluir_muros:
+        # Lista plana x0, y0, x1, y1... (la mitad de corchetes en JSON)
+        instantanea["muros"] = [coordenada for casilla in motor.ocupacion.casillas_con_muro() for coordenada in casilla]
+        # Las dimensiones del mundo cambian con el nivel, igual que los muros
+        instantanea["ancho"] = motor.ocupacion.ancho
+        instantanea["alto"] = motor.ocupacion.alto
+    return instantanea
+
+
+class InterpoladorMundo:
+    def __init__(self, retraso_ms=RETRASO_INTERPOLACION_RED_MS):
+        # (t del servidor, t local de llegada, instantánea) en orden de t del servidor
+        self.instantaneas = deque(maxlen=CAPACIDAD_INSTANTANEAS_RED)
+        self.retraso_ms = retraso_ms
+        self.tanque_id = None
+        self.muros = []
+        self._casillas_muro = frozenset()
+        # Casillas de objetivos y de los demás tanques en la última instantánea
+        self._casillas_ocupadas = set()
+        self.prediccion = PrediccionLocal()
+        self.ancho = GRID_WIDTH
+        self.alto = GRID_HEIGHT
+        # Versión local: la vista solo rehace la capa de muros cuando cambia
+        self.version_muros = 0
+        self.resultado_pendiente = None
+        self.descartadas = 0
+
+    def asignar_tanque(self, tanque_id):
+        # También al cambiar de nivel: la predicción del tanque anterior ya no vale
+        self.tanque_id = tanque_id
+        self.prediccion.vaciar()
+
+    def registrar_entrada(self, secuencia, acciones):
+        # Entrada propia recién enviada al servidor
+        if self.tanque_id is not None: self.prediccion.registrar(secuencia, acciones, self._bloqueada)
+
+    def _bloqueada(self, x_tile, y_tile):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return True
+        return (x_tile, y_tile) in self._casillas_muro or (x_tile, y_tile) in self._casillas_ocupadas
+
+    def _reconciliar(self, instantanea):
+        propio = None
+        ocupadas = self._casillas_ocupadas = set()
+        for id_obj, _, x_tile, y_tile, pixel_x, pixel_y, direccion, _, moviendo in instantanea["tanques"]:
+            if id_obj == self.tanque_id:
+                propio = (x_tile, y_tile, pixel_x, pixel_y, DIRECCIONES_RED[direccion], bool(moviendo))
+                continue
+            ocupadas.add((x_tile, y_tile))
+            # Un tanque en marcha ya tiene reservada la casilla a la que va
+            if moviendo:
+                dx, dy = DIRECCIONES_RED[direccion]
+                ocupadas.add((x_tile + dx, y_tile + dy))
+        for _, _, x_tile, y_tile in instantanea["objetivos"]: ocupadas.add((x_tile, y_tile))
+        if propio is None:
+            self.prediccion.vaciar()
+            return
+        ack = dict(instantanea["entradas"]).get(self.tanque_id, 0)
+        self.prediccion.reconciliar(ack, *propio, self._bloqueada)
+
+    def agregar(self, instantanea, t_local):
+        if "muros" in instantanea:
+            muros = instantanea["muros"]
+            self.muros = list(zip(muros[0::2], muros[1::2]))
+            self._casillas_muro = frozenset(self.muros)
+            self.ancho = instantanea.get("ancho", GRID_WIDTH)
+            self.alto = instantanea.get("alto", GRID_HEIGHT)
+            self.version_muros += 1
+        if self.instantaneas and instantanea["t"] <= self.instantaneas[-1][0]:
+            self.descartadas += 1
+            return False
+        anterior = self.instantaneas[-1][2]["estado"] if self.instantaneas else JUGANDO
+        if instantanea["estado"] != anterior and instantanea["estado"] != JUGANDO:
+            self.resultado_pendiente = instantanea["estado"]
+        self.instantaneas.append((instantanea["t"], t_local, instantanea))
+        if self.tanque_id is not None: self._reconciliar(instantanea)
+        return True
+
+    def tomar_resultado(self):
+        # Fin de nivel anunciado por el servidor (una sola vez), o JUGANDO
+        resultado = self.resultado_pendiente
+        self.resultado_pendiente = None
+        return resultado or JUGANDO
+
+    def _instantaneas_en(self, t_local):
+        # Las dos instantáneas que rodean el instante a dibujar y la fracción entre ellas
+        instantaneas = self.instantaneas
+        desfase = min(t_llegada - t_servidor for t_servidor, t_llegada, _ in instantaneas)
+        t = t_local - desfase - self.retraso_ms
+        ultima = instantaneas[-1]
+        if t >= ultima[0] or len(instantaneas) < 2: return ultima[2], ultima[2], 1.0
+        for i in range(len(instantaneas) - 1, 0, -1):
+            anterior = instantaneas[i - 1]
+            if anterior[0] <= t:
+                siguiente = instantaneas[i]
+                return anterior[2], siguiente[2], (t - anterior[0]) / (siguiente[0] - anterior[0])
+        primera = instantaneas[0][2]
+        return primera, primera, 1.0
+
+    def estado_para_vista(self, t_local):
+        if not self.instantaneas: return None
+        anterior, actual, fraccion = self._instantaneas_en(t_local)
+        posiciones_anteriores = {}
+        if anterior is not actual:
+            for tanque in anterior["tanques"]: posiciones_anteriores[tanque[0]] = (tanque[4], tanque[5])
+            for bala in anterior["balas"]: posiciones_anteriores[bala[0]] = (bala[1], bala[2])
+
+        vista_objetos = []
+        for id_obj, tipo, x_tile, y_tile in actual["objetivos"]:
+            vista_objetos.append({
+                "id": id_obj, "tipo": TIPOS_MUNDO[tipo], "x_tile": x_tile, "y_tile": y_tile,
+                "pixel_x": x_tile * TILE_SIZE, "pixel_y": y_tile * TILE_SIZE,
+                "direccion": None, "is_moving": False
+            })
+        vidas_jugador = 0
+        predicho = self.prediccion.tanque
+        for id_obj, tipo, x_tile, y_tile, pixel_x, pixel_y, direccion, vidas, moviendo in actual["tanques"]:
+            direccion = DIRECCIONES_RED[direccion]
+            if id_obj == self.tanque_id:
+                vidas_jugador = vidas
+            if id_obj == self.tanque_id and predicho is not None:
+                x_tile, y_tile, pixel_x, pixel_y = predicho.x_tile, predicho.y_tile, predicho.pixel_x, predicho.pixel_y
+                direccion, moviendo = predicho.direccion_actual, predicho.is_moving
+            else:
+                pixel_x, pixel_y = _interpolar(posiciones_anteriores.get(id_obj), pixel_x, pixel_y, fraccion)
+            vista_objetos.append({
+                "id": id_obj, "tipo": TIPOS_MUNDO[tipo], "x_tile": x_tile, "y_tile": y_tile,
+                "pixel_x": pixel_x, "pixel_y": pixel_y,
+                "direccion": direccion, "is_moving": bool(moviendo)
+            })
+        for id_obj, pixel_x, pixel_y, x_tile, y_tile in actual["balas"]:
+            pixel_x, pixel_y = _interpolar(posiciones_anteriores.get(id_obj), pixel_x, pixel_y, fraccion)
+            vista_objetos.append({
+                "id": id_obj, "tipo": TIPO_BALA, "x_tile": x_tile, "y_tile": y_tile,
+                "pixel_x": pixel_x, "pixel_y": pixel_y,
+                "direccion": None, "is_moving": False
+            })
+
+        return {
+            "objetos": vista_objetos,
+            "muros": self.muros,
+            "version_muros": self.version_muros,
+            "ancho": self.ancho,
+            "alto": self.alto,
+            "jugador_id": self.tanque_id,
+            "nivel": actual["nivel"],
+            "vidas_jugador": vidas_jugador,
+            "objetivos_vivos": actual["objetivos_vivos"],
+            "objetivos_totales": actual["objetivos_totales"],
+            "enemigos_destruyendose": [{"id": id_obj, "x_tile": x_tile, "y_tile": y_tile}
+                                       for id_obj, x_tile, y_tile in actual["destruyendose"]],
+        }
+
+
+def _interpolar(posicion_anterior, pixel_x, pixel_y, fraccion):
+    if posicion_anterior is None or fraccion >= 1.0: return pixel_x, pixel_y
+    return (posicion_anterior[0] + (pixel_x - posicion_anterior[0]) * fraccion,
+            posicion_anterior[1] + (pixel_y - posicion_anterior[1]) * fraccion)
@@ -0,0 +1,184 @@
+# backend/lotes.py
+# Lotes de partidas sin interfaz para ajustar la IA y detectar regresiones:
+# cruza niveles x semillas x políticas de jugador, reparte las partidas en un
+# multiprocessing.Pool (un proceso por núcleo) y resume por nivel y política
+# la tasa de victorias, el tiempo hasta despejar el nivel, los disparos y el
+# coste por tick. Cada partida crea su motor con su semilla, así que el mismo
+# lote da el mismo informe.
+# Los ajustes de enemigos (--ajuste tipo.campo=valor) sobrescriben
+# TanqueEnemigoModel.TIPOS_CONFIG durante cada partida y se deshacen al
+# terminarla (con --procesos 1 las partidas corren en el proceso que llama).
+# Uso: python -m backend.lotes [--niveles 1,2,3,Rojo] [--semillas 0-99] [--politicas bot,aleatoria]
+#      [--ticks N] [--procesos N] [--ajuste enemigo_rapido.rango_vision=12 ...] [--salida informe.json]
+import argparse
+import copy
+import json
+import multiprocessing
+import sys
+import time
+
+from constantes import NIVEL_COMPLETADO, VICTORIA_FINAL, GAME_OVER, JUGANDO
+from backend.modelos import TanqueEnemigoModel
+from backend.motor_juego import MotorJuego
+from backend.simulacion import simular, politica_inactiva, PoliticaAleatoria, PoliticaBot
+
+POLITICAS = {
+    "inactiva": lambda semilla: politica_inactiva,
+    "aleatoria": lambda semilla: PoliticaAleatoria(semilla=semilla),
+    "bot": lambda semilla: PoliticaBot(semilla=semilla),
+}
+TICKS_POR_PARTIDA = 3000
+RESULTADOS_VICTORIA = (NIVEL_COMPLETADO, VICTORIA_FINAL)
+
+_CONFIG_ORIGINAL_ENEMIGOS = copy.deepcopy(TanqueEnemigoModel.TIPOS_CONFIG)
+
+
+def _aplicar_ajustes(ajustes):
+    # ajustes: {tipo de enemigo: {campo: valor}} sobre la configuración original.
+    # Devuelve la configuración que había para restaurarla después
+    config = copy.deepcopy(_CONFIG_ORIGINAL_ENEMIGOS)
+    for tipo, campos in (ajustes or {}).items():
+        config[tipo].update(campos)
+    anterior = TanqueEnemigoModel.TIPOS_CONFIG
+    TanqueEnemigoModel.TIPOS_CONFIG = config
+    return anterior
+
+
+def jugar_partida(tarea):
+    nivel, semilla, nombre_politica, ticks, ajustes = tarea
+    config_anterior = _aplicar_ajustes(ajustes)
+    try:
+        motor = MotorJuego(semilla=semilla)
+        resumen = simular(nivel, ticks, POLITICAS[nombre_politica](semilla), motor=motor)
+    finally:
+        TanqueEnemigoModel.TIPOS_CONFIG = config_anterior
+    jugador = motor.objetos_del_juego.get(motor.jugador_id)
+    return {
+        "nivel": nivel,
+        "semilla": semilla,
+        "politica": nombre_politica,
+        "resultado": resumen["resultado"],
+        "ticks": resumen["ticks"],
+        "tiempo_juego_ms": resumen["tiempo_juego_ms"],
+        "us_por_tick": resumen["duracion_s"] * 1e6 / resumen["ticks"] if resumen["ticks"] else 0.0,
+        "disparos_jugador": motor.disparos_jugador,
+        "disparos_enemigos": motor.disparos_enemigos,
+        "enemigos_destruidos": motor.enemigos_destruidos,
+        "objetivos_totales": motor.objetivos_totales,
+        "vidas_restantes": jugador.vidas if jugador is not None and jugador.activo else 0,
+    }
+
+
+def ejecutar_lote(niveles, semillas, politicas, ticks=TICKS_POR_PARTIDA, procesos=None, ajustes=None):
+    tareas = [(nivel, semilla, politica, ticks, ajustes) for nivel in niveles for politica in politicas for semilla in semillas]
+    procesos = procesos or multiprocessing.cpu_count()
+    if procesos == 1:
+        resultados = [jugar_partida(tarea) for tarea in tareas]
+    else:
+        # Bloques grandes: cada partida dura milisegundos y el reparto no debe costar más que jugarla
+        tamano_bloque = max(1, len(tareas) // (procesos * 8))
+        with multiprocessing.Pool(procesos) as pool:
+            resultados = list(pool.imap_unordered(jugar_partida, tareas, chunksize=tamano_bloque))
+    # El orden de llegada depende del reparto; el informe no, y con un proceso
+    # sale en el mismo orden que con varios
+    resultados.sort(key=lambda r: (str(r["nivel"]), r["politica"], r["semilla"]))
+    return resultados
+
+
+def _media(valores):
+    return sum(valores) / len(valores) if valores else None
+
+
+def _percentil(valores, p):
+    if not valores: return None
+    ordenados = sorted(valores)
+    return ordenados[min(len(ordenados) - 1, int(len(ordenados) * p))]
+
+
+def resumir(resultados):
+    grupos = {}
+    for resultado in resultados:
+        grupos.setdefault((str(resultado["nivel"]), resultado["politica"]), []).append(resultado)
+    resumen = []
+    for (nivel, politica), partidas in sorted(grupos.items()):
+        victorias = [p for p in partidas if p["resultado"] in RESULTADOS_VICTORIA]
+        resumen.append({
+            "nivel": nivel,
+            "politica": politica,
+            "partidas": len(partidas),
+            "victorias": len(victorias),
+            "derrotas": sum(1 for p in partidas if p["resultado"] == GAME_OVER),
+            "sin_terminar": sum(1 for p in partidas if p["resultado"] in (JUGANDO, None)),
+            "tasa_victoria": len(victorias) / len(partidas),
+            "tiempo_despeje_ms_medio": _media([p["tiempo_juego_ms"] for p in victorias]),
+            "tiempo_despeje_ms_p50": _percentil([p["tiempo_juego_ms"] for p in victorias], 0.5),
+            "disparos_jugador_medio": _media([p["disparos_jugador"] for p in partidas]),
+            "disparos_enemigos_medio": _media([p["disparos_enemigos"] for p in partidas]),
+            "enemigos_destruidos_medio": _media([p["enemigos_destruidos"] for p in partidas]),
+            "us_por_tick_medio": _media([p["us_por_tick"] for p in partidas]),
+            "us_por_tick_p95": _percentil([p["us_por_tick"] for p in partidas], 0.95),
+        })
+    return resumen
+
+
+def _leer_semillas(texto):
+    # "0-99" o "1,5,7"
+    if "-" in texto:
+        inicio, fin = texto.split("-", 1)
+        return list(range(int(inicio), int(fin) + 1))
+    return [int(s) for s in texto.split(",")]
+
+
+def _leer_ajustes(lista):
+    ajustes = {}
+    for ajuste in lista or ():
+        clave, valor = ajuste.split("=", 1)
+        tipo, campo = clave.rsplit(".", 1)
+        if tipo not in _CONFIG_ORIGINAL_ENEMIGOS or campo not in _CONFIG_ORIGINAL_ENEMIGOS[tipo]:
+            raise ValueError(f"Ajuste desconocido: {clave}")
+        ajustes.setdefault(tipo, {})[campo] = type(_CONFIG_ORIGINAL_ENEMIGOS[tipo][campo])(valor)
+    return ajustes
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Lotes de partidas sin interfaz repartidas en varios procesos")
+    parser.add_argument("--niveles", default="1,2,3")
+    parser.add_argument("--semillas", default="0-99")
+    parser.add_argument("--politicas", default="bot")
+    parser.add_argument("--ticks", type=int, default=TICKS_POR_PARTIDA)
+    parser.add_argument("--procesos", type=int, default=0, help="0 = uno por núcleo")
+    parser.add_argument("--ajuste", action="append", help="tipo.campo=valor sobre TIPOS_CONFIG (repetible)")
+    parser.add_argument("--salida", help="guarda partidas y resumen en JSON")
+    args = parser.parse_args(argv)
+
+    niveles = [int(n) if n.isdigit() else n for n in args.niveles.split(",")]
+    politicas = args.politicas.split(",")
+    for politica in politicas:
+        if politica not in POLITICAS: parser.error(f"política desconocida: {politica}")
+    try:
+        ajustes = _leer_ajustes(args.ajuste)
+    except ValueError as e:
+        parser.error(str(e))
+
+    inicio = time.perf_counter()
+    resultados = ejecutar_lote(niveles, _leer_semillas(args.semillas), politicas, args.ticks, args.procesos or None, ajustes)
+    duracion = time.perf_counter() - inicio
+    resumen = resumir(resultados)
+
+    print(f"{len(resultados)} partidas en {duracion:.1f} s ({len(resultados) / duracion:.0f} partidas/s)")
+    print(f"{'nivel':>16}{'política':>11}{'partidas':>9}{'victoria':>9}{'despeje s':>10}{'disp. j':>8}{'disp. e':>8}{'bajas':>7}{'us/tick':>9}")
+    for fila in resumen:
+        despeje = f"{fila['tiempo_despeje_ms_medio'] / 1000:>10.1f}" if fila["tiempo_despeje_ms_medio"] is not None else f"{'-':>10}"
+        print(f"{fila['nivel'][-16:]:>16}{fila['politica']:>11}{fila['partidas']:>9}{fila['tasa_victoria']:>9.0%}{despeje}"
+              f"{fila['disparos_jugador_medio']:>8.1f}{fila['disparos_enemigos_medio']:>8.1f}"
+              f"{fila['enemigos_destruidos_medio']:>7.1f}{fila['us_por_tick_medio']:>9.1f}")
+
+    if args.salida:
+        with open(args.salida, "w") as f:
+            json.dump({"ajustes": ajustes, "duracion_s": duracion, "resumen": resumen, "partidas": resultados}, f, indent=1)
+        print(f"Informe guardado en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,18 +1,44 @@
 # backend/modelos.py
-import uuid
+# Los modelos usan __slots__ e ids enteros pequeños que reparte un AsignadorIds
+# por motor. Los muros no son modelos: viven solo en MapaOcupacion.muros.
 import random
-import pygame # Necesario para pygame.time.get_ticks()
 import math
 from constantes import (
-    TIPO_BALA, TIPO_JUGADOR, TIPO_ENEMIGO_NORMAL, TIPO_ENEMIGO_RAPIDO, TIPO_ENEMIGO_FUERTE, TIPO_MURO,
+    TIPO_JUGADOR, TIPO_ENEMIGO_NORMAL, TIPO_ENEMIGO_RAPIDO, TIPO_ENEMIGO_FUERTE,
     VIDAS_INICIALES_JUGADOR, CADENCIA_DISPARO_JUGADOR, RIGHT, STAY, TILE_SIZE,
     DIRECTIONS, VELOCIDAD_JUGADOR_PX_S, VELOCIDAD_ENEMIGO_NORMAL_PX_S,
     VELOCIDAD_ENEMIGO_RAPIDO_PX_S, VELOCIDAD_ENEMIGO_FUERTE_PX_S
 )
 
+class IdObjeto(int):
+    # Id entero con .hex como el uuid.UUID que se usaba antes
+    __slots__ = ()
+
+    @property
+    def hex(self):
+        return format(self, '032x')
+
+
+class AsignadorIds:
+    __slots__ = ("siguiente",)
+
+    def __init__(self, primero=1):
+        self.siguiente = primero
+
+    def nuevo(self):
+        id_obj = IdObjeto(self.siguiente)
+        self.siguiente += 1
+        return id_obj
+
+# Para modelos creados fuera de un motor (benchmarks, pruebas a mano)
+_ASIGNADOR_POR_DEFECTO = AsignadorIds()
+
+
 class GameObjectModel:
+    __slots__ = ("id", "tipo_objeto", "activo", "x_tile", "y_tile", "pixel_x", "pixel_y")
+
     def __init__(self, x_tile, y_tile, tipo_objeto, id_obj=None):
-        self.id = id_obj if id_obj else uuid.uuid4()
+        self.id = id_obj if id_obj is not None else _ASIGNADOR_POR_DEFECTO.nuevo()
         self.tipo_objeto = tipo_objeto
         self.activo = True
         
@@ -28,8 +54,12 @@ class GameObjectModel:
         return f"<{self.tipo_objeto} ({self.id}) en ({self.x_tile},{self.y_tile})>"
 
 class TanqueModel(GameObjectModel): 
-    def __init__(self, x_tile, y_tile, tipo_tanque, vidas_iniciales, velocidad_px_s, cadencia_disparo):
-        super().__init__(x_tile, y_tile, tipo_tanque)
+    __slots__ = ("vidas", "velocidad_px_s", "cadencia_disparo", "tiempo_ultimo_disparo",
+                 "direccion_actual", "accion_actual", "is_moving", "target_pixel_x", "target_pixel_y",
+                 "pixel_x_anterior", "pixel_y_anterior")
+
+    def __init__(self, x_tile, y_tile, tipo_tanque, vidas_iniciales, velocidad_px_s, cadencia_disparo, id_obj=None):
+        super().__init__(x_tile, y_tile, tipo_tanque, id_obj)
         self.vidas = vidas_iniciales
         self.velocidad_px_s = velocidad_px_s
         self.cadencia_disparo = cadencia_disparo
@@ -41,6 +71,9 @@ class TanqueModel(GameObjectModel):
         self.is_moving = False
         self.target_pixel_x = self.pixel_x
         self.target_pixel_y = self.pixel_y
+        # Posición al empezar el tick, para que la vista interpole entre ticks
+        self.pixel_x_anterior = self.pixel_x
+        self.pixel_y_anterior = self.pixel_y
 
     def intentar_mover(self, direccion_vector_tile):
         if self.is_moving: # No se puede iniciar un nuevo movimiento hasta que termine el actual
@@ -84,7 +117,7 @@ class TanqueModel(GameObjectModel):
     def registrar_disparo(self, tiempo_actual_ms):
         self.tiempo_ultimo_disparo = tiempo_actual_ms 
 
-    def recibir_impacto(self):
+    def recibir_impacto(self, tiempo_actual_ms=0):
         if self.activo: 
             self.vidas -= 1
             if self.vidas <= 0:
@@ -95,14 +128,17 @@ class TanqueModel(GameObjectModel):
         return False 
 
 class TanqueJugadorModel(TanqueModel):
-    def __init__(self, x_tile, y_tile):
+    __slots__ = ("vidas_por_nivel", "detenido_por_usuario", "last_known_tile_pos")
+
+    def __init__(self, x_tile, y_tile, id_obj=None):
         super().__init__(
             x_tile,
             y_tile,
             TIPO_JUGADOR, 
             VIDAS_INICIALES_JUGADOR, 
             velocidad_px_s=VELOCIDAD_JUGADOR_PX_S,
-            cadencia_disparo=CADENCIA_DISPARO_JUGADOR 
+            cadencia_disparo=CADENCIA_DISPARO_JUGADOR,
+            id_obj=id_obj
         )
         self.vidas_por_nivel = VIDAS_INICIALES_JUGADOR 
         self.detenido_por_usuario = False
@@ -115,6 +151,8 @@ class TanqueJugadorModel(TanqueModel):
         self.pixel_y = float(y_tile * TILE_SIZE)
         self.target_pixel_x = self.pixel_x
         self.target_pixel_y = self.pixel_y
+        self.pixel_x_anterior = self.pixel_x
+        self.pixel_y_anterior = self.pixel_y
         self.is_moving = False
         
         self.vidas = self.vidas_por_nivel 
@@ -136,18 +174,24 @@ class TanqueEnemigoModel(TanqueModel):
     }
     RECALC_INTERVAL_JITTER = 5
     MIN_RECALC_INTERVAL = 20
+    __slots__ = ("objetivo_primario_id_asignado", "rango_vision", "rango_disparo", "ruta_actual_tiles",
+                 "frecuencia_decision_patrulla", "ticks_para_nueva_decision_patrulla", "direccion_patrulla_actual",
+                 "fue_destruido_visual", "tiempo_destruccion_visual", "duracion_explosion_visual",
+                 "base_recalc_interval", "ticks_para_recalcular_ruta", "ultima_pos_jugador_vista_para_ruta", "rng")
 
-    def __init__(self, x_tile, y_tile, tipo_enemigo, objetivo_primario_id_asignado=None):
+    def __init__(self, x_tile, y_tile, tipo_enemigo, objetivo_primario_id_asignado=None, id_obj=None, rng=None):
         config = self.TIPOS_CONFIG[tipo_enemigo]
+        # El RNG del motor que lo crea (simulación reproducible); fuera de un motor, el global
+        self.rng = rng if rng is not None else random
         super().__init__(x_tile, y_tile, tipo_enemigo,
-                         config["vidas"], config["velocidad_px_s"], config["cadencia"])
+                         config["vidas"], config["velocidad_px_s"], config["cadencia"], id_obj)
         self.objetivo_primario_id_asignado = objetivo_primario_id_asignado 
         self.rango_vision = config["rango_vision"]
         self.rango_disparo = config["rango_disparo"] 
         self.ruta_actual_tiles = [] 
 
-        self.frecuencia_decision_patrulla = random.randint(45, 90)
-        self.ticks_para_nueva_decision_patrulla = random.randint(0, self.frecuencia_decision_patrulla // 2)
+        self.frecuencia_decision_patrulla = self.rng.randint(45, 90)
+        self.ticks_para_nueva_decision_patrulla = self.rng.randint(0, self.frecuencia_decision_patrulla // 2)
         self.direccion_patrulla_actual = STAY 
 
         self.fue_destruido_visual = False 
@@ -156,11 +200,11 @@ class TanqueEnemigoModel(TanqueModel):
 
         self.base_recalc_interval = config["recalc_path_interval"] 
         
-        initial_interval_with_jitter = self.base_recalc_interval + random.randint(-self.RECALC_INTERVAL_JITTER, self.RECALC_INTERVAL_JITTER)
+        initial_interval_with_jitter = self.base_recalc_interval + self.rng.randint(-self.RECALC_INTERVAL_JITTER, self.RECALC_INTERVAL_JITTER)
         initial_interval_with_jitter = max(self.MIN_RECALC_INTERVAL, initial_interval_with_jitter)
 
         if initial_interval_with_jitter > 0:
-            self.ticks_para_recalcular_ruta = random.randint(1, initial_interval_with_jitter)
+            self.ticks_para_recalcular_ruta = self.rng.randint(1, initial_interval_with_jitter)
         else: 
             self.ticks_para_recalcular_ruta = 0
             
@@ -179,12 +223,12 @@ class TanqueEnemigoModel(TanqueModel):
         return False
 
     def reset_timer_recalcular_ruta(self):
-        next_interval = self.base_recalc_interval + random.randint(-self.RECALC_INTERVAL_JITTER, self.RECALC_INTERVAL_JITTER)
+        next_interval = self.base_recalc_interval + self.rng.randint(-self.RECALC_INTERVAL_JITTER, self.RECALC_INTERVAL_JITTER)
         self.ticks_para_recalcular_ruta = max(self.MIN_RECALC_INTERVAL, next_interval)
     def pos_distancia_sq(self, otra_pos_tile): 
         return (self.x_tile - otra_pos_tile[0])**2 + (self.y_tile - otra_pos_tile[1])**2
 
-    def recibir_impacto(self):
+    def recibir_impacto(self, tiempo_actual_ms=0):
         if not self.activo: 
             return False 
 
@@ -194,33 +238,17 @@ class TanqueEnemigoModel(TanqueModel):
                 print(f"{self.tipo_objeto} {self.id} destruido (vidas <= 0).")
                 self.activo = False 
                 self.fue_destruido_visual = True 
-                self.tiempo_destruccion_visual = pygame.time.get_ticks() 
+                self.tiempo_destruccion_visual = tiempo_actual_ms 
             return True 
 
         print(f"{self.tipo_objeto} {self.id} golpeado. Vidas: {self.vidas}")
         return False 
 
-class BalaModel(GameObjectModel):
-    def __init__(self, start_pixel_x, start_pixel_y, direccion_vector, propietario_id, tipo_propietario):
-        # La bala se crea en una posición de píxeles, no de tile
-        start_tile_x = int(start_pixel_x / TILE_SIZE)
-        start_tile_y = int(start_pixel_y / TILE_SIZE)
-        
-        super().__init__(start_tile_x, start_tile_y, TIPO_BALA) 
-        
-        self.pixel_x = start_pixel_x
-        self.pixel_y = start_pixel_y
-        self.direccion_vector = direccion_vector
-        self.propietario_id = propietario_id
-        self.tipo_propietario = tipo_propietario
-
-class MuroModel(GameObjectModel):
-    def __init__(self, x_tile, y_tile):
-        super().__init__(x_tile, y_tile, TIPO_MURO) 
-
 class ObjetivoPrimarioModel(GameObjectModel):
-    def __init__(self, x_tile, y_tile, tipo_objetivo):
-        super().__init__(x_tile, y_tile, tipo_objetivo)
+    __slots__ = ()
+
+    def __init__(self, x_tile, y_tile, tipo_objetivo, id_obj=None):
+        super().__init__(x_tile, y_tile, tipo_objetivo, id_obj)
 
     def ser_destruido(self): 
         if self.activo: 
@@ -1,9 +1,9 @@
 # backend/motor_juego.py
 import random
-import pygame
 import os
 import math
-import heapq 
+import hashlib
+from array import array
 
 from constantes import (
     GRID_WIDTH, GRID_HEIGHT, TILE_SIZE, MAX_NIVELES, SCREEN_WIDTH, SCREEN_HEIGHT,
@@ -14,27 +14,91 @@ from constantes import (
     VELOCIDAD_BALA, STAY,
     TIPO_OBJETIVO1, TIPO_OBJETIVO2,
     GAME_OVER, VICTORIA_FINAL, NIVEL_COMPLETADO, JUGANDO,
-    EDITOR_CHAR_TO_TYPE, EDITOR_CHAR_JUGADOR, EDITOR_NIVELES_PATH, EDITOR_CHAR_VACIO,
+    EVENTO_OBJETIVO_DESTRUIDO, EVENTO_OBJETIVOS_COMPLETADOS,
+    EDITOR_CHAR_JUGADOR, EDITOR_NIVELES_PATH,
     DFS_ACTIVATION_RANGE_SQ, OBJECTIVE_PATROL_MAX_DISTANCE_SQ, OBJECTIVE_PATROL_MIN_DISTANCE_SQ
 )
 
 from backend.modelos import (
     TanqueModel, TanqueJugadorModel, TanqueEnemigoModel,
-    BalaModel, MuroModel, ObjetivoPrimarioModel
+    ObjetivoPrimarioModel, AsignadorIds
 )
+from backend.balas import PoolBalas
+from backend.ocupacion import MapaOcupacion, CAPA_TANQUE, CAPA_OBJETIVO
+from backend.campo_flujo import CampoFlujo
+from backend.rutas import BuscadorAEstrella
+from backend.vision import IndiceVision
+from backend.perfilado import PerfiladorMotor
+from backend.niveles import compilar_nivel, cargar_plantilla, resolver_ruta_nivel
+from backend.sincronizacion import BufferInstantaneas
+
+class RngContado(random.Random):
+    # random.Random que cuenta cuántos números ha sacado. Con la misma semilla,
+    # mismo contador = mismo estado, así que hash_estado() resume el contador en
+    # vez de getstate() (625 enteros, más caro que un tick entero).
+    def __init__(self, semilla=None):
+        self.extracciones = 0
+        super().__init__(semilla)
+
+    def random(self):
+        self.extracciones += 1
+        return super().random()
+
+    def getrandbits(self, k):
+        self.extracciones += 1
+        return super().getrandbits(k)
+
+    # random.Random se copia con getstate()/setstate(), que no saben del
+    # contador: sin esto una copia (p. ej. los fotogramas clave de
+    # backend/repeticion.py) daría otro hash_estado() con el mismo estado
+    def __reduce__(self):
+        return (self.__class__, (), (self.getstate(), self.extracciones))
+
+    def __setstate__(self, estado):
+        super().setstate(estado[0])
+        self.extracciones = estado[1]
+
 
 class MotorJuego:
-    def __init__(self, player_shoot_sound=None, player_final_destruction_sound=None):
+    def __init__(self, player_shoot_sound=None, player_final_destruction_sound=None, reloj_ms=None, semilla=None):
         self.nivel_actual_numero = 0
+        # Todo el azar de la simulación (generación de niveles, IA) sale de este
+        # RNG: misma semilla y mismas entradas dan la misma partida bit a bit.
+        # Sin semilla se siembra del sistema como antes.
+        self.semilla = semilla
+        self.rng = RngContado(semilla)
         self.objetos_del_juego = {}
+        # Ids enteros pequeños para modelos y balas; no se reinician entre niveles
+        self.ids = AsignadorIds()
+        # Las balas no son modelos: viven en un pool de arreglos paralelos
+        self.balas = PoolBalas()
+        self._reiniciar_registros()
         self.jugador_id = None
         self.oponente_id = None
-        self.mapa_colisiones = {}
+        # Jugadores extra que solo existen con el servidor autoritativo (ver servidor_autoritativo.py)
+        self.jugadores_remotos_ids = []
+        # Modo online: posiciones recibidas del oponente
+        self.instantaneas_oponente = BufferInstantaneas()
+        self.ocupacion = MapaOcupacion(GRID_WIDTH, GRID_HEIGHT)
+        # Un solo campo de flujo hacia el jugador para todos los enemigos;
+        # con usar_campo_flujo = False cada enemigo vuelve a calcular su A*
+        self.campo_flujo = CampoFlujo(self.ocupacion)
+        self.usar_campo_flujo = True
+        self.buscador_rutas = BuscadorAEstrella(self.ocupacion)
+        self.indice_vision = IndiceVision(self.ocupacion)
         self.ticks_logicos_actuales = 0
         self.tiempo_ms_juego = 0
+        # version_muros no se reinicia (la vista y los cachés la comparan); el
+        # hash cuenta los cambios de muros desde el último reiniciar_simulacion()
+        self._version_muros_base = self.ocupacion.version_muros
 
         self.player_shoot_sound = player_shoot_sound
         self.player_final_destruction_sound = player_final_destruction_sound
+        # Reloj (ms) para temporizar las explosiones. Por defecto usa el tiempo
+        # simulado del motor, así funciona sin pygame y a cualquier velocidad.
+        self.reloj_ms = reloj_ms if reloj_ms is not None else self._tiempo_juego_ms
+        # Perfilado por fases de actualizar_estado; None = desactivado
+        self.perfilador = None
 
         self.puntos_spawn_jugador_por_nivel = {
             1: (1, GRID_HEIGHT // 2),
@@ -51,14 +115,68 @@ class MotorJuego:
         self.es_nivel_editado_actualmente = False
         self.last_player_tile_pos_for_enemy_logic = None
 
+    def _tiempo_juego_ms(self):
+        return self.tiempo_ms_juego
+
+    def reiniciar_simulacion(self, semilla=None):
+        # Deja RNG, ids, ticks y reloj como en un motor recién creado con esa
+        # semilla. Se llama justo antes de cargar_nivel: así cada nivel se
+        # reproduce desde su semilla sin depender de lo jugado antes (lo usan
+        # las repeticiones de backend/repeticion.py).
+        if semilla is None: semilla = int.from_bytes(os.urandom(4), "little")
+        self.semilla = semilla
+        # Mismo objeto: los enemigos guardan una referencia al RNG del motor
+        self.rng.seed(semilla)
+        self.rng.extracciones = 0
+        self.ids = AsignadorIds()
+        self.ticks_logicos_actuales = 0
+        self.tiempo_ms_juego = 0
+        self._version_muros_base = self.ocupacion.version_muros
+        return semilla
+
+    def activar_perfilado(self, capacidad_historial=300):
+        if self.perfilador is None:
+            self.perfilador = PerfiladorMotor(capacidad_historial)
+        return self.perfilador
+
+    def desactivar_perfilado(self):
+        perfilador = self.perfilador
+        self.perfilador = None
+        return perfilador
+
+    def _reproducir_sonido(self, sonido):
+        if not sonido: return
+        try: sonido.play()
+        except Exception as e: print(f"Error al reproducir sonido: {e}")
+
+    def _reiniciar_registros(self):
+        # Registros por tipo (id -> modelo) que mantienen _agregar_objeto y
+        # _quitar_objeto, para que cada fase recorra solo los objetos que le tocan
+        self.tanques = {}
+        self.enemigos = {}
+        self.balas.vaciar()
+        self.objetivos = {}
+        # Ids de objetos inactivos que el barrido debe quitar (los enemigos, al acabar su explosión)
+        self.pendientes_de_quitar = set()
+        # Contadores incrementales de objetivos: la comprobación de victoria no recorre nada
+        self.objetivos_totales = 0
+        self.objetivos_vivos = 0
+        # Estadísticas del nivel (las usan los lotes de backend/lotes.py)
+        self.disparos_jugador = 0
+        self.disparos_enemigos = 0
+        self.enemigos_destruidos = 0
+        self.eventos = []
+        self._vista_muros = None
+        self._version_vista_muros = -1
+
     def _limpiar_estado_nivel(self):
         self.objetos_del_juego = {}
+        self._reiniciar_registros()
         self.jugador_id = None
         self.oponente_id = None
-        self.mapa_colisiones = {}
-        for y_map in range(GRID_HEIGHT):
-            for x_map in range(GRID_WIDTH):
-                self.mapa_colisiones[(x_map,y_map)] = []
+        self.jugadores_remotos_ids = []
+        self.instantaneas_oponente.vaciar()
+        self.ocupacion.reiniciar()
         self.es_nivel_editado_actualmente = False
         self.last_player_tile_pos_for_enemy_logic = None
 
@@ -68,100 +186,274 @@ class MotorJuego:
             print(f"ERROR FATAL en _agregar_objeto: Objeto {objeto_modelo.tipo_objeto} en ({objeto_modelo.x_tile},{objeto_modelo.y_tile}) no tiene ID.")
             return
         self.objetos_del_juego[objeto_modelo.id] = objeto_modelo
+        self._registrar_objeto(objeto_modelo)
+        if self.perfilador is not None: self.perfilador.contar("objetos_creados")
         if isinstance(objeto_modelo, TanqueEnemigoModel) and objeto_modelo.fue_destruido_visual:
             return
-        elif objeto_modelo.tipo_objeto != TIPO_BALA:
-            self._actualizar_mapa_colisiones_objeto(objeto_modelo, agregar=True)
+        elif objeto_modelo.activo:
+            self._ocupar_casilla_objeto(objeto_modelo)
 
     def _quitar_objeto(self, objeto_id):
         if objeto_id in self.objetos_del_juego:
             obj = self.objetos_del_juego.pop(objeto_id)
-            if not (isinstance(obj, TanqueEnemigoModel) and obj.fue_destruido_visual):
-                if obj.tipo_objeto != TIPO_BALA:
-                     self._actualizar_mapa_colisiones_objeto(obj, agregar=False)
-
-
-    def _actualizar_mapa_colisiones_objeto(self, obj, agregar=True):
-        if isinstance(obj, TanqueEnemigoModel) and obj.fue_destruido_visual:
-            if not agregar:
-                pos_actual_tile = (obj.x_tile, obj.y_tile)
-                if 0 <= pos_actual_tile[0] < GRID_WIDTH and 0 <= pos_actual_tile[1] < GRID_HEIGHT:
-                    if obj.id in self.mapa_colisiones.get(pos_actual_tile, []):
-                        try: self.mapa_colisiones[pos_actual_tile].remove(obj.id)
-                        except ValueError: pass
-            return
-
-        pos_actual_tile = (obj.x_tile, obj.y_tile)
-        if 0 <= pos_actual_tile[0] < GRID_WIDTH and 0 <= pos_actual_tile[1] < GRID_HEIGHT:
-            if agregar:
-                if obj.id not in self.mapa_colisiones[pos_actual_tile]:
-                    self.mapa_colisiones[pos_actual_tile].append(obj.id)
-            else:
-                if obj.id in self.mapa_colisiones.get(pos_actual_tile, []):
-                    try: self.mapa_colisiones[pos_actual_tile].remove(obj.id)
-                    except ValueError: pass
+            self._desregistrar_objeto(objeto_id)
+            self._liberar_ocupacion_objeto(obj)
+            if self.perfilador is not None: self.perfilador.contar("objetos_destruidos")
+
+    def _registrar_objeto(self, obj):
+        if isinstance(obj, TanqueModel):
+            self.tanques[obj.id] = obj
+            if isinstance(obj, TanqueEnemigoModel): self.enemigos[obj.id] = obj
+        elif isinstance(obj, ObjetivoPrimarioModel):
+            if obj.id not in self.objetivos:
+                self.objetivos_totales += 1
+                if obj.activo: self.objetivos_vivos += 1
+            self.objetivos[obj.id] = obj
+        if not obj.activo and obj.tipo_objeto != TIPO_JUGADOR:
+            self.pendientes_de_quitar.add(obj.id)
+
+    def _desregistrar_objeto(self, objeto_id):
+        for registro in (self.tanques, self.enemigos):
+            registro.pop(objeto_id, None)
+        self.pendientes_de_quitar.discard(objeto_id)
+        objetivo = self.objetivos.pop(objeto_id, None)
+        if objetivo is not None and objetivo.activo:
+            # Un objetivo quitado sin destruir deja de contar para el nivel
+            self.objetivos_totales -= 1
+            self._descontar_objetivo_vivo()
+
+    def _descontar_objetivo_vivo(self):
+        self.objetivos_vivos -= 1
+        if self.objetivos_vivos == 0 and self.objetivos_totales > 0:
+            self._emitir_evento(EVENTO_OBJETIVOS_COMPLETADOS, objetivos_totales=self.objetivos_totales)
+
+    def _emitir_evento(self, tipo, **datos):
+        datos["tipo"] = tipo
+        datos["tick"] = self.ticks_logicos_actuales
+        self.eventos.append(datos)
+
+    def tomar_eventos(self):
+        # Devuelve los eventos emitidos desde la última llamada y vacía la cola
+        eventos = self.eventos
+        self.eventos = []
+        return eventos
+
+    def hash_estado(self):
+        # Resumen de 64 bits de todo lo que decide el tick siguiente (tanques,
+        # objetivos, balas, reloj y estado del RNG). Dos motores con la misma
+        # semilla y las mismas entradas deben dar el mismo hash en cada tick; el
+        # primero que difiere marca la desincronización.
+        enteros = array('q', (self.ticks_logicos_actuales, self.ocupacion.version_muros - self._version_muros_base,
+                              self.objetivos_vivos, self.rng.extracciones))
+        reales = array('d', (self.tiempo_ms_juego,))
+        for tanque_id in sorted(self.tanques):
+            tanque = self.tanques[tanque_id]
+            enteros.extend((tanque_id, tanque.x_tile, tanque.y_tile, tanque.vidas, tanque.activo, tanque.is_moving,
+                            tanque.direccion_actual[0], tanque.direccion_actual[1]))
+            reales.extend((tanque.pixel_x, tanque.pixel_y))
+        for objetivo_id in sorted(self.objetivos):
+            enteros.extend((objetivo_id, self.objetivos[objetivo_id].activo))
+        balas = self.balas
+        for slot in balas.activas:
+            if balas.viva[slot]:
+                enteros.append(balas.ids[slot])
+                reales.extend((balas.x[slot], balas.y[slot]))
+        resumen = hashlib.blake2b(enteros.tobytes(), digest_size=8)
+        resumen.update(reales.tobytes())
+        return int.from_bytes(resumen.digest(), 'little')
+
+    def _marcar_destruido(self, obj):
+        # Libera la casilla al momento y deja el objeto para el barrido; el jugador
+        # no se quita nunca (su inactividad es el GAME_OVER)
+        self._liberar_ocupacion_objeto(obj)
+        if obj.tipo_objeto != TIPO_JUGADOR:
+            self.pendientes_de_quitar.add(obj.id)
+        if isinstance(obj, TanqueEnemigoModel): self.enemigos_destruidos += 1
+        if isinstance(obj, ObjetivoPrimarioModel) and obj.id in self.objetivos:
+            self._emitir_evento(EVENTO_OBJETIVO_DESTRUIDO, id=obj.id, x_tile=obj.x_tile, y_tile=obj.y_tile)
+            self._descontar_objetivo_vivo()
+
+    def _capa_ocupacion(self, obj):
+        if isinstance(obj, TanqueModel): return CAPA_TANQUE
+        if isinstance(obj, ObjetivoPrimarioModel): return CAPA_OBJETIVO
+        return None
+
+    def _poner_muro(self, x_tile, y_tile):
+        # Los muros son solo datos de la rejilla, no objetos del juego
+        self.ocupacion.poner_muro(x_tile, y_tile)
+
+    def _ocupar_casilla_objeto(self, obj):
+        capa = self._capa_ocupacion(obj)
+        if capa is not None:
+            self.ocupacion.agregar(obj.id, obj.x_tile, obj.y_tile, capa)
+
+    def _liberar_ocupacion_objeto(self, obj):
+        # Idempotente: quitar un id que ya no está en la celda no hace nada
+        capa = self._capa_ocupacion(obj)
+        if capa is None: return
+        self.ocupacion.quitar(obj.id, obj.x_tile, obj.y_tile, capa)
+        if capa == CAPA_TANQUE and obj.is_moving:
+            destino_x, destino_y = self._casilla_destino_tanque(obj)
+            self.ocupacion.quitar(obj.id, destino_x, destino_y, CAPA_TANQUE)
+
+    def _casilla_destino_tanque(self, tanque):
+        return int(tanque.target_pixel_x // TILE_SIZE), int(tanque.target_pixel_y // TILE_SIZE)
+
+    def _iniciar_movimiento_tanque(self, tanque, nueva_x, nueva_y):
+        # El tanque reserva la casilla destino al empezar a moverse y libera la de
+        # origen al llegar (ver _interpolar_tanques), así nadie entra en ninguna de las dos.
+        if tanque.is_moving:
+            destino_x, destino_y = self._casilla_destino_tanque(tanque)
+            if (destino_x, destino_y) != (tanque.x_tile, tanque.y_tile):
+                self.ocupacion.quitar(tanque.id, destino_x, destino_y, CAPA_TANQUE)
+        tanque.iniciar_movimiento_a_casilla(nueva_x, nueva_y)
+        self.ocupacion.agregar(tanque.id, nueva_x, nueva_y, CAPA_TANQUE)
+
+    def _interpolar_tanques(self, tiempo_delta_s):
+        for obj in self.tanques.values():
+            obj.pixel_x_anterior = obj.pixel_x
+            obj.pixel_y_anterior = obj.pixel_y
+            if obj.is_moving:
+                origen_x, origen_y = obj.x_tile, obj.y_tile
+                obj.update_posicion_pixel(tiempo_delta_s)
+                if not obj.is_moving and (obj.x_tile, obj.y_tile) != (origen_x, origen_y):
+                    self.ocupacion.quitar(obj.id, origen_x, origen_y, CAPA_TANQUE)
 
     def anadir_oponente(self, x, y):
         if self.oponente_id and self.oponente_id in self.objetos_del_juego:
             return
 
-        oponente = TanqueJugadorModel(x, y)
+        oponente = TanqueJugadorModel(x, y, id_obj=self.ids.nuevo())
         self.oponente_id = oponente.id
         self._agregar_objeto(oponente)
         print(f"Oponente añadido con ID: {self.oponente_id}")
 
+    def agregar_jugador_remoto(self):
+        # Tanque de jugador extra manejado por acciones remotas (modo servidor). Aparece
+        # en la casilla libre más cercana al jugador principal; devuelve su id o None.
+        jugador = self.objetos_del_juego.get(self.jugador_id)
+        if not jugador: return None
+        casilla = self._casilla_libre_cercana(jugador.x_tile, jugador.y_tile)
+        if casilla is None: return None
+        remoto = TanqueJugadorModel(casilla[0], casilla[1], id_obj=self.ids.nuevo())
+        self._agregar_objeto(remoto)
+        self.jugadores_remotos_ids.append(remoto.id)
+        return remoto.id
+
+    def quitar_jugador_remoto(self, jugador_id):
+        if jugador_id not in self.jugadores_remotos_ids: return
+        self.jugadores_remotos_ids.remove(jugador_id)
+        self._quitar_objeto(jugador_id)
+
+    def _casilla_libre_cercana(self, x_tile, y_tile):
+        # BFS por casillas sin muro hasta dar con una libre de tanques y objetivos
+        visitadas = {(x_tile, y_tile)}
+        cola = [(x_tile, y_tile)]
+        for x, y in cola:
+            if self.ocupacion.esta_libre(x, y): return x, y
+            for dx, dy in DIRECTIONS:
+                vecina = (x + dx, y + dy)
+                if vecina not in visitadas and self.ocupacion.es_transitable(*vecina):
+                    visitadas.add(vecina)
+                    cola.append(vecina)
+        return None
+
     def actualizar_estado_remoto(self, datos_remotos):
         if not self.oponente_id:
             if datos_remotos.get('tipo') == TIPO_JUGADOR:
                 self.anadir_oponente(datos_remotos['x_tile'], datos_remotos['y_tile'])
 
         oponente = self.objetos_del_juego.get(self.oponente_id)
-        if oponente:
-            # Usar coordenadas de tile que se reciben y convertir a píxeles
-            oponente.x_tile = datos_remotos['x_tile']
-            oponente.y_tile = datos_remotos['y_tile']
-            oponente.pixel_x = oponente.x_tile * TILE_SIZE
-            oponente.pixel_y = oponente.y_tile * TILE_SIZE
-            oponente.direccion_actual = tuple(datos_remotos['direccion'])
-
-            if datos_remotos.get('disparo'):
-                start_pixel_x = oponente.pixel_x + TILE_SIZE / 2 + oponente.direccion_actual[0] * (TILE_SIZE / 2)
-                start_pixel_y = oponente.pixel_y + TILE_SIZE / 2 + oponente.direccion_actual[1] * (TILE_SIZE / 2)
-                bala = BalaModel(start_pixel_x, start_pixel_y, oponente.direccion_actual, self.oponente_id, TIPO_JUGADOR)
-                self._agregar_objeto(bala)
+        if not oponente: return
+        # La casilla lógica (ocupación, visión de la IA) sigue a lo último recibido
+        self._liberar_ocupacion_objeto(oponente)
+        oponente.is_moving = False
+        oponente.x_tile = datos_remotos['x_tile']
+        oponente.y_tile = datos_remotos['y_tile']
+        oponente.direccion_actual = tuple(datos_remotos['direccion'])
+        self._ocupar_casilla_objeto(oponente)
+
+        pixel_x = datos_remotos.get('pixel_x', oponente.x_tile * TILE_SIZE)
+        pixel_y = datos_remotos.get('pixel_y', oponente.y_tile * TILE_SIZE)
+        oponente.target_pixel_x, oponente.target_pixel_y = pixel_x, pixel_y
+        if datos_remotos.get('t') is None:
+            # Mensaje sin marca de tiempo (cliente antiguo): se coloca tal cual
+            self.instantaneas_oponente.vaciar()
+            oponente.pixel_x = oponente.pixel_x_anterior = pixel_x
+            oponente.pixel_y = oponente.pixel_y_anterior = pixel_y
+        else:
+            # El dibujo se suaviza en _sincronizar_oponente con las instantáneas
+            self.instantaneas_oponente.agregar(datos_remotos['t'], self.reloj_ms(), pixel_x, pixel_y)
+
+        if datos_remotos.get('disparo'):
+            # El disparo sale de donde estaba el oponente al disparar, no de donde se
+            # está dibujando (que va RETRASO_INTERPOLACION_RED_MS por detrás)
+            pixel_x_dibujado, pixel_y_dibujado = oponente.pixel_x, oponente.pixel_y
+            oponente.pixel_x, oponente.pixel_y = pixel_x, pixel_y
+            self._disparar(oponente, TIPO_JUGADOR)
+            oponente.pixel_x, oponente.pixel_y = pixel_x_dibujado, pixel_y_dibujado
+
+    def _sincronizar_oponente(self):
+        # Coloca al oponente donde estaba hace RETRASO_INTERPOLACION_RED_MS según
+        # sus instantáneas (interpoladas o extrapoladas)
+        if not self.oponente_id or not self.instantaneas_oponente: return
+        oponente = self.objetos_del_juego.get(self.oponente_id)
+        if not oponente: return
+        muestra = self.instantaneas_oponente.muestrear(self.reloj_ms())
+        if muestra: oponente.pixel_x, oponente.pixel_y = muestra
+
+    def estado_red_jugador(self, disparo=False):
+        # 'game_update' del jugador local para este tick
+        jugador = self.objetos_del_juego.get(self.jugador_id)
+        if not jugador: return None
+        return {
+            "type": "game_update",
+            "id": jugador.id.hex,
+            "tipo": TIPO_JUGADOR,
+            "x_tile": jugador.x_tile,
+            "y_tile": jugador.y_tile,
+            "pixel_x": round(jugador.pixel_x),
+            "pixel_y": round(jugador.pixel_y),
+            "direccion": jugador.direccion_actual,
+            "disparo": disparo,
+            "t": self.tiempo_ms_juego,
+            "secuencia": self.ticks_logicos_actuales,
+        }
 
     def _cargar_nivel_procedural(self, numero_nivel_int):
         print(f"Motor: Cargando nivel procedural {numero_nivel_int}")
         self.es_nivel_editado_actualmente = False
+        # Los niveles procedurales miden lo que la pantalla por defecto
+        self.ocupacion.redimensionar(GRID_WIDTH, GRID_HEIGHT)
         spawn_x, spawn_y = self.puntos_spawn_jugador_por_nivel.get(numero_nivel_int, (1, GRID_HEIGHT // 2))
         
         jugador_obj_existente = self.objetos_del_juego.get(self.jugador_id) if self.jugador_id else None
         if jugador_obj_existente and isinstance(jugador_obj_existente, TanqueJugadorModel):
-            self._actualizar_mapa_colisiones_objeto(jugador_obj_existente, agregar=False)
+            self._liberar_ocupacion_objeto(jugador_obj_existente)
             jugador_obj_existente.reset_para_nuevo_nivel(spawn_x, spawn_y)
             self._agregar_objeto(jugador_obj_existente)
             self.last_player_tile_pos_for_enemy_logic = (jugador_obj_existente.x_tile, jugador_obj_existente.y_tile)
         else:
-            jugador = TanqueJugadorModel(spawn_x, spawn_y)
+            jugador = TanqueJugadorModel(spawn_x, spawn_y, id_obj=self.ids.nuevo())
             self._agregar_objeto(jugador)
             self.jugador_id = jugador.id
             self.last_player_tile_pos_for_enemy_logic = (jugador.x_tile, jugador.y_tile)
         
         posiciones_ocupadas_temp = [(spawn_x, spawn_y)]
         for x_borde in range(GRID_WIDTH):
-            if (x_borde, 0) not in posiciones_ocupadas_temp: self._agregar_objeto(MuroModel(x_borde, 0)); posiciones_ocupadas_temp.append((x_borde,0))
-            if (x_borde, GRID_HEIGHT - 1) not in posiciones_ocupadas_temp: self._agregar_objeto(MuroModel(x_borde, GRID_HEIGHT - 1)); posiciones_ocupadas_temp.append((x_borde, GRID_HEIGHT - 1))
+            if (x_borde, 0) not in posiciones_ocupadas_temp: self._poner_muro(x_borde, 0); posiciones_ocupadas_temp.append((x_borde,0))
+            if (x_borde, GRID_HEIGHT - 1) not in posiciones_ocupadas_temp: self._poner_muro(x_borde, GRID_HEIGHT - 1); posiciones_ocupadas_temp.append((x_borde, GRID_HEIGHT - 1))
         for y_borde in range(1, GRID_HEIGHT - 1):
-            if (0, y_borde) not in posiciones_ocupadas_temp: self._agregar_objeto(MuroModel(0, y_borde)); posiciones_ocupadas_temp.append((0, y_borde))
-            if (GRID_WIDTH - 1, y_borde) not in posiciones_ocupadas_temp: self._agregar_objeto(MuroModel(GRID_WIDTH - 1, y_borde)); posiciones_ocupadas_temp.append((GRID_WIDTH -1, y_borde))
+            if (0, y_borde) not in posiciones_ocupadas_temp: self._poner_muro(0, y_borde); posiciones_ocupadas_temp.append((0, y_borde))
+            if (GRID_WIDTH - 1, y_borde) not in posiciones_ocupadas_temp: self._poner_muro(GRID_WIDTH - 1, y_borde); posiciones_ocupadas_temp.append((GRID_WIDTH -1, y_borde))
         
-        num_muros_internos = random.randint(15, (GRID_WIDTH * GRID_HEIGHT) // 12)
+        num_muros_internos = self.rng.randint(15, (GRID_WIDTH * GRID_HEIGHT) // 12)
         for _ in range(num_muros_internos):
             intentos_muro = 0;
             while intentos_muro < 50:
-                x, y = random.randint(1, GRID_WIDTH - 2), random.randint(1, GRID_HEIGHT - 2);
+                x, y = self.rng.randint(1, GRID_WIDTH - 2), self.rng.randint(1, GRID_HEIGHT - 2);
                 if (x,y) not in posiciones_ocupadas_temp:
-                    self._agregar_objeto(MuroModel(x, y)); posiciones_ocupadas_temp.append((x,y)); break
+                    self._poner_muro(x, y); posiciones_ocupadas_temp.append((x,y)); break
                 intentos_muro +=1
         
         config_nivel_obj = self.config_objetivos_por_nivel.get(numero_nivel_int, {"cantidad": 1, "tipos": [TIPO_OBJETIVO1]})
@@ -169,10 +461,10 @@ class MotorJuego:
         for _ in range(config_nivel_obj["cantidad"]):
             intentos_pos = 0
             while intentos_pos < 100:
-                x, y = random.randint(1, GRID_WIDTH - 2), random.randint(1, GRID_HEIGHT - 2);
+                x, y = self.rng.randint(1, GRID_WIDTH - 2), self.rng.randint(1, GRID_HEIGHT - 2);
                 if (x,y) not in posiciones_ocupadas_temp:
-                    tipo_obj_azar = random.choice(config_nivel_obj["tipos"])
-                    objetivo = ObjetivoPrimarioModel(x, y, tipo_obj_azar); self._agregar_objeto(objetivo)
+                    tipo_obj_azar = self.rng.choice(config_nivel_obj["tipos"])
+                    objetivo = ObjetivoPrimarioModel(x, y, tipo_obj_azar, id_obj=self.ids.nuevo()); self._agregar_objeto(objetivo)
                     ids_objetivos_creados.append(objetivo.id); posiciones_ocupadas_temp.append((x,y)); break
                 intentos_pos +=1
         
@@ -184,94 +476,42 @@ class MotorJuego:
                 intentos_pos = 0
                 while intentos_pos < 100:
                     ox, oy = objetivo_a_defender.x_tile, objetivo_a_defender.y_tile
-                    dist_spawn = random.randint(1,3)
-                    angle_spawn = random.uniform(0, 2 * math.pi)
+                    dist_spawn = self.rng.randint(1,3)
+                    angle_spawn = self.rng.uniform(0, 2 * math.pi)
                     dx = int(round(dist_spawn * math.cos(angle_spawn)))
                     dy = int(round(dist_spawn * math.sin(angle_spawn)))
                     x, y = ox + dx, oy + dy
                     if 0 < x < GRID_WIDTH -1 and 0 < y < GRID_HEIGHT -1 and (x,y) not in posiciones_ocupadas_temp:
-                        tipo_enemigo_azar = random.choice(tipos_enemigos_disp)
-                        enemigo = TanqueEnemigoModel(x, y, tipo_enemigo_azar, obj_id_objetivo); self._agregar_objeto(enemigo)
+                        tipo_enemigo_azar = self.rng.choice(tipos_enemigos_disp)
+                        enemigo = TanqueEnemigoModel(x, y, tipo_enemigo_azar, obj_id_objetivo, id_obj=self.ids.nuevo(), rng=self.rng); self._agregar_objeto(enemigo)
                         posiciones_ocupadas_temp.append((x,y)); break
                     intentos_pos +=1
         return True
 
-    def _cargar_nivel_desde_archivo(self, ruta_archivo):
+    def _cargar_nivel_desde_archivo(self, ruta_archivo, lineas=None, dimensiones=None):
+        # lineas: contenido ya leído (una repetición trae el nivel consigo), y
+        # dimensiones su (ancho, alto) si no es el que se deduce del texto.
+        # El archivo (texto del editor o binario .nvb) se compila una vez y se
+        # guarda en caché (backend/niveles.py); reintentar o volver a elegir el
+        # nivel solo instancia la plantilla.
         print(f"Motor: Cargando nivel desde archivo {ruta_archivo}")
         self.es_nivel_editado_actualmente = True
         try:
-            if not os.path.exists(ruta_archivo):
-                print(f"Error: Archivo de nivel no encontrado en {ruta_archivo}")
-                default_level_path = os.path.join(EDITOR_NIVELES_PATH, "nivel_defecto.txt")
-                if os.path.exists(default_level_path):
-                    print(f"Intentando cargar nivel por defecto: {default_level_path}")
-                    ruta_archivo = default_level_path
-                else:
-                    print("Error: No se encontró ni el nivel solicitado ni un nivel por defecto.")
-                    return False
-
-            with open(ruta_archivo, 'r') as f:
-                lines = f.readlines()
-            
-            posicion_jugador_encontrada = None
-            objetos_para_agregar_temp = []
-            enemigos_temp_con_objetivo = []
-
-            for r, line in enumerate(lines):
-                if r >= GRID_HEIGHT: continue
-                for c, char_tile in enumerate(line.strip()):
-                    if c >= GRID_WIDTH: continue
-                    
-                    tipo_objeto_modelo = EDITOR_CHAR_TO_TYPE.get(char_tile)
-                    if tipo_objeto_modelo is None and char_tile != EDITOR_CHAR_VACIO:
-                        print(f"Advertencia: Caracter '{char_tile}' desconocido en ({r},{c}) del archivo de nivel. Se ignora.")
-                        continue
-                    
-                    if tipo_objeto_modelo == TIPO_JUGADOR:
-                        if posicion_jugador_encontrada:
-                            print("Advertencia: Múltiples jugadores definidos. Usando el primero.")
-                        else:
-                            posicion_jugador_encontrada = (c, r)
-                    elif tipo_objeto_modelo == TIPO_MURO:
-                        objetos_para_agregar_temp.append(MuroModel(c, r))
-                    elif tipo_objeto_modelo == TIPO_ENEMIGO_NORMAL:
-                        enemigos_temp_con_objetivo.append((TanqueEnemigoModel(c, r, TIPO_ENEMIGO_NORMAL), None))
-                    elif tipo_objeto_modelo == TIPO_ENEMIGO_RAPIDO:
-                        enemigos_temp_con_objetivo.append((TanqueEnemigoModel(c, r, TIPO_ENEMIGO_RAPIDO), None))
-                    elif tipo_objeto_modelo == TIPO_ENEMIGO_FUERTE:
-                        enemigos_temp_con_objetivo.append((TanqueEnemigoModel(c, r, TIPO_ENEMIGO_FUERTE), None))
-                    elif tipo_objeto_modelo == TIPO_OBJETIVO1:
-                        objetos_para_agregar_temp.append(ObjetivoPrimarioModel(c, r, TIPO_OBJETIVO1))
-                    elif tipo_objeto_modelo == TIPO_OBJETIVO2:
-                        objetos_para_agregar_temp.append(ObjetivoPrimarioModel(c, r, TIPO_OBJETIVO2))
-            
-            if not posicion_jugador_encontrada:
-                print("Error: No se encontró jugador. Colocando uno por defecto.")
-                posicion_jugador_encontrada = (GRID_WIDTH // 2, GRID_HEIGHT // 2)
-            
-            spawn_x, spawn_y = posicion_jugador_encontrada
-            jugador_obj_existente = self.objetos_del_juego.get(self.jugador_id) if self.jugador_id else None
-            if jugador_obj_existente and isinstance(jugador_obj_existente, TanqueJugadorModel):
-                self._actualizar_mapa_colisiones_objeto(jugador_obj_existente, agregar=False)
-                jugador_obj_existente.reset_para_nuevo_nivel(spawn_x, spawn_y)
-                self._agregar_objeto(jugador_obj_existente)
-                self.last_player_tile_pos_for_enemy_logic = (jugador_obj_existente.x_tile, jugador_obj_existente.y_tile)
+            if lineas is not None:
+                plantilla = compilar_nivel(lineas, *(dimensiones or (None, None)))
+                for aviso in plantilla.avisos: print(aviso)
             else:
-                jugador = TanqueJugadorModel(spawn_x, spawn_y)
-                self._agregar_objeto(jugador)
-                self.jugador_id = jugador.id
-                self.last_player_tile_pos_for_enemy_logic = (jugador.x_tile, jugador.y_tile)
-            
-            for obj_modelo in objetos_para_agregar_temp:
-                self._agregar_objeto(obj_modelo)
-            
-            objetivos_en_mapa = [obj for obj in self.objetos_del_juego.values() if isinstance(obj, ObjetivoPrimarioModel)]
-            
-            for enemigo_model, _ in enemigos_temp_con_objetivo:
-                if objetivos_en_mapa:
-                    enemigo_model.objetivo_primario_id_asignado = random.choice(objetivos_en_mapa).id
-                self._agregar_objeto(enemigo_model)
-            
+                if not os.path.exists(ruta_archivo):
+                    print(f"Error: Archivo de nivel no encontrado en {ruta_archivo}")
+                    default_level_path = os.path.join(EDITOR_NIVELES_PATH, "nivel_defecto.txt")
+                    if os.path.exists(default_level_path):
+                        print(f"Intentando cargar nivel por defecto: {default_level_path}")
+                        ruta_archivo = default_level_path
+                    else:
+                        print("Error: No se encontró ni el nivel solicitado ni un nivel por defecto.")
+                        return False
+                plantilla = cargar_plantilla(ruta_archivo)
+            self._instanciar_plantilla(plantilla)
             return True
 
         except FileNotFoundError:
@@ -281,7 +521,49 @@ class MotorJuego:
             print(f"Error al cargar nivel desde archivo {ruta_archivo}: {e}")
             return False
 
-    def cargar_nivel(self, nivel_id_o_ruta):
+    def _instanciar_plantilla(self, plantilla):
+        # Mismo orden que la lectura casilla a casilla de antes: ids de enemigos y
+        # objetivos en orden de lectura, luego el jugador, y un rng.choice por enemigo.
+        # El mundo toma las dimensiones del nivel (la vista lo recorre con una cámara)
+        self.ocupacion.redimensionar(plantilla.ancho, plantilla.alto)
+        ids = self.ids
+        rng = self.rng
+        enemigos = []
+        objetivos = []
+        for tipo, x, y in plantilla.entidades:
+            if tipo == TIPO_OBJETIVO1 or tipo == TIPO_OBJETIVO2:
+                objetivos.append(ObjetivoPrimarioModel(x, y, tipo, id_obj=ids.nuevo()))
+            else:
+                enemigos.append(TanqueEnemigoModel(x, y, tipo, id_obj=ids.nuevo(), rng=rng))
+
+        if plantilla.jugador is not None:
+            spawn_x, spawn_y = plantilla.jugador
+        else:
+            print("Error: No se encontró jugador. Colocando uno por defecto.")
+            spawn_x, spawn_y = plantilla.ancho // 2, plantilla.alto // 2
+        jugador_obj_existente = self.objetos_del_juego.get(self.jugador_id) if self.jugador_id else None
+        if jugador_obj_existente and isinstance(jugador_obj_existente, TanqueJugadorModel):
+            self._liberar_ocupacion_objeto(jugador_obj_existente)
+            jugador_obj_existente.reset_para_nuevo_nivel(spawn_x, spawn_y)
+            self._agregar_objeto(jugador_obj_existente)
+            self.last_player_tile_pos_for_enemy_logic = (jugador_obj_existente.x_tile, jugador_obj_existente.y_tile)
+        else:
+            jugador = TanqueJugadorModel(spawn_x, spawn_y, id_obj=ids.nuevo())
+            self._agregar_objeto(jugador)
+            self.jugador_id = jugador.id
+            self.last_player_tile_pos_for_enemy_logic = (jugador.x_tile, jugador.y_tile)
+
+        self.ocupacion.cargar_muros(plantilla.muros)
+        for objetivo in objetivos:
+            self._agregar_objeto(objetivo)
+
+        objetivos_en_mapa = list(self.objetivos.values())
+        for enemigo in enemigos:
+            if objetivos_en_mapa:
+                enemigo.objetivo_primario_id_asignado = rng.choice(objetivos_en_mapa).id
+            self._agregar_objeto(enemigo)
+
+    def cargar_nivel(self, nivel_id_o_ruta, lineas=None, dimensiones=None):
         self._limpiar_estado_nivel()
         self.nivel_actual_numero = nivel_id_o_ruta
         
@@ -291,11 +573,10 @@ class MotorJuego:
                 return False
             exito_carga = self._cargar_nivel_procedural(nivel_id_o_ruta)
         elif isinstance(nivel_id_o_ruta, str):
-            if not os.path.isabs(nivel_id_o_ruta) and not nivel_id_o_ruta.startswith(EDITOR_NIVELES_PATH):
-                 if not nivel_id_o_ruta.endswith(".txt"): nivel_id_o_ruta += ".txt"
-                 nivel_id_o_ruta = os.path.join(EDITOR_NIVELES_PATH, nivel_id_o_ruta)
-            
-            exito_carga = self._cargar_nivel_desde_archivo(nivel_id_o_ruta)
+            # Nombre sin extensión: el .txt o el .nvb de niveles_editados
+            nivel_id_o_ruta = resolver_ruta_nivel(nivel_id_o_ruta)
+
+            exito_carga = self._cargar_nivel_desde_archivo(nivel_id_o_ruta, lineas, dimensiones)
             if exito_carga: self.nivel_actual_numero = nivel_id_o_ruta
         else:
             print(f"Error: Identificador de nivel desconocido: {nivel_id_o_ruta}")
@@ -314,42 +595,65 @@ class MotorJuego:
 
 
     def _es_posicion_valida_y_libre(self, x_tile, y_tile, para_objeto_id=None, considerar_tanques=True):
-        if not (0 <= x_tile < GRID_WIDTH and 0 <= y_tile < GRID_HEIGHT): return False
-        objetos_ids_en_celda = self.mapa_colisiones.get((x_tile, y_tile), [])
-        for obj_id_en_celda in objetos_ids_en_celda:
-            if para_objeto_id and obj_id_en_celda == para_objeto_id: continue
-            obj_colision = self.objetos_del_juego.get(obj_id_en_celda)
-            if obj_colision:
-                if isinstance(obj_colision, TanqueEnemigoModel) and obj_colision.fue_destruido_visual: continue
-                if obj_colision.activo:
-                    if obj_colision.tipo_objeto == TIPO_MURO: return False
-                    if considerar_tanques and (obj_colision.tipo_objeto == TIPO_JUGADOR or obj_colision.tipo_objeto.startswith("enemigo_")): return False
-        return True
+        if self.perfilador is not None: self.perfilador.contar("sondeos_colision")
+        return self.ocupacion.esta_libre(x_tile, y_tile, para_objeto_id, considerar_tanques)
         
-    def actualizar_estado(self, acciones_jugador, tiempo_delta_ms):
+    def actualizar_estado(self, acciones_jugador, tiempo_delta_ms, acciones_remotas=None):
+        # acciones_remotas: {id de jugador remoto: acciones} (solo en modo servidor)
         self.tiempo_ms_juego += tiempo_delta_ms
         self.ticks_logicos_actuales += 1
         tiempo_delta_s = tiempo_delta_ms / 1000.0
 
-        for obj in list(self.objetos_del_juego.values()):
-            if isinstance(obj, TanqueModel):
-                obj.update_posicion_pixel(tiempo_delta_s)
+        perfilador = self.perfilador
+        if perfilador is None:
+            return self._actualizar_fases(acciones_jugador, tiempo_delta_s, None, acciones_remotas)
+        perfilador.iniciar_tick()
+        resultado = self._actualizar_fases(acciones_jugador, tiempo_delta_s, perfilador, acciones_remotas)
+        perfilador.cerrar_tick(self.ticks_logicos_actuales)
+        return resultado
 
-        ids_a_quitar_definitivamente = []
-        for obj_id, obj in list(self.objetos_del_juego.items()):
-            if isinstance(obj, TanqueEnemigoModel) and obj.fue_destruido_visual:
-                if pygame.time.get_ticks() - obj.tiempo_destruccion_visual > obj.duracion_explosion_visual:
-                    ids_a_quitar_definitivamente.append(obj_id)
-            elif not obj.activo and obj.tipo_objeto != TIPO_JUGADOR:
-                ids_a_quitar_definitivamente.append(obj_id)
-        for obj_id in ids_a_quitar_definitivamente:
-            self._quitar_objeto(obj_id)
+    def _actualizar_fases(self, acciones_jugador, tiempo_delta_s, perfilador, acciones_remotas=None):
+        # Con el perfilado desactivado el único coste extra es comprobar perfilador is not None
+        self._interpolar_tanques(tiempo_delta_s)
+        self._sincronizar_oponente()
+        if perfilador is not None: perfilador.marcar("interpolacion")
+
+        self._barrer_objetos_inactivos()
+        if perfilador is not None: perfilador.marcar("barrido")
 
         jugador = self.objetos_del_juego.get(self.jugador_id)
         if not jugador or not jugador.activo: return GAME_OVER
 
-        current_player_pos_tile_before_move = (jugador.x_tile, jugador.y_tile)
-        
+        self._procesar_acciones_jugador(jugador, acciones_jugador)
+        if acciones_remotas:
+            for remoto_id, acciones_remoto in acciones_remotas.items():
+                remoto = self.tanques.get(remoto_id)
+                if remoto is not None and remoto.activo:
+                    self._procesar_acciones_jugador(remoto, acciones_remoto, principal=False)
+        if perfilador is not None: perfilador.marcar("jugador")
+
+        self._actualizar_ia_enemigos(jugador)
+        if perfilador is not None: perfilador.marcar("ia_enemigos")
+
+        self._actualizar_balas(tiempo_delta_s)
+        if perfilador is not None: perfilador.marcar("balas")
+
+        resultado = self._comprobar_fin_de_nivel(jugador)
+        if perfilador is not None: perfilador.marcar("victoria")
+        return resultado
+
+    def _barrer_objetos_inactivos(self):
+        if not self.pendientes_de_quitar: return
+        ahora_ms = self.reloj_ms()
+        for obj_id in list(self.pendientes_de_quitar):
+            obj = self.objetos_del_juego.get(obj_id)
+            if isinstance(obj, TanqueEnemigoModel) and obj.fue_destruido_visual:
+                if ahora_ms - obj.tiempo_destruccion_visual <= obj.duracion_explosion_visual:
+                    continue # Sigue explotando
+            if obj is None: self.pendientes_de_quitar.discard(obj_id)
+            else: self._quitar_objeto(obj_id)
+
+    def _procesar_acciones_jugador(self, jugador, acciones_jugador, principal=True):
         # Lógica de movimiento del jugador
         # MEJORADO: Permitir iniciar nuevo movimiento si está cerca de completar el actual
         puede_iniciar_nuevo_movimiento = not jugador.is_moving
@@ -374,31 +678,39 @@ class MotorJuego:
                 nueva_x_j = jugador.x_tile + jugador.accion_actual[0]
                 nueva_y_j = jugador.y_tile + jugador.accion_actual[1]
                 if self._es_posicion_valida_y_libre(nueva_x_j, nueva_y_j, para_objeto_id=jugador.id):
-                    self._actualizar_mapa_colisiones_objeto(jugador, agregar=False)
-                    jugador.iniciar_movimiento_a_casilla(nueva_x_j, nueva_y_j)
-                    self._actualizar_mapa_colisiones_objeto(jugador, agregar=True)
+                    self._iniciar_movimiento_tanque(jugador, nueva_x_j, nueva_y_j)
         
         # Lógica de disparo del jugador
         if acciones_jugador.get("disparar") and jugador.puede_disparar(self.tiempo_ms_juego):
             jugador.registrar_disparo(self.tiempo_ms_juego)
-            start_pixel_x = jugador.pixel_x + TILE_SIZE / 2 + jugador.direccion_actual[0] * (TILE_SIZE / 2)
-            start_pixel_y = jugador.pixel_y + TILE_SIZE / 2 + jugador.direccion_actual[1] * (TILE_SIZE / 2)
-            bala = BalaModel(start_pixel_x, start_pixel_y, jugador.direccion_actual, self.jugador_id, TIPO_JUGADOR)
-            self._agregar_objeto(bala)
-            if self.player_shoot_sound and pygame.mixer.get_init():
-                try: self.player_shoot_sound.play()
-                except pygame.error as e: print(f"Error al reproducir sonido de disparo del jugador: {e}")
-
-        if (jugador.x_tile, jugador.y_tile) != current_player_pos_tile_before_move:
-            self.last_player_tile_pos_for_enemy_logic = (jugador.x_tile, jugador.y_tile)
+            self._disparar(jugador, TIPO_JUGADOR)
+            if principal: self._reproducir_sonido(self.player_shoot_sound)
 
-        # Lógica de IA de Enemigos
-        tanques_enemigos_ids = [obj_id for obj_id, obj in self.objetos_del_juego.items() if isinstance(obj, TanqueEnemigoModel) and obj.activo]
-        for tanque_id in tanques_enemigos_ids:
-            tanque = self.objetos_del_juego.get(tanque_id)
-            if not tanque or tanque.is_moving: continue
+        # x_tile solo cambia al terminar la interpolación, así que se compara con la
+        # última posición conocida y no con la del inicio de esta fase
+        if principal and (jugador.x_tile, jugador.y_tile) != self.last_player_tile_pos_for_enemy_logic:
+            self.last_player_tile_pos_for_enemy_logic = (jugador.x_tile, jugador.y_tile)
 
-            pos_j_actual_para_enemigo = self.last_player_tile_pos_for_enemy_logic or (jugador.x_tile, jugador.y_tile)
+    def _actualizar_ia_enemigos(self, jugador_principal):
+        enemigos_activos = [tanque for tanque in self.enemigos.values() if tanque.activo]
+        pos_principal = self.last_player_tile_pos_for_enemy_logic or (jugador_principal.x_tile, jugador_principal.y_tile)
+        # Con jugadores remotos cada enemigo va a por el más cercano
+        jugadores = [jugador_principal]
+        for remoto_id in self.jugadores_remotos_ids:
+            remoto = self.tanques.get(remoto_id)
+            if remoto is not None and remoto.activo: jugadores.append(remoto)
+        if enemigos_activos and self.usar_campo_flujo:
+            objetivo_campo = pos_principal if len(jugadores) == 1 else \
+                (pos_principal, *((remoto.x_tile, remoto.y_tile) for remoto in jugadores[1:]))
+            recalculado = self.campo_flujo.actualizar(objetivo_campo)
+            if recalculado and self.perfilador is not None: self.perfilador.contar("campo_flujo_recalculos")
+        for tanque in enemigos_activos:
+            if tanque.is_moving: continue
+
+            jugador = jugador_principal
+            if len(jugadores) > 1:
+                jugador = min(jugadores, key=lambda candidato: tanque.pos_distancia_sq((candidato.x_tile, candidato.y_tile)))
+            pos_j_actual_para_enemigo = pos_principal if jugador is jugador_principal else (jugador.x_tile, jugador.y_tile)
             
             # --- JERARQUÍA DE DECISIONES DE LA IA ---
             
@@ -416,63 +728,44 @@ class MotorJuego:
                 # Disparar si puede
                 if tanque.puede_disparar(self.tiempo_ms_juego):
                     tanque.registrar_disparo(self.tiempo_ms_juego)
-                    start_pixel_x = tanque.pixel_x + TILE_SIZE / 2 + tanque.direccion_actual[0] * (TILE_SIZE / 2)
-                    start_pixel_y = tanque.pixel_y + TILE_SIZE / 2 + tanque.direccion_actual[1] * (TILE_SIZE / 2)
-                    bala = BalaModel(start_pixel_x, start_pixel_y, tanque.direccion_actual, tanque.id, tanque.tipo_objeto)
-                    self._agregar_objeto(bala)
+                    self._disparar(tanque, tanque.tipo_objeto)
                 continue # Si puede atacar, no hace nada más este frame
 
             # 2. PRIORIDAD: PERSEGUIR AL JUGADOR
-            jugador_se_movio = tanque.ultima_pos_jugador_vista_para_ruta != pos_j_actual_para_enemigo
-            tanque.ticks_para_recalcular_ruta -= 1  # Decrementar el timer cada frame
-            if tanque.debe_recalcular_ruta(pos_j_actual_para_enemigo, jugador_se_movio):
-                pos_e_actual = (tanque.x_tile, tanque.y_tile)
-                nueva_ruta = self._encontrar_ruta_a_estrella(pos_e_actual, pos_j_actual_para_enemigo)
-                if nueva_ruta and len(nueva_ruta) > 1:
-                    tanque.ruta_actual_tiles = nueva_ruta[1:]
-                else:
-                    tanque.ruta_actual_tiles = []
-                tanque.reset_timer_recalcular_ruta()
-                tanque.ultima_pos_jugador_vista_para_ruta = pos_j_actual_para_enemigo
-
             accion_movimiento_definida = STAY
-            if tanque.ruta_actual_tiles:
-                siguiente_paso = tanque.ruta_actual_tiles[0]
-                if self._es_posicion_valida_y_libre(siguiente_paso[0], siguiente_paso[1], para_objeto_id=tanque.id):
-                    dx, dy = siguiente_paso[0] - tanque.x_tile, siguiente_paso[1] - tanque.y_tile
-                    if dx > 0: accion_movimiento_definida = RIGHT
-                    elif dx < 0: accion_movimiento_definida = LEFT
-                    elif dy > 0: accion_movimiento_definida = DOWN
-                    elif dy < 0: accion_movimiento_definida = UP
+            if self.usar_campo_flujo:
+                paso_campo = self.campo_flujo.siguiente_paso(tanque.x_tile, tanque.y_tile, para_objeto_id=tanque.id)
+                if paso_campo is not None:
+                    accion_movimiento_definida = paso_campo
                 else:
-                    tanque.ruta_actual_tiles = [] # Ruta bloqueada, forzar recálculo la próxima vez
+                    # Jugador inalcanzable: acercarse en la dirección general
+                    accion_movimiento_definida = self._direccion_general_hacia(tanque, pos_j_actual_para_enemigo)
             else:
-                # NUEVO: Si no hay ruta, intentar moverse hacia la dirección general del jugador
-                dx_general = pos_j_actual_para_enemigo[0] - tanque.x_tile
-                dy_general = pos_j_actual_para_enemigo[1] - tanque.y_tile
-                
-                # Intentar moverse en la dirección con mayor diferencia
-                direcciones_intentar = []
-                if abs(dx_general) > abs(dy_general):
-                    # Priorizar movimiento horizontal
-                    if dx_general > 0:
-                        direcciones_intentar = [RIGHT, DOWN if dy_general > 0 else UP, LEFT]
+                jugador_se_movio = tanque.ultima_pos_jugador_vista_para_ruta != pos_j_actual_para_enemigo
+                tanque.ticks_para_recalcular_ruta -= 1  # Decrementar el timer cada frame
+                if tanque.debe_recalcular_ruta(pos_j_actual_para_enemigo, jugador_se_movio):
+                    pos_e_actual = (tanque.x_tile, tanque.y_tile)
+                    nueva_ruta = self._encontrar_ruta_a_estrella(pos_e_actual, pos_j_actual_para_enemigo)
+                    if nueva_ruta and len(nueva_ruta) > 1:
+                        tanque.ruta_actual_tiles = nueva_ruta[1:]
                     else:
-                        direcciones_intentar = [LEFT, DOWN if dy_general > 0 else UP, RIGHT]
-                else:
-                    # Priorizar movimiento vertical
-                    if dy_general > 0:
-                        direcciones_intentar = [DOWN, RIGHT if dx_general > 0 else LEFT, UP]
+                        tanque.ruta_actual_tiles = []
+                    tanque.reset_timer_recalcular_ruta()
+                    tanque.ultima_pos_jugador_vista_para_ruta = pos_j_actual_para_enemigo
+
+                if tanque.ruta_actual_tiles:
+                    siguiente_paso = tanque.ruta_actual_tiles[0]
+                    if self._es_posicion_valida_y_libre(siguiente_paso[0], siguiente_paso[1], para_objeto_id=tanque.id):
+                        dx, dy = siguiente_paso[0] - tanque.x_tile, siguiente_paso[1] - tanque.y_tile
+                        if dx > 0: accion_movimiento_definida = RIGHT
+                        elif dx < 0: accion_movimiento_definida = LEFT
+                        elif dy > 0: accion_movimiento_definida = DOWN
+                        elif dy < 0: accion_movimiento_definida = UP
                     else:
-                        direcciones_intentar = [UP, RIGHT if dx_general > 0 else LEFT, DOWN]
-                
-                # Intentar cada dirección hasta encontrar una válida
-                for dir_intento in direcciones_intentar:
-                    nueva_x = tanque.x_tile + dir_intento[0]
-                    nueva_y = tanque.y_tile + dir_intento[1]
-                    if self._es_posicion_valida_y_libre(nueva_x, nueva_y, para_objeto_id=tanque.id):
-                        accion_movimiento_definida = dir_intento
-                        break
+                        tanque.ruta_actual_tiles = [] # Ruta bloqueada, forzar recálculo la próxima vez
+                else:
+                    # NUEVO: Si no hay ruta, intentar moverse hacia la dirección general del jugador
+                    accion_movimiento_definida = self._direccion_general_hacia(tanque, pos_j_actual_para_enemigo)
             
             # 3. PLAN B: PATRULLA ACTIVA SI NO HAY NADA MEJOR QUE HACER
             if accion_movimiento_definida == STAY:
@@ -485,7 +778,7 @@ class MotorJuego:
                         if self._es_posicion_valida_y_libre(pos_intento_x, pos_intento_y, para_objeto_id=tanque.id):
                             direcciones_validas.append(dir_intento)
                     if direcciones_validas:
-                        tanque.direccion_patrulla_actual = random.choice(direcciones_validas)
+                        tanque.direccion_patrulla_actual = self.rng.choice(direcciones_validas)
                     else:
                         tanque.direccion_patrulla_actual = STAY
                     tanque.ticks_para_nueva_decision_patrulla = tanque.frecuencia_decision_patrulla
@@ -497,53 +790,39 @@ class MotorJuego:
                 nueva_x = tanque.x_tile + tanque.accion_actual[0]
                 nueva_y = tanque.y_tile + tanque.accion_actual[1]
                 if self._es_posicion_valida_y_libre(nueva_x, nueva_y, para_objeto_id=tanque.id):
-                    self._actualizar_mapa_colisiones_objeto(tanque, agregar=False)
-                    tanque.iniciar_movimiento_a_casilla(nueva_x, nueva_y)
-                    self._actualizar_mapa_colisiones_objeto(tanque, agregar=True)
+                    self._iniciar_movimiento_tanque(tanque, nueva_x, nueva_y)
                     # Consumir el paso de la ruta si se movió exitosamente
                     if tanque.ruta_actual_tiles:
                         tanque.ruta_actual_tiles.pop(0)
 
-        # Lógica de Balas
-        balas_a_quitar_ids = []
-        for bala in [obj for obj in self.objetos_del_juego.values() if isinstance(obj, BalaModel)]:
-            if not bala.activo: continue
-
-            distancia_a_mover = VELOCIDAD_BALA * TILE_SIZE * 30 * tiempo_delta_s
-            bala.pixel_x += bala.direccion_vector[0] * distancia_a_mover
-            bala.pixel_y += bala.direccion_vector[1] * distancia_a_mover
-            
-            nueva_tile_x = int(bala.pixel_x / TILE_SIZE)
-            nueva_tile_y = int(bala.pixel_y / TILE_SIZE)
-
-            if not (0 <= nueva_tile_x < GRID_WIDTH and 0 <= nueva_tile_y < GRID_HEIGHT):
-                bala.activo = False
-                balas_a_quitar_ids.append(bala.id)
-                continue
-
-            bala.x_tile = nueva_tile_x
-            bala.y_tile = nueva_tile_y
-
-            ids_en_casilla = self.mapa_colisiones.get((bala.x_tile, bala.y_tile), [])
-            for obj_id in ids_en_casilla:
-                if not bala.activo: break
-                obj_colision = self.objetos_del_juego.get(obj_id)
-                if obj_colision and obj_colision.id != bala.propietario_id and obj_colision.activo:
-                    bala_rect = pygame.Rect(bala.pixel_x, bala.pixel_y, TILE_SIZE / 4, TILE_SIZE / 4)
-                    obj_rect = pygame.Rect(obj_colision.pixel_x, obj_colision.pixel_y, TILE_SIZE, TILE_SIZE)
-
-                    if bala_rect.colliderect(obj_rect):
-                        bala.activo = False
-                        balas_a_quitar_ids.append(bala.id)
-                        if isinstance(obj_colision, TanqueModel):
-                            obj_colision.recibir_impacto()
-                        elif isinstance(obj_colision, ObjetivoPrimarioModel) and bala.tipo_propietario == TIPO_JUGADOR:
-                            obj_colision.ser_destruido()
-                        break
-        
-        for bala_id in balas_a_quitar_ids:
-            self._quitar_objeto(bala_id)
-
+    def _disparar(self, tanque, tipo_propietario):
+        # La bala sale del borde del tanque en la dirección del cañón
+        start_pixel_x = tanque.pixel_x + TILE_SIZE / 2 + tanque.direccion_actual[0] * (TILE_SIZE / 2)
+        start_pixel_y = tanque.pixel_y + TILE_SIZE / 2 + tanque.direccion_actual[1] * (TILE_SIZE / 2)
+        self.balas.crear(start_pixel_x, start_pixel_y, tanque.direccion_actual, tanque.id, tipo_propietario, self.ids.nuevo())
+        if tipo_propietario == TIPO_JUGADOR: self.disparos_jugador += 1
+        else: self.disparos_enemigos += 1
+        if self.perfilador is not None: self.perfilador.contar("objetos_creados")
+
+    def _actualizar_balas(self, tiempo_delta_s):
+        balas = self.balas
+        if not balas.activas: return
+        # Primero se integran todas y luego cada una recorre, casilla a casilla,
+        # el tramo que ha barrido en este paso: así no atraviesa muros ni tanques
+        # aunque el paso sea largo (dt grande o tick de lógica lento)
+        balas.avanzar(VELOCIDAD_BALA * TILE_SIZE * 30 * tiempo_delta_s)
+        for slot, obj_colision in balas.resolver_impactos(self.ocupacion, self.objetos_del_juego, TILE_SIZE / 4):
+            if isinstance(obj_colision, TanqueModel):
+                if obj_colision.recibir_impacto(self.reloj_ms()):
+                    self._marcar_destruido(obj_colision)
+            elif isinstance(obj_colision, ObjetivoPrimarioModel) and balas.tipo_propietario[slot] == TIPO_JUGADOR:
+                if obj_colision.ser_destruido():
+                    self._marcar_destruido(obj_colision)
+
+        liberadas = balas.compactar()
+        if liberadas and self.perfilador is not None: self.perfilador.contar("objetos_destruidos", liberadas)
+
+    def _comprobar_fin_de_nivel(self, jugador):
         if not jugador.activo: return GAME_OVER
         if self._todos_objetivos_destruidos():
             if self.es_nivel_editado_actualmente: return VICTORIA_FINAL
@@ -552,57 +831,48 @@ class MotorJuego:
         
         return JUGANDO
 
+    def _direccion_general_hacia(self, tanque, pos_destino):
+        dx_general = pos_destino[0] - tanque.x_tile
+        dy_general = pos_destino[1] - tanque.y_tile
+        
+        # Intentar moverse en la dirección con mayor diferencia
+        direcciones_intentar = []
+        if abs(dx_general) > abs(dy_general):
+            # Priorizar movimiento horizontal
+            if dx_general > 0:
+                direcciones_intentar = [RIGHT, DOWN if dy_general > 0 else UP, LEFT]
+            else:
+                direcciones_intentar = [LEFT, DOWN if dy_general > 0 else UP, RIGHT]
+        else:
+            # Priorizar movimiento vertical
+            if dy_general > 0:
+                direcciones_intentar = [DOWN, RIGHT if dx_general > 0 else LEFT, UP]
+            else:
+                direcciones_intentar = [UP, RIGHT if dx_general > 0 else LEFT, DOWN]
+        
+        # Intentar cada dirección hasta encontrar una válida
+        for dir_intento in direcciones_intentar:
+            nueva_x = tanque.x_tile + dir_intento[0]
+            nueva_y = tanque.y_tile + dir_intento[1]
+            if self._es_posicion_valida_y_libre(nueva_x, nueva_y, para_objeto_id=tanque.id):
+                return dir_intento
+        return STAY
+
     def _linea_de_vision_libre(self, origen_obj, destino_obj):
         if not origen_obj or not destino_obj: return False
-        x1, y1 = origen_obj.x_tile, origen_obj.y_tile; x2, y2 = destino_obj.x_tile, destino_obj.y_tile
-        if x1 == x2:
-            for y_intermedio in range(min(y1, y2) + 1, max(y1, y2)):
-                ids_en_tile = self.mapa_colisiones.get((x1, y_intermedio), [])
-                if any(isinstance(self.objetos_del_juego.get(oid), MuroModel) for oid in ids_en_tile if self.objetos_del_juego.get(oid) and self.objetos_del_juego.get(oid).activo): return False
-            return True
-        elif y1 == y2:
-            for x_intermedio in range(min(x1, x2) + 1, max(x1, x2)):
-                ids_en_tile = self.mapa_colisiones.get((x_intermedio, y1), [])
-                if any(isinstance(self.objetos_del_juego.get(oid), MuroModel) for oid in ids_en_tile if self.objetos_del_juego.get(oid) and self.objetos_del_juego.get(oid).activo): return False
-            return True
-        return False
+        if self.perfilador is not None: self.perfilador.contar("sondeos_vision")
+        return self.indice_vision.hay_linea_de_vision(origen_obj.x_tile, origen_obj.y_tile, destino_obj.x_tile, destino_obj.y_tile)
 
     def _encontrar_ruta_a_estrella(self, inicio, fin):
-        frontera = [(0, 0, inicio, [])]
-        visitados = set()
-        visitados.add(inicio)
-
-        while frontera:
-            _, costo_actual, pos_actual, camino = heapq.heappop(frontera)
-
-            if pos_actual == fin:
-                return camino + [pos_actual]
-
-            for direccion in DIRECTIONS:
-                vecino = (pos_actual[0] + direccion[0], pos_actual[1] + direccion[1])
-
-                if self._es_posicion_valida_y_libre(vecino[0], vecino[1], considerar_tanques=False) and vecino not in visitados:
-                    visitados.add(vecino)
-                    nuevo_costo = costo_actual + 1
-                    
-                    heuristica = abs(vecino[0] - fin[0]) + abs(vecino[1] - fin[1])
-                    costo_total_estimado = nuevo_costo + heuristica
-                    
-                    heapq.heappush(frontera, (costo_total_estimado, nuevo_costo, vecino, camino + [pos_actual]))
-        
-        return None 
+        ruta = self.buscador_rutas.buscar(inicio, fin)
+        if self.perfilador is not None:
+            self.perfilador.contar("a_estrella_busquedas")
+            self.perfilador.contar("a_estrella_expansiones", self.buscador_rutas.ultimas_expansiones)
+        return ruta
 
 
     def _todos_objetivos_destruidos(self):
-        objetivos_totales_en_nivel = 0
-        objetivos_activos = 0
-        for obj in self.objetos_del_juego.values():
-            if isinstance(obj, ObjetivoPrimarioModel):
-                objetivos_totales_en_nivel +=1
-                if obj.activo:
-                    objetivos_activos +=1
-        
-        if objetivos_totales_en_nivel == 0:
+        if self.objetivos_totales == 0:
             if (isinstance(self.nivel_actual_numero, int) and self.nivel_actual_numero == 0) or \
                (isinstance(self.nivel_actual_numero, str) and not self.es_nivel_editado_actualmente):
                 return False
@@ -610,15 +880,25 @@ class MotorJuego:
             print("Info: No hay objetivos definidos en este nivel. Considerado como completado.")
             return True
 
-        return objetivos_activos == 0
+        return self.objetivos_vivos == 0
+
+    def _vista_muros_actual(self):
+        # Los muros solo cambian con version_muros: la lista de casillas se reutiliza
+        if self._version_vista_muros != self.ocupacion.version_muros:
+            self._vista_muros = self.ocupacion.casillas_con_muro()
+            self._version_vista_muros = self.ocupacion.version_muros
+        return self._vista_muros
 
-    def get_estado_para_vista(self):
+    def get_estado_para_vista(self, alfa=1.0):
+        # alfa en [0, 1] es la fracción del tick siguiente ya transcurrida: las
+        # posiciones se interpolan entre el tick anterior y el actual
         vista_objetos = []
         enemigos_destruyendose_vista = []
+        ahora_ms = self.reloj_ms()
 
-        for obj_modelo in list(self.objetos_del_juego.values()):
+        for obj_modelo in [*self.objetivos.values(), *self.tanques.values()]:
             if isinstance(obj_modelo, TanqueEnemigoModel) and obj_modelo.fue_destruido_visual:
-                if pygame.time.get_ticks() - obj_modelo.tiempo_destruccion_visual <= obj_modelo.duracion_explosion_visual:
+                if ahora_ms - obj_modelo.tiempo_destruccion_visual <= obj_modelo.duracion_explosion_visual:
                     enemigos_destruyendose_vista.append({
                         "id": obj_modelo.id,
                         "x_tile": obj_modelo.x_tile,
@@ -630,8 +910,11 @@ class MotorJuego:
                 obj_id = getattr(obj_modelo, 'id', None)
                 if obj_id is None: continue
                 
-                pixel_x = getattr(obj_modelo, 'pixel_x', obj_modelo.x_tile * TILE_SIZE)
-                pixel_y = getattr(obj_modelo, 'pixel_y', obj_modelo.y_tile * TILE_SIZE)
+                pixel_x = obj_modelo.pixel_x
+                pixel_y = obj_modelo.pixel_y
+                if alfa < 1.0 and isinstance(obj_modelo, TanqueModel):
+                    pixel_x = obj_modelo.pixel_x_anterior + (pixel_x - obj_modelo.pixel_x_anterior) * alfa
+                    pixel_y = obj_modelo.pixel_y_anterior + (pixel_y - obj_modelo.pixel_y_anterior) * alfa
 
                 vista_objetos.append({
                     "id": obj_id, "tipo": obj_modelo.tipo_objeto,
@@ -640,13 +923,37 @@ class MotorJuego:
                     "direccion": getattr(obj_modelo, 'direccion_actual', None),
                     "is_moving": getattr(obj_modelo, 'is_moving', False)
                 })
+
+        balas = self.balas
+        for slot in balas.activas:
+            if not balas.viva[slot]: continue
+            pixel_x, pixel_y = balas.x[slot], balas.y[slot]
+            if alfa < 1.0:
+                pixel_x = balas.x_anterior[slot] + (pixel_x - balas.x_anterior[slot]) * alfa
+                pixel_y = balas.y_anterior[slot] + (pixel_y - balas.y_anterior[slot]) * alfa
+            vista_objetos.append({
+                "id": balas.ids[slot], "tipo": TIPO_BALA,
+                "x_tile": balas.tile_x[slot], "y_tile": balas.tile_y[slot],
+                "pixel_x": pixel_x, "pixel_y": pixel_y,
+                "direccion": None, "is_moving": False
+            })
         
         jugador_modelo = self.objetos_del_juego.get(self.jugador_id)
         vidas_jugador = 0
         if jugador_modelo and hasattr(jugador_modelo, 'vidas'): vidas_jugador = jugador_modelo.vidas
-        return {
+        estado = {
             "objetos": vista_objetos,
+            "muros": self._vista_muros_actual(),
+            "version_muros": self.ocupacion.version_muros,
+            "ancho": self.ocupacion.ancho,
+            "alto": self.ocupacion.alto,
+            "jugador_id": self.jugador_id,
             "nivel": self.nivel_actual_numero,
             "vidas_jugador": vidas_jugador,
+            "objetivos_vivos": self.objetivos_vivos,
+            "objetivos_totales": self.objetivos_totales,
             "enemigos_destruyendose": enemigos_destruyendose_vista
-        }
\ No newline at end of file
+        }
+        if self.perfilador is not None:
+            estado["perfil"] = self.perfilador.resumen()
+        return estado
\ No newline at end of file
@@ -0,0 +1,342 @@
+# backend/niveles.py
+# Compilador y caché de niveles del editor.
+# compilar_nivel() recorre el mapa de texto una sola vez y lo deja en una
+# PlantillaNivel inmutable: capa de muros como bytes (mismo formato que
+# MapaOcupacion.muros), posición del jugador y la lista de enemigos y
+# objetivos en orden de lectura (el motor reparte los ids en ese orden, así
+# que una plantilla da los mismos ids y el mismo azar que leer el archivo).
+# Cada nivel trae sus dimensiones: el mundo mide lo que el mapa, sin límite
+# por el tamaño de la ventana (la vista lo recorre con una cámara).
+# cargar_plantilla() guarda las plantillas por ruta y se fija en el mtime y
+# el tamaño del archivo: reintentar un nivel o volver a elegirlo no vuelve a
+# leer ni a analizar nada mientras el archivo no cambie (p. ej. desde el editor).
+#
+# Además del texto del editor (un carácter por casilla) hay un formato binario
+# (.nvb) pensado para mapas grandes, que se lee con mmap y sin recorrer
+# casillas en Python. Todo en little-endian:
+#   cabecera (32 bytes)  b"TKNV", versión u16, codificación de muros u16,
+#                        ancho u32, alto u32, jugador x i32, y i32 (-1 = sin
+#                        jugador), número de entidades u32, largo de metadatos u32
+#   metadatos            JSON (nombre, etc.)
+#   entidades            x u16[n], y u16[n], tipo u8[n] (índice en TIPOS_ENTIDAD_NIVEL)
+#   muros                MUROS_BITS: un bit por casilla (LSB primero), o
+#                        MUROS_TRAMOS: u32[] con largos alternos vacío/muro/vacío...
+#                        El escritor elige el más corto de los dos.
+# Conversión: python -m backend.niveles a_binario mapa.txt [salida.nvb]
+#             python -m backend.niveles a_texto mapa.nvb [salida.txt]
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+from constantes import (
+    GRID_WIDTH, GRID_HEIGHT, EDITOR_CHAR_TO_TYPE, EDITOR_CHAR_VACIO, EDITOR_TYPE_TO_CHAR,
+    EDITOR_CHAR_MURO, EDITOR_CHAR_JUGADOR, EDITOR_NIVELES_PATH,
+    EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA, EDITOR_MAX_LADO_MAPA,
+    TIPO_JUGADOR, TIPO_MURO, TIPO_ENEMIGO_NORMAL, TIPO_ENEMIGO_RAPIDO, TIPO_ENEMIGO_FUERTE,
+    TIPO_OBJETIVO1, TIPO_OBJETIVO2
+)
+
+MAGIA_NIVEL = b"TKNV"
+VERSION_NIVEL = 1
+CABECERA_NIVEL = struct.Struct("<4sHHIIiiII")
+MUROS_BITS = 0
+MUROS_TRAMOS = 1
+# Tope de casillas de un nivel binario (lo que cabe en el editor): se comprueba
+# antes de reservar la capa de muros, que un archivo corrupto pediría de GB
+MAX_CASILLAS_NIVEL = EDITOR_MAX_LADO_MAPA * EDITOR_MAX_LADO_MAPA
+# Solo puede crecer por el final
+TIPOS_ENTIDAD_NIVEL = (TIPO_ENEMIGO_NORMAL, TIPO_ENEMIGO_RAPIDO, TIPO_ENEMIGO_FUERTE, TIPO_OBJETIVO1, TIPO_OBJETIVO2)
+_INDICE_ENTIDAD = {tipo: i for i, tipo in enumerate(TIPOS_ENTIDAD_NIVEL)}
+# Byte de muros empaquetado -> sus 8 casillas (0/1), bit menos significativo primero
+_BITS_A_CASILLAS = tuple(bytes((byte >> bit) & 1 for bit in range(8)) for byte in range(256))
+_CASILLA_A_CARACTER = bytes.maketrans(b"\x00\x01", (EDITOR_CHAR_VACIO + EDITOR_CHAR_MURO).encode("ascii"))
+
+
+class ErrorNivel(Exception):
+    pass
+
+
+class PlantillaNivel:
+    __slots__ = ("ancho", "alto", "muros", "jugador", "entidades", "avisos", "metadatos")
+
+    def __init__(self, ancho, alto, muros, jugador, entidades, avisos=(), metadatos=None):
+        self.ancho = ancho
+        self.alto = alto
+        # bytes de ancho * alto (índice = y * ancho + x), 1 = muro
+        self.muros = muros
+        # (x, y) del jugador, o None si el mapa no tiene
+        self.jugador = jugador
+        # ((tipo, x, y), ...) de enemigos y objetivos en orden de lectura
+        self.entidades = entidades
+        self.avisos = avisos
+        self.metadatos = metadatos or {}
+
+    def casillas_con_muro(self):
+        ancho = self.ancho
+        return [(indice % ancho, indice // ancho) for indice, hay in enumerate(self.muros) if hay]
+
+    def a_lineas(self):
+        # El mapa en el formato de texto del editor, sin recorrer casillas vacías
+        ancho = self.ancho
+        texto = self.muros.translate(_CASILLA_A_CARACTER)
+        filas = [bytearray(texto[y * ancho:(y + 1) * ancho]) for y in range(self.alto)]
+        for tipo, x, y in self.entidades:
+            filas[y][x] = ord(EDITOR_TYPE_TO_CHAR[tipo])
+        if self.jugador is not None:
+            filas[self.jugador[1]][self.jugador[0]] = ord(EDITOR_CHAR_JUGADOR)
+        return [fila.decode("ascii") + "\n" for fila in filas]
+
+
+def dimensiones_texto(lineas):
+    # Tamaño del mundo de un mapa de texto: el del texto (sin las líneas vacías
+    # del final), nunca menor que la pantalla por defecto
+    alto = len(lineas)
+    while alto and not lineas[alto - 1].rstrip("\r\n"): alto -= 1
+    ancho = max((len(linea.rstrip("\r\n")) for linea in lineas[:alto]), default=0)
+    return max(ancho, GRID_WIDTH), max(alto, GRID_HEIGHT)
+
+
+def compilar_nivel(lineas, ancho=None, alto=None):
+    # Sin dimensiones se usan las del texto (dimensiones_texto). Lo que no cabe
+    # en ancho x alto se ignora. Solo se quita el fin de línea: los espacios
+    # del principio son casillas vacías, no sangría
+    if ancho is None or alto is None:
+        ancho_texto, alto_texto = dimensiones_texto(lineas)
+        if ancho is None: ancho = ancho_texto
+        if alto is None: alto = alto_texto
+    muros = bytearray(ancho * alto)
+    jugador = None
+    entidades = []
+    desconocidos = {}
+    jugadores_extra = 0
+    for y, linea in enumerate(lineas[:alto]):
+        fila = linea.rstrip("\r\n")[:ancho]
+        # Casi todo el mapa es vacío o muro: solo se miran de una en una las demás casillas
+        if not fila.strip(EDITOR_CHAR_VACIO): continue
+        base = y * ancho
+        for x, caracter in enumerate(fila):
+            if caracter == EDITOR_CHAR_VACIO: continue
+            tipo = EDITOR_CHAR_TO_TYPE.get(caracter)
+            if tipo == TIPO_MURO:
+                muros[base + x] = 1
+            elif tipo == TIPO_JUGADOR:
+                if jugador is None: jugador = (x, y)
+                else: jugadores_extra += 1
+            elif tipo is not None:
+                entidades.append((tipo, x, y))
+            else:
+                desconocidos[caracter] = desconocidos.get(caracter, 0) + 1
+
+    # Un aviso por tipo de problema, no uno por casilla
+    avisos = []
+    if desconocidos:
+        detalle = ", ".join(f"'{caracter}' x{veces}" for caracter, veces in sorted(desconocidos.items()))
+        avisos.append(f"Advertencia: caracteres desconocidos en el nivel ({detalle}). Se ignoran.")
+    if jugadores_extra:
+        avisos.append("Advertencia: Múltiples jugadores definidos. Usando el primero.")
+    return PlantillaNivel(ancho, alto, bytes(muros), jugador, tuple(entidades), tuple(avisos))
+
+
+def escribir_nivel_binario(plantilla, ruta, metadatos=None):
+    n = plantilla.ancho * plantilla.alto
+    bits = _empaquetar_bits(plantilla.muros)
+    tramos = _tramos_muros(plantilla.muros, len(bits) // 4)
+    if tramos is not None: codificacion, capa = MUROS_TRAMOS, tramos.tobytes()
+    else: codificacion, capa = MUROS_BITS, bits
+    if max(plantilla.ancho, plantilla.alto) > 0xFFFF or n > MAX_CASILLAS_NIVEL:
+        raise ErrorNivel("Mapa demasiado grande para el formato binario")
+    if len(plantilla.muros) != n: raise ErrorNivel("La capa de muros no coincide con las dimensiones")
+
+    datos_meta = dict(plantilla.metadatos)
+    datos_meta.update(metadatos or {})
+    meta = json.dumps(datos_meta, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    xs = array('H', (x for _, x, _ in plantilla.entidades))
+    ys = array('H', (y for _, _, y in plantilla.entidades))
+    tipos = bytes(_INDICE_ENTIDAD[tipo] for tipo, _, _ in plantilla.entidades)
+    jugador_x, jugador_y = plantilla.jugador if plantilla.jugador is not None else (-1, -1)
+    cabecera = CABECERA_NIVEL.pack(MAGIA_NIVEL, VERSION_NIVEL, codificacion, plantilla.ancho, plantilla.alto,
+                                   jugador_x, jugador_y, len(tipos), len(meta))
+    if sys.byteorder != "little":
+        xs.byteswap(); ys.byteswap()
+    with open(ruta, "wb") as f:
+        f.write(cabecera); f.write(meta); f.write(xs.tobytes()); f.write(ys.tobytes()); f.write(tipos); f.write(capa)
+
+
+def _empaquetar_bits(muros):
+    # int.from_bytes lee los bytes 0/1 como dígitos en base 256; se pasan a
+    # base 2 rehaciendo el entero desde su representación binaria en texto
+    if not muros: return b""
+    texto_bits = muros[::-1].translate(bytes.maketrans(b"\x00\x01", b"01")).decode("ascii")
+    return int(texto_bits, 2).to_bytes((len(muros) + 7) // 8, "little")
+
+
+def _tramos_muros(muros, max_tramos):
+    # Largos alternos vacío, muro, vacío... (el primero puede ser 0); None si
+    # salen más de max_tramos (entonces los bits ocupan menos)
+    tramos = array('I')
+    pos = 0
+    valor = 0
+    n = len(muros)
+    while pos < n:
+        siguiente = muros.find(b"\x01" if valor == 0 else b"\x00", pos)
+        if siguiente < 0: siguiente = n
+        tramos.append(siguiente - pos)
+        if len(tramos) >= max_tramos: return None
+        pos = siguiente
+        valor ^= 1
+    if sys.byteorder != "little": tramos.byteswap()
+    return tramos
+
+
+def leer_nivel_binario(ruta):
+    # Un archivo mal formado (vacío, cortado, metadatos ilegibles...) siempre da
+    # ErrorNivel: quien carga niveles solo espera ese error u OSError
+    with open(ruta, "rb") as f:
+        # mmap no acepta archivos vacíos: el tamaño se mira antes de mapear
+        if os.fstat(f.fileno()).st_size < CABECERA_NIVEL.size: raise ErrorNivel(f"{ruta}: archivo demasiado corto")
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as datos:
+            magia, version, codificacion, ancho, alto, jugador_x, jugador_y, n_entidades, largo_meta = \
+                CABECERA_NIVEL.unpack_from(datos, 0)
+            if magia != MAGIA_NIVEL: raise ErrorNivel(f"{ruta} no es un nivel binario")
+            if version != VERSION_NIVEL: raise ErrorNivel(f"{ruta}: versión {version} no soportada")
+            if max(ancho, alto) > 0xFFFF or ancho * alto > MAX_CASILLAS_NIVEL:
+                raise ErrorNivel(f"{ruta}: mapa de {ancho}x{alto} demasiado grande")
+            pos = CABECERA_NIVEL.size
+            # Metadatos y entidades tienen que caber enteros antes de cortar nada
+            if pos + largo_meta + 5 * n_entidades > len(datos): raise ErrorNivel(f"{ruta}: metadatos o entidades cortados")
+            try:
+                metadatos = json.loads(datos[pos:pos + largo_meta].decode("utf-8")) if largo_meta else {}
+            except ValueError as e: # UnicodeDecodeError y JSONDecodeError
+                raise ErrorNivel(f"{ruta}: metadatos ilegibles ({e})") from None
+            if not isinstance(metadatos, dict): raise ErrorNivel(f"{ruta}: los metadatos no son un objeto JSON")
+            pos += largo_meta
+            xs = array('H', datos[pos:pos + 2 * n_entidades]); pos += 2 * n_entidades
+            ys = array('H', datos[pos:pos + 2 * n_entidades]); pos += 2 * n_entidades
+            tipos = datos[pos:pos + n_entidades]; pos += n_entidades
+            if sys.byteorder != "little":
+                xs.byteswap(); ys.byteswap()
+            n = ancho * alto
+            if codificacion == MUROS_BITS:
+                capa = datos[pos:pos + (n + 7) // 8]
+                if len(capa) * 8 < n: raise ErrorNivel(f"{ruta}: capa de muros cortada")
+                muros = b"".join(map(_BITS_A_CASILLAS.__getitem__, capa))[:n]
+            elif codificacion == MUROS_TRAMOS:
+                tramos = array('I', datos[pos:len(datos) - (len(datos) - pos) % 4])
+                if sys.byteorder != "little": tramos.byteswap()
+                muros = _muros_desde_tramos(tramos, n)
+            else:
+                raise ErrorNivel(f"{ruta}: codificación de muros {codificacion} desconocida")
+    if n_entidades:
+        if max(tipos) >= len(TIPOS_ENTIDAD_NIVEL): raise ErrorNivel(f"{ruta}: tipo de entidad desconocido")
+        if max(xs) >= ancho or max(ys) >= alto: raise ErrorNivel(f"{ruta}: entidad fuera del mapa")
+    entidades = tuple(zip(map(TIPOS_ENTIDAD_NIVEL.__getitem__, tipos), xs, ys))
+    jugador = (jugador_x, jugador_y) if 0 <= jugador_x < ancho and 0 <= jugador_y < alto else None
+    # En el texto del editor cada casilla tiene un solo carácter; en binario hay
+    # que comprobar que nada cae sobre un muro ni sobre otra entidad
+    indices = [y * ancho + x for x, y in zip(xs, ys)]
+    if jugador is not None: indices.append(jugador_y * ancho + jugador_x)
+    if len(set(indices)) != len(indices): raise ErrorNivel(f"{ruta}: dos entidades en la misma casilla")
+    if any(muros[indice] for indice in indices): raise ErrorNivel(f"{ruta}: entidad sobre un muro")
+    return PlantillaNivel(ancho, alto, muros, jugador, entidades, metadatos=metadatos)
+
+
+def _muros_desde_tramos(tramos, n):
+    if sum(tramos) != n: raise ErrorNivel("Los tramos de muros no cubren el mapa")
+    muros = bytearray(n)
+    pos = 0
+    for i, largo in enumerate(tramos):
+        if i & 1: muros[pos:pos + largo] = b"\x01" * largo
+        pos += largo
+    return bytes(muros)
+
+
+def leer_plantilla(ruta):
+    # Sin caché: según la extensión, texto del editor o binario
+    if ruta.endswith(EDITOR_EXTENSION_BINARIA): return leer_nivel_binario(ruta)
+    with open(ruta, 'r') as f:
+        return compilar_nivel(f.readlines())
+
+
+def resolver_ruta_nivel(nombre):
+    # "Rojo", "Rojo.txt" o una ruta: con extensión se usa tal cual; sin ella,
+    # el .txt o el .nvb de niveles_editados (el más reciente si están los dos)
+    if nombre.endswith((EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA)):
+        ruta = nombre
+    else:
+        candidatas = [nombre + extension for extension in (EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA)]
+        existentes = [c for c in candidatas if os.path.exists(_en_carpeta_niveles(c))]
+        ruta = max(existentes, key=lambda c: os.path.getmtime(_en_carpeta_niveles(c))) if existentes else candidatas[0]
+    return _en_carpeta_niveles(ruta)
+
+
+def niveles_guardados():
+    # Nombres (sin extensión) de los niveles de niveles_editados, en orden
+    if not os.path.isdir(EDITOR_NIVELES_PATH): return []
+    niveles = set()
+    for archivo in os.listdir(EDITOR_NIVELES_PATH):
+        nombre, extension = os.path.splitext(archivo)
+        if extension in (EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA):
+            niveles.add(nombre) # Un nivel guardado en los dos formatos sale una vez
+    return sorted(niveles)
+
+
+def _en_carpeta_niveles(ruta):
+    if os.path.isabs(ruta) or ruta.startswith(EDITOR_NIVELES_PATH): return ruta
+    return os.path.join(EDITOR_NIVELES_PATH, ruta)
+
+
+# ruta -> (mtime_ns, tamaño, plantilla)
+_CACHE_PLANTILLAS = {}
+
+
+def cargar_plantilla(ruta):
+    # Lanza OSError si el archivo no existe o no se puede leer, ErrorNivel si
+    # un binario está mal formado
+    estado = os.stat(ruta)
+    guardada = _CACHE_PLANTILLAS.get(ruta)
+    if guardada is not None and guardada[0] == estado.st_mtime_ns and guardada[1] == estado.st_size:
+        return guardada[2]
+    plantilla = leer_plantilla(ruta)
+    for aviso in plantilla.avisos: print(f"{aviso} ({ruta})")
+    _CACHE_PLANTILLAS[ruta] = (estado.st_mtime_ns, estado.st_size, plantilla)
+    return plantilla
+
+
+def vaciar_cache_plantillas():
+    _CACHE_PLANTILLAS.clear()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Convierte niveles entre el texto del editor y el formato binario")
+    parser.add_argument("operacion", choices=["a_binario", "a_texto"])
+    parser.add_argument("entrada")
+    parser.add_argument("salida", nargs="?")
+    args = parser.parse_args(argv)
+
+    base = os.path.splitext(args.entrada)[0]
+    try:
+        if args.operacion == "a_binario":
+            with open(args.entrada, 'r') as f: lineas = f.readlines()
+            # Mismas dimensiones que al cargar el .txt en el motor
+            plantilla = compilar_nivel(lineas)
+            for aviso in plantilla.avisos: print(aviso)
+            salida = args.salida or base + EDITOR_EXTENSION_BINARIA
+            escribir_nivel_binario(plantilla, salida, {"nombre": os.path.basename(base)})
+        else:
+            plantilla = leer_nivel_binario(args.entrada)
+            salida = args.salida or base + EDITOR_EXTENSION_TEXTO
+            with open(salida, 'w') as f: f.writelines(plantilla.a_lineas())
+    except (OSError, ErrorNivel) as e:
+        print(f"Error: {e}")
+        return 1
+    print(f"{args.entrada} -> {salida} ({plantilla.ancho}x{plantilla.alto}, {len(plantilla.entidades)} entidades, "
+          f"{os.path.getsize(salida)} bytes)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,123 @@
+# backend/ocupacion.py
+# Mapa de ocupación compacto de la cuadrícula.
+# Cada capa es un bytearray plano (índice = y * ancho + x) con el número de
+# objetos de ese tipo en la celda; la tabla lateral ids_por_celda guarda los
+# ids presentes para resolver impactos. Los muros no tienen id y solo se
+# marcan en su capa (poner_muro / quitar_muro).
+# Las consultas de paso son O(1) y no reservan memoria.
+
+CAPA_MURO = 0
+CAPA_TANQUE = 1
+CAPA_OBJETIVO = 2
+
+_SIN_IDS = ()
+
+
+class MapaOcupacion:
+    def __init__(self, ancho, alto):
+        self.ancho = ancho
+        self.alto = alto
+        # Se incrementa cada vez que cambia la capa de muros (para invalidar cachés)
+        self.version_muros = 0
+        self.reiniciar()
+
+    def reiniciar(self):
+        n = self.ancho * self.alto
+        self.muros = bytearray(n)
+        self.tanques = bytearray(n)
+        self.objetivos = bytearray(n)
+        self._capas = (self.muros, self.tanques, self.objetivos)
+        # Las listas de ids se crean solo para celdas que llegan a ocuparse
+        self.ids_por_celda = [None] * n
+        self.version_muros += 1
+
+    def redimensionar(self, ancho, alto):
+        # Cambia el tamaño de un mapa recién reiniciado (vacío), al cargar un
+        # nivel de otras dimensiones. No cuenta como cambio de muros: reiniciar()
+        # ya subió version_muros y quien redimensiona carga los muros después,
+        # así el hash del motor no depende del tamaño del nivel anterior
+        if (ancho, alto) == (self.ancho, self.alto): return
+        version_muros = self.version_muros
+        self.ancho = ancho
+        self.alto = alto
+        self.reiniciar()
+        self.version_muros = version_muros
+
+    def dentro(self, x_tile, y_tile):
+        return 0 <= x_tile < self.ancho and 0 <= y_tile < self.alto
+
+    def agregar(self, obj_id, x_tile, y_tile, capa):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        indice = y_tile * self.ancho + x_tile
+        ids = self.ids_por_celda[indice]
+        if ids is None:
+            ids = self.ids_por_celda[indice] = []
+        elif obj_id in ids:
+            return False
+        ids.append(obj_id)
+        self._capas[capa][indice] += 1
+        if capa == CAPA_MURO: self.version_muros += 1
+        return True
+
+    def quitar(self, obj_id, x_tile, y_tile, capa):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        indice = y_tile * self.ancho + x_tile
+        ids = self.ids_por_celda[indice]
+        if not ids or obj_id not in ids: return False
+        ids.remove(obj_id)
+        self._capas[capa][indice] -= 1
+        if capa == CAPA_MURO: self.version_muros += 1
+        return True
+
+    def poner_muro(self, x_tile, y_tile):
+        # Los muros no tienen id: solo marcan la capa de muros
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        indice = y_tile * self.ancho + x_tile
+        if self.muros[indice]: return False
+        self.muros[indice] = 1
+        self.version_muros += 1
+        return True
+
+    def quitar_muro(self, x_tile, y_tile):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        indice = y_tile * self.ancho + x_tile
+        if not self.muros[indice]: return False
+        self.muros[indice] = 0
+        self.version_muros += 1
+        return True
+
+    def cargar_muros(self, capa):
+        # Copia de golpe una capa de muros entera (bytes de ancho * alto, ver
+        # backend/niveles.py) en vez de poner_muro() casilla a casilla
+        if len(capa) != len(self.muros): raise ValueError("La capa de muros no coincide con el mapa")
+        self.muros[:] = capa
+        self.version_muros += 1
+
+    def casillas_con_muro(self):
+        ancho = self.ancho
+        return [(indice % ancho, indice // ancho) for indice, hay in enumerate(self.muros) if hay]
+
+    def ids_en(self, x_tile, y_tile):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return _SIN_IDS
+        return self.ids_por_celda[y_tile * self.ancho + x_tile] or _SIN_IDS
+
+    def hay_muro(self, x_tile, y_tile):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        return self.muros[y_tile * self.ancho + x_tile] != 0
+
+    def es_transitable(self, x_tile, y_tile):
+        # Solo considera la geometría estática (muros y bordes)
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        return not self.muros[y_tile * self.ancho + x_tile]
+
+    def esta_libre(self, x_tile, y_tile, ignorar_id=None, considerar_tanques=True):
+        if not (0 <= x_tile < self.ancho and 0 <= y_tile < self.alto): return False
+        indice = y_tile * self.ancho + x_tile
+        if self.muros[indice]: return False
+        if considerar_tanques:
+            tanques_en_celda = self.tanques[indice]
+            if tanques_en_celda:
+                # Un tanque no se bloquea a sí mismo
+                if tanques_en_celda > 1 or ignorar_id is None or ignorar_id not in self.ids_por_celda[indice]:
+                    return False
+        return True
@@ -0,0 +1,71 @@
+# backend/perfilado.py
+# Instrumentación opcional de MotorJuego.actualizar_estado.
+# El motor marca el fin de cada fase con marcar(fase) y suma contadores
+# (expansiones de A*, sondeos de visión y colisión, objetos creados/destruidos);
+# al cerrar el tick se guarda un registro en un historial circular que puede
+# volcarse a un archivo JSON Lines o resumirse para el overlay de depuración.
+import json
+import time
+from collections import deque
+
+FASES_MOTOR = ("interpolacion", "barrido", "jugador", "ia_enemigos", "balas", "victoria")
+CONTADORES_MOTOR = (
+    "a_estrella_busquedas", "a_estrella_expansiones", "campo_flujo_recalculos",
+    "sondeos_vision", "sondeos_colision", "objetos_creados", "objetos_destruidos",
+)
+
+
+class PerfiladorMotor:
+    def __init__(self, capacidad_historial=300):
+        self.historial = deque(maxlen=capacidad_historial)
+        self.contadores = dict.fromkeys(CONTADORES_MOTOR, 0)
+        self._tiempos_fase = dict.fromkeys(FASES_MOTOR, 0.0)
+        self._inicio_tick = 0.0
+        self._ultima_marca = 0.0
+
+    def iniciar_tick(self):
+        self._inicio_tick = self._ultima_marca = time.perf_counter()
+
+    def marcar(self, fase):
+        # Atribuye a `fase` el tiempo transcurrido desde la marca anterior
+        ahora = time.perf_counter()
+        self._tiempos_fase[fase] += ahora - self._ultima_marca
+        self._ultima_marca = ahora
+
+    def contar(self, contador, cantidad=1):
+        self.contadores[contador] += cantidad
+
+    def cerrar_tick(self, numero_tick):
+        registro = {"tick": numero_tick, "total_ms": (time.perf_counter() - self._inicio_tick) * 1000}
+        for fase, segundos in self._tiempos_fase.items():
+            registro[fase + "_ms"] = segundos * 1000
+            self._tiempos_fase[fase] = 0.0
+        for contador, valor in self.contadores.items():
+            registro[contador] = valor
+            self.contadores[contador] = 0
+        self.historial.append(registro)
+        return registro
+
+    def ultimo(self):
+        return self.historial[-1] if self.historial else None
+
+    def resumen(self):
+        # Media y p99 de cada fase y media de cada contador sobre el historial
+        if not self.historial: return {}
+        n = len(self.historial)
+        resumen = {"ticks": n}
+        for clave in ("total_ms",) + tuple(fase + "_ms" for fase in FASES_MOTOR):
+            valores = sorted(registro[clave] for registro in self.historial)
+            resumen[clave] = {"media": sum(valores) / n, "p99": valores[min(n - 1, int(n * 0.99))]}
+        for contador in CONTADORES_MOTOR:
+            resumen[contador] = sum(registro[contador] for registro in self.historial) / n
+        return resumen
+
+    def volcar(self, ruta_archivo):
+        # Añade el historial al archivo (una línea JSON por tick) y lo vacía
+        with open(ruta_archivo, 'a') as f:
+            for registro in self.historial:
+                f.write(json.dumps(registro) + "\n")
+        cantidad = len(self.historial)
+        self.historial.clear()
+        return cantidad
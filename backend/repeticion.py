@@ -0,0 +1,366 @@
+# backend/repeticion.py
+# Repeticiones de partidas sin red: se graban las entradas, no el mundo.
+# Cada carga de nivel reinicia el motor con una semilla nueva
+# (MotorJuego.reiniciar_simulacion), así que nivel + semilla + las acciones de
+# cada tick bastan para volver a jugar la partida bit a bit.
+#
+# Formato del archivo (solo se añade al final; se puede leer aunque el juego
+# se cierre a medias):
+#   cabecera  b"TKREP" + versión (1 byte) + varint + JSON {"tick_ms"}
+#   byte < 0x80   un tick: bits 0-2 índice de "mover" en DIRECCIONES_RED
+#                 (0 = sin mover), bit 3 "disparar", bit 4 "detenerse"
+#   0xF0 varint   el tick anterior se repite n veces más
+#   0xF1 varint + JSON {"nivel", "semilla", "campo_flujo", "lineas", "dimensiones"}:
+#                 carga de nivel (los niveles editados viajan con la repetición,
+#                 con el tamaño con el que se jugaron)
+#   0xF2 + 8 bytes  hash_estado() tras los ticks anteriores, para detectar
+#                 desincronizaciones al reproducir
+#
+# ReproductorRepeticion vuelve a correr MotorJuego con esas entradas: a tope
+# sin interfaz, a velocidad real con --ver, o saltando a un tick desde el
+# fotograma clave (motor serializado con pickle) más cercano.
+# Uso: python -m backend.repeticion archivo.rep [--hasta TICK] [--ver] [--velocidad X]
+import argparse
+import bisect
+import glob
+import json
+import os
+import pickle
+import sys
+import time
+import zlib
+from contextlib import redirect_stdout
+
+from constantes import (
+    JUGANDO, TIEMPO_TICK_LOGICA_MS, REPETICIONES_PATH, MAX_REPETICIONES_GUARDADAS,
+    TICKS_ENTRE_HASHES_REPETICION, TICKS_ENTRE_CLAVES_REPETICION
+)
+from protocolo_red import DIRECCIONES_RED
+from backend.motor_juego import MotorJuego
+from backend.niveles import cargar_plantilla, ErrorNivel
+
+MAGIA_REPETICION = b"TKREP"
+VERSION_REPETICION = 1
+EXTENSION_REPETICION = ".rep"
+
+MARCA_REPETIR = 0xF0
+MARCA_NIVEL = 0xF1
+MARCA_HASH = 0xF2
+BIT_DISPARAR = 0x08
+BIT_DETENERSE = 0x10
+MASCARA_MOVER = 0x07
+
+_INDICE_DIRECCION = {direccion: i for i, direccion in enumerate(DIRECCIONES_RED)}
+
+
+class ErrorRepeticion(Exception):
+    pass
+
+
+def codificar_acciones(acciones):
+    codigo = _INDICE_DIRECCION.get(tuple(acciones["mover"]), 0) if acciones.get("mover") else 0
+    if acciones.get("disparar"): codigo |= BIT_DISPARAR
+    if acciones.get("detenerse"): codigo |= BIT_DETENERSE
+    return codigo
+
+
+def decodificar_acciones(codigo):
+    acciones = {}
+    mover = codigo & MASCARA_MOVER
+    if mover: acciones["mover"] = DIRECCIONES_RED[mover]
+    if codigo & BIT_DISPARAR: acciones["disparar"] = True
+    if codigo & BIT_DETENERSE: acciones["detenerse"] = True
+    return acciones
+
+
+def _varint(n):
+    salida = bytearray()
+    while n >= 0x80:
+        salida.append((n & 0x7F) | 0x80)
+        n >>= 7
+    salida.append(n)
+    return bytes(salida)
+
+
+def _leer_varint(datos, pos):
+    n = desplazamiento = 0
+    while True:
+        if pos >= len(datos): raise ErrorRepeticion("varint cortado")
+        byte = datos[pos]; pos += 1
+        n |= (byte & 0x7F) << desplazamiento
+        if byte < 0x80: return n, pos
+        desplazamiento += 7
+
+
+def _bloque_json(marca, datos):
+    cuerpo = json.dumps(datos, separators=(",", ":")).encode("utf-8")
+    return (bytes((marca,)) if marca is not None else b"") + _varint(len(cuerpo)) + cuerpo
+
+
+class GrabadorRepeticion:
+    def __init__(self, ruta, tick_ms=TIEMPO_TICK_LOGICA_MS, ticks_entre_hashes=TICKS_ENTRE_HASHES_REPETICION):
+        self.ruta = ruta
+        self.archivo = open(ruta, "wb")
+        self.archivo.write(MAGIA_REPETICION + bytes((VERSION_REPETICION,)) + _bloque_json(None, {"tick_ms": tick_ms}))
+        self.ticks_entre_hashes = ticks_entre_hashes
+        self.ticks = 0
+        # Racha en curso: último código escrito y cuántas veces más se repitió
+        self._ultimo_codigo = None
+        self._repeticiones = 0
+
+    def registrar_nivel(self, motor):
+        # Después de motor.reiniciar_simulacion() y de un cargar_nivel() que funcionó
+        nivel = motor.nivel_actual_numero
+        datos = {"nivel": nivel, "semilla": motor.semilla, "campo_flujo": motor.usar_campo_flujo}
+        if isinstance(nivel, str):
+            # En texto del editor aunque el nivel sea un .nvb. Con el tamaño real:
+            # un .nvb más chico que la pantalla no se rellena hasta ella como el texto
+            try:
+                datos["lineas"] = cargar_plantilla(nivel).a_lineas()
+                datos["dimensiones"] = [motor.ocupacion.ancho, motor.ocupacion.alto]
+            except (OSError, ErrorNivel):
+                pass
+        self._cerrar_racha()
+        self.archivo.write(_bloque_json(MARCA_NIVEL, datos))
+        self._ultimo_codigo = None
+
+    def registrar_tick(self, acciones, motor):
+        # Después de motor.actualizar_estado(acciones, ...)
+        codigo = codificar_acciones(acciones)
+        if codigo == self._ultimo_codigo:
+            self._repeticiones += 1
+        else:
+            self._cerrar_racha()
+            self.archivo.write(bytes((codigo,)))
+            self._ultimo_codigo = codigo
+        self.ticks += 1
+        if self.ticks_entre_hashes and self.ticks % self.ticks_entre_hashes == 0:
+            self._cerrar_racha()
+            self.archivo.write(bytes((MARCA_HASH,)) + motor.hash_estado().to_bytes(8, "little"))
+            # Si el juego se cae se pierde como mucho el último intervalo
+            self.archivo.flush()
+
+    def _cerrar_racha(self):
+        if self._repeticiones:
+            self.archivo.write(bytes((MARCA_REPETIR,)) + _varint(self._repeticiones))
+            self._repeticiones = 0
+
+    def cerrar(self):
+        if self.archivo.closed: return
+        self._cerrar_racha()
+        self.archivo.close()
+        print(f"Repetición guardada en {self.ruta} ({self.ticks} ticks)")
+
+
+def abrir_grabacion(directorio=REPETICIONES_PATH, maximo=MAX_REPETICIONES_GUARDADAS):
+    # Nueva repetición con fecha en el nombre; borra las más viejas si sobran
+    os.makedirs(directorio, exist_ok=True)
+    existentes = sorted(glob.glob(os.path.join(directorio, "partida_*" + EXTENSION_REPETICION)))
+    for ruta_vieja in existentes[:max(0, len(existentes) - maximo + 1)]:
+        try: os.remove(ruta_vieja)
+        except OSError: pass
+    nombre = time.strftime("partida_%Y%m%d_%H%M%S") + EXTENSION_REPETICION
+    return GrabadorRepeticion(os.path.join(directorio, nombre))
+
+
+def leer_repeticion(ruta):
+    # Devuelve (cabecera, códigos por tick, [(tick, datos de nivel)], {tick: hash})
+    with open(ruta, "rb") as f: datos = f.read()
+    if not datos.startswith(MAGIA_REPETICION): raise ErrorRepeticion(f"{ruta} no es una repetición")
+    pos = len(MAGIA_REPETICION)
+    if pos >= len(datos) or datos[pos] != VERSION_REPETICION:
+        raise ErrorRepeticion(f"Versión de repetición no soportada en {ruta}")
+    largo, pos = _leer_varint(datos, pos + 1)
+    cabecera = json.loads(datos[pos:pos + largo]); pos += largo
+
+    codigos = bytearray()
+    niveles = []
+    hashes = {}
+    try:
+        while pos < len(datos):
+            byte = datos[pos]; pos += 1
+            if byte < 0x80:
+                codigos.append(byte)
+            elif byte == MARCA_REPETIR:
+                veces, pos = _leer_varint(datos, pos)
+                if not codigos: raise ErrorRepeticion("repetición sin tick previo")
+                codigos.extend(codigos[-1:] * veces)
+            elif byte == MARCA_NIVEL:
+                largo, pos = _leer_varint(datos, pos)
+                if pos + largo > len(datos): raise ErrorRepeticion("nivel cortado")
+                niveles.append((len(codigos), json.loads(datos[pos:pos + largo]))); pos += largo
+            elif byte == MARCA_HASH:
+                if pos + 8 > len(datos): raise ErrorRepeticion("hash cortado")
+                hashes[len(codigos)] = int.from_bytes(datos[pos:pos + 8], "little"); pos += 8
+            else:
+                raise ErrorRepeticion(f"Marca desconocida 0x{byte:02X} en el byte {pos - 1}")
+    except ErrorRepeticion as e:
+        # Archivo cortado (el juego se cerró a medias): vale lo leído hasta ahí
+        print(f"Repetición {ruta} incompleta: {e}")
+    return cabecera, codigos, niveles, hashes
+
+
+class ReproductorRepeticion:
+    # tick = ticks ya aplicados. El estado en un tick es el de después de ese
+    # tick y antes de las cargas de nivel que empiezan en él.
+    def __init__(self, ruta, intervalo_claves=TICKS_ENTRE_CLAVES_REPETICION, motor=None):
+        self.cabecera, self.codigos, self.niveles, self.hashes = leer_repeticion(ruta)
+        self.tick_ms = self.cabecera.get("tick_ms", TIEMPO_TICK_LOGICA_MS)
+        self.total_ticks = len(self.codigos)
+        self._inicios_niveles = [inicio for inicio, _ in self.niveles]
+        self._ticks_con_nivel = set(self._inicios_niveles)
+        self.motor = motor if motor is not None else MotorJuego()
+        self.tick = 0
+        self.resultado = JUGANDO
+        # Fotogramas clave {tick: motor serializado}; 0 = sin fotogramas
+        self.intervalo_claves = intervalo_claves
+        self.claves = {}
+        self.hashes_comprobados = 0
+        self.desincronizaciones = 0
+        self.primera_desincronizacion = None
+        self._guardar_clave()
+
+    def terminado(self):
+        return self.tick >= self.total_ticks
+
+    def _cargar_niveles_pendientes(self):
+        # Las cargas que empiezan en el tick actual y no se han aplicado aún
+        i = bisect.bisect_left(self._inicios_niveles, self.tick)
+        while i < len(self.niveles) and self.niveles[i][0] == self.tick:
+            datos = self.niveles[i][1]
+            motor = self.motor
+            motor.reiniciar_simulacion(datos["semilla"])
+            motor.usar_campo_flujo = datos.get("campo_flujo", True)
+            if not motor.cargar_nivel(datos["nivel"], datos.get("lineas"), datos.get("dimensiones")):
+                raise ErrorRepeticion(f"No se pudo cargar el nivel {datos['nivel']!r}")
+            self.resultado = JUGANDO
+            i += 1
+
+    def _guardar_clave(self):
+        if self.intervalo_claves and self.tick % self.intervalo_claves == 0 and self.tick not in self.claves:
+            self.claves[self.tick] = zlib.compress(pickle.dumps(self.motor, pickle.HIGHEST_PROTOCOL), 1)
+
+    def avanzar(self, ticks=1, latencias=None):
+        # Aplica hasta 'ticks' ticks; con una lista en latencias anota lo que
+        # tarda cada actualizar_estado (para benchmarks)
+        fin = min(self.total_ticks, self.tick + ticks)
+        codigos = self.codigos
+        while self.tick < fin:
+            if self.tick in self._ticks_con_nivel: self._cargar_niveles_pendientes()
+            acciones = decodificar_acciones(codigos[self.tick])
+            if latencias is None:
+                self.resultado = self.motor.actualizar_estado(acciones, self.tick_ms)
+            else:
+                inicio = time.perf_counter()
+                self.resultado = self.motor.actualizar_estado(acciones, self.tick_ms)
+                latencias.append(time.perf_counter() - inicio)
+            self.tick += 1
+            esperado = self.hashes.get(self.tick)
+            if esperado is not None: self._comprobar_hash(esperado)
+            if self.intervalo_claves: self._guardar_clave()
+        return self.resultado
+
+    def _comprobar_hash(self, esperado):
+        self.hashes_comprobados += 1
+        obtenido = self.motor.hash_estado()
+        if obtenido != esperado:
+            self.desincronizaciones += 1
+            if self.primera_desincronizacion is None:
+                self.primera_desincronizacion = self.tick
+                print(f"Desincronización en el tick {self.tick}: esperado {esperado:016x}, obtenido {obtenido:016x}")
+
+    def ir_a_tick(self, tick):
+        # Salta a 'tick' desde el fotograma clave anterior más cercano (si está
+        # más cerca que el tick actual) y avanza lo que falte
+        tick = max(0, min(self.total_ticks, tick))
+        clave = max((t for t in self.claves if t <= tick), default=None)
+        if clave is not None and (tick < self.tick or clave > self.tick):
+            self.motor = pickle.loads(zlib.decompress(self.claves[clave]))
+            self.tick = clave
+            self.resultado = JUGANDO
+        if tick < self.tick:
+            raise ErrorRepeticion(f"No hay fotograma clave antes del tick {tick}")
+        return self.avanzar(tick - self.tick)
+
+    def nivel_en_curso(self):
+        i = bisect.bisect_left(self._inicios_niveles, self.tick) - 1
+        return self.niveles[i][1]["nivel"] if i >= 0 else None
+
+
+def _reproducir_sin_interfaz(reproductor, hasta):
+    inicio = time.perf_counter()
+    # Lo que imprime el motor en cada golpe no interesa aquí (y frena)
+    with open(os.devnull, "w") as salida_nula, redirect_stdout(salida_nula):
+        resultado = reproductor.ir_a_tick(hasta)
+    duracion = time.perf_counter() - inicio
+    ticks = reproductor.tick
+    tiempo_juego_s = ticks * reproductor.tick_ms / 1000
+    velocidad = tiempo_juego_s / duracion if duracion > 0 else float("inf")
+    print(f"{ticks} ticks ({tiempo_juego_s:.1f} s de juego) en {duracion:.2f} s: x{velocidad:.0f} tiempo real")
+    print(f"Niveles: {len(reproductor.niveles)}; nivel final {reproductor.nivel_en_curso()!r}, resultado {resultado}")
+    print(f"Hashes comprobados: {reproductor.hashes_comprobados}, desincronizaciones: {reproductor.desincronizaciones}"
+          + (f" (primera en el tick {reproductor.primera_desincronizacion})" if reproductor.desincronizaciones else ""))
+    print(f"Hash final: {reproductor.motor.hash_estado():016x}")
+    return 1 if reproductor.desincronizaciones else 0
+
+
+def _reproducir_con_vista(reproductor, velocidad, desde):
+    # Flechas izquierda/derecha: 5 s atrás/adelante; +/-: velocidad; espacio: pausa
+    import pygame
+    from frontend.vista import VistaJuego
+
+    pygame.init()
+    vista = VistaJuego(); reloj = pygame.time.Clock()
+    reproductor.ir_a_tick(desde)
+    salto = 5000 // reproductor.tick_ms
+    acumulado_ms = 0.0
+    pausado = False
+    corriendo = True
+    while corriendo:
+        for evento in pygame.event.get():
+            if evento.type == pygame.QUIT: corriendo = False
+            elif evento.type == pygame.KEYDOWN:
+                if evento.key == pygame.K_ESCAPE: corriendo = False
+                elif evento.key == pygame.K_SPACE: pausado = not pausado
+                elif evento.key == pygame.K_LEFT: reproductor.ir_a_tick(reproductor.tick - salto)
+                elif evento.key == pygame.K_RIGHT: reproductor.ir_a_tick(reproductor.tick + salto)
+                elif evento.key in (pygame.K_PLUS, pygame.K_KP_PLUS): velocidad = min(64.0, velocidad * 2)
+                elif evento.key in (pygame.K_MINUS, pygame.K_KP_MINUS): velocidad = max(0.125, velocidad / 2)
+        if not pausado and not reproductor.terminado():
+            acumulado_ms += reloj.get_time() * velocidad
+            ticks = int(acumulado_ms // reproductor.tick_ms)
+            if ticks:
+                reproductor.avanzar(ticks)
+                acumulado_ms -= ticks * reproductor.tick_ms
+        alfa = min(1.0, acumulado_ms / reproductor.tick_ms)
+        vista.dibujar_estado_juego(reproductor.motor.get_estado_para_vista(alfa), JUGANDO)
+        pygame.display.set_caption(f"Repetición: tick {reproductor.tick}/{reproductor.total_ticks} x{velocidad:g}"
+                                   + (" (pausa)" if pausado else ""))
+        reloj.tick(60)
+    pygame.quit()
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reproduce una repetición grabada por el juego")
+    parser.add_argument("archivo")
+    parser.add_argument("--hasta", type=int, help="tick final (sin --ver) o inicial (con --ver)")
+    parser.add_argument("--ver", action="store_true", help="muestra la partida con la vista del juego")
+    parser.add_argument("--velocidad", type=float, default=1.0, help="multiplicador de la velocidad real con --ver")
+    parser.add_argument("--claves", type=int, default=TICKS_ENTRE_CLAVES_REPETICION,
+                        help="ticks entre fotogramas clave (0 = sin saltos hacia atrás)")
+    args = parser.parse_args(argv)
+
+    try:
+        reproductor = ReproductorRepeticion(args.archivo, intervalo_claves=args.claves)
+    except (OSError, ErrorRepeticion) as e:
+        print(f"Error: {e}")
+        return 2
+    print(f"{args.archivo}: {reproductor.total_ticks} ticks, {len(reproductor.niveles)} cargas de nivel, "
+          f"{len(reproductor.hashes)} hashes de control")
+    if args.ver: return _reproducir_con_vista(reproductor, args.velocidad, args.hasta or 0)
+    return _reproducir_sin_interfaz(reproductor, reproductor.total_ticks if args.hasta is None else args.hasta)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+# backend/rutas.py
+# A* sobre la capa de muros del mapa de ocupación.
+# Los nodos se codifican como enteros (y * ancho + x) y el camino se reconstruye
+# con punteros al padre, así ninguna entrada del heap copia rutas. Los arreglos
+# de trabajo se reutilizan entre búsquedas marcándolos con un número de
+# generación, y un presupuesto de expansiones acota el coste cuando el destino
+# está lejos o es inalcanzable.
+import heapq
+from array import array
+
+from constantes import MAX_EXPANSIONES_A_ESTRELLA
+
+
+class BuscadorAEstrella:
+    def __init__(self, ocupacion):
+        self.ocupacion = ocupacion
+        self._tamano = 0
+        self._generacion = 0
+
+        # Estadísticas (útiles para benchmarks y perfilado)
+        self.busquedas = 0
+        self.expansiones_totales = 0
+        self.ultimas_expansiones = 0
+        self.ultima_ruta_parcial = False
+
+    def _preparar_arreglos(self):
+        total = self.ocupacion.ancho * self.ocupacion.alto
+        if total != self._tamano:
+            self._tamano = total
+            self._padre = array('i', [-1]) * total
+            self._costo = array('i', [0]) * total
+            self._visto = array('I', [0]) * total    # generación en la que se abrió el nodo
+            self._cerrado = array('I', [0]) * total  # generación en la que se expandió
+            self._generacion = 0
+        self._generacion += 1
+        if self._generacion >= 0xFFFFFFFF:
+            self._visto = array('I', [0]) * total
+            self._cerrado = array('I', [0]) * total
+            self._generacion = 1
+        return self._generacion
+
+    def buscar(self, inicio, fin, max_expansiones=MAX_EXPANSIONES_A_ESTRELLA):
+        # Devuelve la lista de casillas desde inicio hasta fin (ambas incluidas).
+        # Si se agota el presupuesto devuelve una ruta parcial hasta la casilla
+        # expandida más cercana al destino; si el destino es inalcanzable, None.
+        ocupacion = self.ocupacion
+        self.busquedas += 1
+        self.ultimas_expansiones = 0
+        self.ultima_ruta_parcial = False
+        if not ocupacion.dentro(*inicio) or not ocupacion.es_transitable(*fin):
+            return None
+        if inicio == fin:
+            return [inicio]
+
+        generacion = self._preparar_arreglos()
+        ancho = ocupacion.ancho
+        total = self._tamano
+        muros = ocupacion.muros
+        padre, costo, visto, cerrado = self._padre, self._costo, self._visto, self._cerrado
+
+        fin_x, fin_y = fin
+        nodo_inicio = inicio[1] * ancho + inicio[0]
+        nodo_fin = fin_y * ancho + fin_x
+        # Prioridad empaquetada en un entero: f primero, luego h para desempatar
+        # a favor de los nodos más cercanos al destino, luego el propio nodo.
+        escala_h = ancho + ocupacion.alto + 1
+
+        h_inicio = abs(inicio[0] - fin_x) + abs(inicio[1] - fin_y)
+        visto[nodo_inicio] = generacion
+        costo[nodo_inicio] = 0
+        padre[nodo_inicio] = -1
+        frontera = [(h_inicio * escala_h + h_inicio) * total + nodo_inicio]
+        mejor_nodo, mejor_h = nodo_inicio, h_inicio
+        expansiones = 0
+
+        while frontera:
+            nodo = heapq.heappop(frontera) % total
+            if cerrado[nodo] == generacion: continue # Entrada obsoleta
+            cerrado[nodo] = generacion
+
+            if nodo == nodo_fin:
+                self._registrar(expansiones, False)
+                return self._reconstruir(nodo, ancho)
+
+            x = nodo % ancho
+            y = nodo // ancho
+            h = abs(x - fin_x) + abs(y - fin_y)
+            if h < mejor_h:
+                mejor_nodo, mejor_h = nodo, h
+
+            expansiones += 1
+            if expansiones >= max_expansiones:
+                self._registrar(expansiones, True)
+                return self._reconstruir(mejor_nodo, ancho)
+
+            nuevo_costo = costo[nodo] + 1
+            for vecino in (
+                nodo - ancho if y > 0 else -1,
+                nodo + ancho if nodo + ancho < total else -1,
+                nodo - 1 if x > 0 else -1,
+                nodo + 1 if x < ancho - 1 else -1,
+            ):
+                if vecino < 0 or muros[vecino] or cerrado[vecino] == generacion: continue
+                if visto[vecino] == generacion and costo[vecino] <= nuevo_costo: continue
+                visto[vecino] = generacion
+                costo[vecino] = nuevo_costo
+                padre[vecino] = nodo
+                h_vecino = abs(vecino % ancho - fin_x) + abs(vecino // ancho - fin_y)
+                heapq.heappush(frontera, ((nuevo_costo + h_vecino) * escala_h + h_vecino) * total + vecino)
+
+        self._registrar(expansiones, False)
+        return None
+
+    def _registrar(self, expansiones, parcial):
+        self.ultimas_expansiones = expansiones
+        self.expansiones_totales += expansiones
+        self.ultima_ruta_parcial = parcial
+
+    def _reconstruir(self, nodo, ancho):
+        camino = []
+        padre = self._padre
+        while nodo != -1:
+            camino.append((nodo % ancho, nodo // ancho))
+            nodo = padre[nodo]
+        camino.reverse()
+        return camino
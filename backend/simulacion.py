@@ -0,0 +1,140 @@
+# backend/simulacion.py
+# Simulación sin interfaz: carga un nivel y avanza el motor tick a tick sin
+# ventana, mezclador ni reloj de pygame, tan rápido como permita la CPU.
+# Uso: python -m backend.simulacion <nivel> [ticks] [inactiva|aleatoria|bot] [semilla]
+import os
+import random
+import sys
+import time
+from contextlib import redirect_stdout
+
+from constantes import DIRECTIONS, JUGANDO, TIEMPO_TICK_LOGICA_MS
+from backend.motor_juego import MotorJuego
+
+TIEMPO_DELTA_TICK_MS = TIEMPO_TICK_LOGICA_MS # El mismo paso fijo que el bucle principal
+
+
+def politica_inactiva(motor, tick):
+    return {}
+
+
+class PoliticaAleatoria:
+    # Jugador de prueba: cambia de dirección y dispara al azar
+    def __init__(self, semilla=None, prob_disparo=0.2, prob_giro=0.15):
+        self.rng = random.Random(semilla)
+        self.prob_disparo = prob_disparo
+        self.prob_giro = prob_giro
+        self.direccion = self.rng.choice(DIRECTIONS)
+
+    def __call__(self, motor, tick):
+        if self.rng.random() < self.prob_giro:
+            self.direccion = self.rng.choice(DIRECTIONS)
+        acciones = {"mover": self.direccion}
+        if self.rng.random() < self.prob_disparo:
+            acciones["disparar"] = True
+        return acciones
+
+
+class PoliticaBot:
+    # Jugador de prueba que juega a ganar: dispara a lo que tenga alineado y a la
+    # vista (objetivos y enemigos) y si no, va por A* hacia el objetivo vivo más
+    # cercano. Si se queda sin ruta se mueve al azar para desatascarse.
+    def __init__(self, semilla=None, alcance_disparo=8, ticks_replanificar=15):
+        self.rng = random.Random(semilla)
+        self.alcance_disparo = alcance_disparo
+        self.ticks_replanificar = ticks_replanificar
+        self.ruta = []
+        self.ticks_hasta_replanificar = 0
+
+    def _direccion_de_tiro(self, motor, x, y, obj):
+        dx, dy = obj.x_tile - x, obj.y_tile - y
+        if (dx != 0 and dy != 0) or abs(dx) + abs(dy) > self.alcance_disparo: return None
+        if not motor.indice_vision.hay_linea_de_vision(x, y, obj.x_tile, obj.y_tile): return None
+        return ((dx > 0) - (dx < 0), (dy > 0) - (dy < 0))
+
+    def __call__(self, motor, tick):
+        jugador = motor.objetos_del_juego.get(motor.jugador_id)
+        if jugador is None or not jugador.activo or jugador.is_moving: return {}
+        x, y = jugador.x_tile, jugador.y_tile
+        objetivos = [obj for obj in motor.objetivos.values() if obj.activo]
+        for obj in (*objetivos, *(tanque for tanque in motor.enemigos.values() if tanque.activo)):
+            direccion = self._direccion_de_tiro(motor, x, y, obj)
+            if direccion is not None: return {"mover": direccion, "disparar": True}
+        if not objetivos: return {}
+
+        self.ticks_hasta_replanificar -= 1
+        while self.ruta and self.ruta[0] == (x, y): self.ruta.pop(0)
+        if not self.ruta or self.ticks_hasta_replanificar <= 0:
+            objetivo = min(objetivos, key=lambda obj: abs(obj.x_tile - x) + abs(obj.y_tile - y))
+            ruta = motor.buscador_rutas.buscar((x, y), (objetivo.x_tile, objetivo.y_tile))
+            # La casilla del objetivo no se pisa: basta con quedar alineado
+            self.ruta = ruta[1:-1] if ruta else []
+            self.ticks_hasta_replanificar = self.ticks_replanificar
+        if not self.ruta or abs(self.ruta[0][0] - x) + abs(self.ruta[0][1] - y) != 1:
+            self.ruta = []
+            return {"mover": self.rng.choice(DIRECTIONS)}
+        return {"mover": (self.ruta[0][0] - x, self.ruta[0][1] - y)}
+
+
+def simular(nivel, ticks, politica=None, tiempo_delta_ms=TIEMPO_DELTA_TICK_MS,
+            motor=None, silencioso=True, detener_al_terminar=True, semilla=None, registrar_hashes=False):
+    # Corre hasta `ticks` ticks lógicos. `politica(motor, tick)` devuelve el
+    # diccionario acciones_jugador de cada tick (por defecto, no hace nada).
+    # Con registrar_hashes el resumen lleva motor.hash_estado() tras cada tick.
+    if politica is None: politica = politica_inactiva
+    if motor is None: motor = MotorJuego(semilla=semilla)
+
+    with open(os.devnull, 'w') as salida_nula, redirect_stdout(salida_nula if silencioso else sys.stdout):
+        if not motor.cargar_nivel(nivel):
+            return {"nivel": nivel, "resultado": None, "ticks": 0, "tiempo_juego_ms": 0,
+                    "duracion_s": 0.0, "ticks_por_segundo": 0.0, "eventos": [], "hashes": [], "motor": motor}
+
+        resultado = JUGANDO
+        ticks_ejecutados = 0
+        eventos = []
+        hashes = []
+        inicio = time.perf_counter()
+        for tick in range(ticks):
+            resultado = motor.actualizar_estado(politica(motor, tick), tiempo_delta_ms)
+            ticks_ejecutados += 1
+            eventos.extend(motor.tomar_eventos())
+            if registrar_hashes: hashes.append(motor.hash_estado())
+            if detener_al_terminar and resultado != JUGANDO:
+                break
+        duracion = time.perf_counter() - inicio
+
+    return {
+        "nivel": nivel,
+        "resultado": resultado,
+        "ticks": ticks_ejecutados,
+        "tiempo_juego_ms": motor.tiempo_ms_juego,
+        "duracion_s": duracion,
+        "ticks_por_segundo": ticks_ejecutados / duracion if duracion > 0 else 0.0,
+        "eventos": eventos,
+        "hashes": hashes,
+        "motor": motor,
+    }
+
+
+def main(argv):
+    if not argv:
+        print("Uso: python -m backend.simulacion <nivel> [ticks] [inactiva|aleatoria|bot] [semilla]")
+        return 1
+    nivel = int(argv[0]) if argv[0].isdigit() else argv[0]
+    ticks = int(argv[1]) if len(argv) > 1 else 1000
+    nombre_politica = argv[2] if len(argv) > 2 else "inactiva"
+    if nombre_politica == "aleatoria": politica = PoliticaAleatoria(semilla=0)
+    elif nombre_politica == "bot": politica = PoliticaBot(semilla=0)
+    else: politica = politica_inactiva
+    semilla = int(argv[3]) if len(argv) > 3 else None
+
+    resumen = simular(nivel, ticks, politica, semilla=semilla)
+    print(f"Nivel {resumen['nivel']}: {resumen['resultado']} tras {resumen['ticks']} ticks "
+          f"({resumen['tiempo_juego_ms'] / 1000:.1f} s de juego) "
+          f"en {resumen['duracion_s']:.3f} s reales -> {resumen['ticks_por_segundo']:.0f} ticks/s, "
+          f"hash final {resumen['motor'].hash_estado():016x}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
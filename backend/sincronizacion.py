@@ -0,0 +1,140 @@
+# backend/sincronizacion.py
+# Netcode del modo online.
+# - BufferInstantaneas: guarda en un anillo las últimas posiciones recibidas del
+#   oponente con la marca de tiempo del emisor y las muestrea con un pequeño
+#   retraso fijo, interpolando entre las dos que rodean el instante pedido o
+#   extrapolando (con tope) si los paquetes llegan tarde. Así el jitter de la
+#   red no se ve como tirones.
+# - PrediccionLocal: con servidor_autoritativo.py el tanque propio no espera al
+#   servidor. Cada entrada enviada se aplica en local a una copia del tanque y
+#   se guarda; cuando llega una instantánea, la copia vuelve a la posición
+#   autoritativa, se olvidan las entradas que el servidor ya confirma
+#   ("entradas" de la instantánea) y se reaplican las que faltan
+#   (reconciliación). En el relay cada cliente manda sobre su tanque y no hace falta.
+from collections import deque
+
+from constantes import (
+    CAPACIDAD_INSTANTANEAS_RED, RETRASO_INTERPOLACION_RED_MS, MAX_EXTRAPOLACION_RED_MS,
+    TIEMPO_TICK_LOGICA_MS, TILE_SIZE, STAY
+)
+from backend.modelos import TanqueJugadorModel
+
+
+class BufferInstantaneas:
+    def __init__(self, capacidad=CAPACIDAD_INSTANTANEAS_RED):
+        # (t_remoto, t_local, pixel_x, pixel_y) en orden de t_remoto
+        self.instantaneas = deque(maxlen=capacidad)
+        self.interpolaciones = 0
+        self.extrapolaciones = 0
+        self.descartadas = 0
+
+    def __len__(self):
+        return len(self.instantaneas)
+
+    def vaciar(self):
+        self.instantaneas.clear()
+
+    def agregar(self, t_remoto, t_local, pixel_x, pixel_y):
+        # Las que llegan desordenadas o repetidas no aportan nada
+        if self.instantaneas and t_remoto <= self.instantaneas[-1][0]:
+            self.descartadas += 1
+            return False
+        self.instantaneas.append((t_remoto, t_local, pixel_x, pixel_y))
+        return True
+
+    def desfase(self):
+        # Reloj local - reloj remoto. El mínimo del anillo corresponde al paquete
+        # que menos tardó, y se adapta solo si el otro extremo pausa su reloj.
+        return min(t_local - t_remoto for t_remoto, t_local, _, _ in self.instantaneas)
+
+    def muestrear(self, t_local, retraso_ms=RETRASO_INTERPOLACION_RED_MS):
+        # Posición (pixel_x, pixel_y) del emisor retraso_ms antes de "ahora"
+        if not self.instantaneas: return None
+        t = t_local - self.desfase() - retraso_ms
+        instantaneas = self.instantaneas
+        primera, ultima = instantaneas[0], instantaneas[-1]
+        if t <= primera[0]: return primera[2], primera[3]
+
+        if t >= ultima[0]:
+            # Paquetes atrasados: se sigue con la última velocidad, con tope
+            self.extrapolaciones += 1
+            if len(instantaneas) < 2: return ultima[2], ultima[3]
+            penultima = instantaneas[-2]
+            intervalo = ultima[0] - penultima[0]
+            adelanto = min(t - ultima[0], MAX_EXTRAPOLACION_RED_MS) / intervalo
+            return (ultima[2] + (ultima[2] - penultima[2]) * adelanto,
+                    ultima[3] + (ultima[3] - penultima[3]) * adelanto)
+
+        # El instante pedido suele estar cerca del final: se busca hacia atrás
+        self.interpolaciones += 1
+        for i in range(len(instantaneas) - 1, 0, -1):
+            anterior = instantaneas[i - 1]
+            if anterior[0] <= t:
+                siguiente = instantaneas[i]
+                fraccion = (t - anterior[0]) / (siguiente[0] - anterior[0])
+                return (anterior[2] + (siguiente[2] - anterior[2]) * fraccion,
+                        anterior[3] + (siguiente[3] - anterior[3]) * fraccion)
+        return primera[2], primera[3]
+
+
+
+class PrediccionLocal:
+    def __init__(self, capacidad=CAPACIDAD_INSTANTANEAS_RED * 4):
+        # (secuencia, mover, detenerse) de cada entrada que el servidor no ha confirmado
+        self.pendientes = deque(maxlen=capacidad)
+        # Copia local del tanque propio (None hasta la primera instantánea que lo trae)
+        self.tanque = None
+        self.correcciones = 0
+
+    def vaciar(self):
+        self.pendientes.clear()
+        self.tanque = None
+
+    def registrar(self, secuencia, acciones, bloqueada):
+        # Entrada que se acaba de enviar: se aplica ya a la copia local.
+        # bloqueada(x_tile, y_tile) dice si el tanque no puede entrar en la casilla
+        entrada = (secuencia, acciones.get("mover"), bool(acciones.get("detenerse")))
+        self.pendientes.append(entrada)
+        if self.tanque is not None: self._aplicar(entrada, bloqueada)
+
+    def reconciliar(self, ack, x_tile, y_tile, pixel_x, pixel_y, direccion, moviendo, bloqueada):
+        # Estado autoritativo del tanque tras aplicar las entradas hasta 'ack'
+        pendientes = self.pendientes
+        while pendientes and pendientes[0][0] <= ack: pendientes.popleft()
+        tanque = self.tanque
+        anterior = None
+        if tanque is None:
+            tanque = self.tanque = TanqueJugadorModel(x_tile, y_tile)
+        else:
+            anterior = (tanque.pixel_x, tanque.pixel_y)
+            tanque.x_tile, tanque.y_tile = x_tile, y_tile
+        tanque.pixel_x, tanque.pixel_y = float(pixel_x), float(pixel_y)
+        tanque.direccion_actual = direccion
+        tanque.is_moving = moviendo
+        # El destino no viaja en la instantánea: es la casilla vecina en la dirección del tanque
+        tanque.target_pixel_x = float((x_tile + direccion[0] if moviendo else x_tile) * TILE_SIZE)
+        tanque.target_pixel_y = float((y_tile + direccion[1] if moviendo else y_tile) * TILE_SIZE)
+        for entrada in pendientes: self._aplicar(entrada, bloqueada)
+        # Las instantáneas llevan píxeles redondeados: menos de un píxel no es un error
+        if anterior is not None and (abs(anterior[0] - tanque.pixel_x) >= 1 or abs(anterior[1] - tanque.pixel_y) >= 1):
+            self.correcciones += 1
+
+    def _aplicar(self, entrada, bloqueada):
+        # Un tick del tanque como en MotorJuego: primero avanza el movimiento en
+        # curso y después la entrada puede empezar otro (sin disparos: las balas
+        # las crea el servidor)
+        _, mover, detenerse = entrada
+        tanque = self.tanque
+        tanque.update_posicion_pixel(TIEMPO_TICK_LOGICA_MS / 1000.0)
+        if tanque.is_moving: return
+        intencion = STAY
+        if detenerse:
+            tanque.detenido_por_usuario = True
+        elif mover:
+            tanque.detenido_por_usuario = False
+            intencion = tuple(mover)
+        tanque.intentar_mover(intencion)
+        if tanque.accion_actual != STAY and not tanque.detenido_por_usuario:
+            nueva_x = tanque.x_tile + tanque.accion_actual[0]
+            nueva_y = tanque.y_tile + tanque.accion_actual[1]
+            if not bloqueada(nueva_x, nueva_y): tanque.iniciar_movimiento_a_casilla(nueva_x, nueva_y)
@@ -0,0 +1,69 @@
+# backend/vision.py
+# Índice de visibilidad para consultas de línea de visión en la misma fila o
+# columna. Guarda sumas prefijas de muros por fila y por columna, de modo que
+# saber si hay un muro entre dos casillas alineadas es una resta O(1).
+# Se reconstruye de forma perezosa cuando cambia la capa de muros del mapa de
+# ocupación (version_muros) o cuando alguien llama a invalidar().
+from array import array
+
+
+class IndiceVision:
+    def __init__(self, ocupacion):
+        self.ocupacion = ocupacion
+        self._version_muros = None
+        self.reconstrucciones = 0
+
+    def invalidar(self):
+        # Gancho para cuando los muros cambien fuera del flujo normal (p. ej. destructibles)
+        self._version_muros = None
+
+    def _asegurar_actualizado(self):
+        if self._version_muros != self.ocupacion.version_muros:
+            self._reconstruir()
+
+    def _reconstruir(self):
+        ocupacion = self.ocupacion
+        ancho, alto, muros = ocupacion.ancho, ocupacion.alto, ocupacion.muros
+        # prefijo_filas[y * (ancho + 1) + x] = muros en la fila y con columna < x
+        prefijo_filas = array('i', [0]) * ((ancho + 1) * alto)
+        # prefijo_columnas[x * (alto + 1) + y] = muros en la columna x con fila < y
+        prefijo_columnas = array('i', [0]) * ((alto + 1) * ancho)
+        for y in range(alto):
+            base_muros = y * ancho
+            base_prefijo = y * (ancho + 1)
+            acumulado = 0
+            for x in range(ancho):
+                if muros[base_muros + x]: acumulado += 1
+                prefijo_filas[base_prefijo + x + 1] = acumulado
+        for x in range(ancho):
+            base_prefijo = x * (alto + 1)
+            acumulado = 0
+            for y in range(alto):
+                if muros[y * ancho + x]: acumulado += 1
+                prefijo_columnas[base_prefijo + y + 1] = acumulado
+        self._prefijo_filas = prefijo_filas
+        self._prefijo_columnas = prefijo_columnas
+        self._version_muros = ocupacion.version_muros
+        self.reconstrucciones += 1
+
+    def muros_entre(self, x1, y1, x2, y2):
+        # Número de muros estrictamente entre dos casillas alineadas, o None si no lo están
+        self._asegurar_actualizado()
+        if y1 == y2:
+            if not (0 <= y1 < self.ocupacion.alto): return None
+            desde, hasta = (x1, x2) if x1 <= x2 else (x2, x1)
+            desde = max(desde + 1, 0); hasta = min(hasta, self.ocupacion.ancho)
+            if hasta <= desde: return 0
+            base = y1 * (self.ocupacion.ancho + 1)
+            return self._prefijo_filas[base + hasta] - self._prefijo_filas[base + desde]
+        if x1 == x2:
+            if not (0 <= x1 < self.ocupacion.ancho): return None
+            desde, hasta = (y1, y2) if y1 <= y2 else (y2, y1)
+            desde = max(desde + 1, 0); hasta = min(hasta, self.ocupacion.alto)
+            if hasta <= desde: return 0
+            base = x1 * (self.ocupacion.alto + 1)
+            return self._prefijo_columnas[base + hasta] - self._prefijo_columnas[base + desde]
+        return None
+
+    def hay_linea_de_vision(self, x1, y1, x2, y2):
+        return self.muros_entre(x1, y1, x2, y2) == 0
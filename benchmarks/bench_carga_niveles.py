@@ -0,0 +1,103 @@
+# benchmarks/bench_carga_niveles.py
+# Mide lo que cuesta cargar_nivel() con un archivo del editor: la primera vez
+# (leer y compilar el mapa, caché vacía) y las siguientes (reintentar o volver
+# a elegir el nivel: solo se instancia la plantilla de backend/niveles.py).
+# Corre los niveles de niveles_editados y mapas generados con muchos enemigos.
+# También compara leer un mapa grande en texto del editor y en binario (.nvb).
+# Uso: python -m benchmarks.bench_carga_niveles [--repeticiones N]
+import argparse
+import glob
+import os
+import sys
+import tempfile
+import time
+from contextlib import redirect_stdout
+
+from constantes import GRID_WIDTH, GRID_HEIGHT, EDITOR_NIVELES_PATH
+from backend.motor_juego import MotorJuego
+from backend.niveles import vaciar_cache_plantillas, leer_plantilla, compilar_nivel, escribir_nivel_binario
+from benchmarks.bench_motor import generar_nivel
+
+# (nombre, densidad de muros internos, enemigos pedidos)
+MAPAS_GENERADOS = [
+    ("generado_muros", 0.25, 20),
+    ("generado_lleno", 0.10, 1000),
+]
+# (lado, densidad de muros, enemigos) de los mapas grandes texto vs binario
+MAPAS_GRANDES = [(100, 0.25, 100), (300, 0.25, 500), (1000, 0.10, 2000)]
+
+
+def medir_carga(ruta, repeticiones):
+    motor = MotorJuego(semilla=1)
+    with open(os.devnull, 'w') as salida_nula, redirect_stdout(salida_nula):
+        vaciar_cache_plantillas()
+        inicio = time.perf_counter()
+        if not motor.cargar_nivel(ruta): return None
+        primera = time.perf_counter() - inicio
+        tiempos = []
+        for _ in range(repeticiones):
+            motor.reiniciar_simulacion(1)
+            inicio = time.perf_counter()
+            motor.cargar_nivel(ruta)
+            tiempos.append(time.perf_counter() - inicio)
+    tiempos.sort()
+    return {
+        "nivel": os.path.basename(ruta)[:-4],
+        "objetos": len(motor.objetos_del_juego),
+        "muros": len(motor.ocupacion.casillas_con_muro()),
+        "primera_ms": primera * 1000,
+        "siguientes_ms": tiempos[len(tiempos) // 2] * 1000,
+    }
+
+
+def medir_formatos(directorio, lado, densidad, enemigos, repeticiones):
+    lineas, _ = generar_nivel(lado, lado, densidad, enemigos, semilla=lado)
+    ruta_texto = os.path.join(directorio, f"grande_{lado}.txt")
+    ruta_binaria = os.path.join(directorio, f"grande_{lado}.nvb")
+    with open(ruta_texto, 'w') as f:
+        f.write("\n".join(lineas) + "\n")
+    escribir_nivel_binario(compilar_nivel(lineas), ruta_binaria)
+    medidas = {}
+    for formato, ruta in (("texto", ruta_texto), ("binario", ruta_binaria)):
+        tiempos = []
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            leer_plantilla(ruta)
+            tiempos.append(time.perf_counter() - inicio)
+        tiempos.sort()
+        medidas[formato] = {"ms": tiempos[len(tiempos) // 2] * 1000, "bytes": os.path.getsize(ruta)}
+    return medidas
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tiempo de carga de niveles del editor")
+    parser.add_argument("--repeticiones", type=int, default=50, help="cargas con la caché llena por nivel")
+    args = parser.parse_args(argv)
+
+    print(f"{'nivel':<26}{'objetos':>8}{'muros':>7}{'1ª ms':>9}{'sig. ms':>9}")
+    with tempfile.TemporaryDirectory() as directorio_temporal:
+        rutas = sorted(glob.glob(os.path.join(EDITOR_NIVELES_PATH, "*.txt")))
+        for nombre, densidad, enemigos in MAPAS_GENERADOS:
+            lineas, _ = generar_nivel(GRID_WIDTH, GRID_HEIGHT, densidad, enemigos, semilla=len(nombre))
+            ruta = os.path.join(directorio_temporal, nombre + ".txt")
+            with open(ruta, 'w') as f:
+                f.write("\n".join(lineas) + "\n")
+            rutas.append(ruta)
+        for ruta in rutas:
+            r = medir_carga(ruta, args.repeticiones)
+            if r is None:
+                print(f"{os.path.basename(ruta):<26}no se pudo cargar")
+                continue
+            print(f"{r['nivel']:<26}{r['objetos']:>8}{r['muros']:>7}{r['primera_ms']:>9.3f}{r['siguientes_ms']:>9.3f}")
+
+        print()
+        print(f"{'mapa':<12}{'texto ms':>10}{'texto KB':>10}{'nvb ms':>9}{'nvb KB':>9}")
+        for lado, densidad, enemigos in MAPAS_GRANDES:
+            m = medir_formatos(directorio_temporal, lado, densidad, enemigos, max(3, args.repeticiones // 10))
+            print(f"{f'{lado}x{lado}':<12}{m['texto']['ms']:>10.2f}{m['texto']['bytes'] / 1024:>10.0f}"
+                  f"{m['binario']['ms']:>9.2f}{m['binario']['bytes'] / 1024:>9.0f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
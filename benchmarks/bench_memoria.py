@@ -0,0 +1,163 @@
+# benchmarks/bench_memoria.py
+# Compara la memoria por objeto de los modelos actuales (__slots__, ids enteros,
+# muros como datos de la rejilla, balas en PoolBalas) con los de antes (__dict__
+# por instancia e id uuid.UUID), y estima lo que ocupa cada nivel de niveles_editados.
+# Uso: python -m benchmarks.bench_memoria [--n N]
+import argparse
+import gc
+import glob
+import os
+import sys
+import tracemalloc
+import uuid
+from contextlib import redirect_stdout
+
+from constantes import (
+    TILE_SIZE, RIGHT, STAY, EDITOR_NIVELES_PATH,
+    TIPO_JUGADOR, TIPO_ENEMIGO_NORMAL, TIPO_MURO, TIPO_BALA, TIPO_OBJETIVO1
+)
+from backend.modelos import AsignadorIds, TanqueJugadorModel, TanqueEnemigoModel, ObjetivoPrimarioModel
+from backend.balas import PoolBalas
+from backend.motor_juego import MotorJuego
+
+
+# --- Modelos anteriores (solo los atributos, para medir su tamaño) ---
+class _ObjetoAnterior:
+    def __init__(self, x_tile, y_tile, tipo_objeto):
+        self.id = uuid.uuid4()
+        self.tipo_objeto = tipo_objeto
+        self.activo = True
+        self.x_tile = x_tile
+        self.y_tile = y_tile
+        self.pixel_x = float(x_tile * TILE_SIZE)
+        self.pixel_y = float(y_tile * TILE_SIZE)
+
+
+class _TanqueAnterior(_ObjetoAnterior):
+    def __init__(self, x_tile, y_tile, tipo_tanque, vidas):
+        super().__init__(x_tile, y_tile, tipo_tanque)
+        self.vidas = vidas
+        self.velocidad_px_s = 60
+        self.cadencia_disparo = 1200
+        self.tiempo_ultimo_disparo = 0
+        self.direccion_actual = RIGHT
+        self.accion_actual = STAY
+        self.is_moving = False
+        self.target_pixel_x = self.pixel_x
+        self.target_pixel_y = self.pixel_y
+
+
+class _JugadorAnterior(_TanqueAnterior):
+    def __init__(self, x_tile, y_tile):
+        super().__init__(x_tile, y_tile, TIPO_JUGADOR, 3)
+        self.vidas_por_nivel = 3
+        self.detenido_por_usuario = False
+        self.last_known_tile_pos = (x_tile, y_tile)
+
+
+class _EnemigoAnterior(_TanqueAnterior):
+    def __init__(self, x_tile, y_tile):
+        super().__init__(x_tile, y_tile, TIPO_ENEMIGO_NORMAL, 2)
+        self.objetivo_primario_id_asignado = None
+        self.rango_vision = 7
+        self.rango_disparo = 5
+        self.ruta_actual_tiles = []
+        self.frecuencia_decision_patrulla = 60
+        self.ticks_para_nueva_decision_patrulla = 10
+        self.direccion_patrulla_actual = STAY
+        self.fue_destruido_visual = False
+        self.tiempo_destruccion_visual = 0
+        self.duracion_explosion_visual = 300
+        self.base_recalc_interval = 55
+        self.ticks_para_recalcular_ruta = 30
+        self.ultima_pos_jugador_vista_para_ruta = None
+
+
+class _BalaAnterior(_ObjetoAnterior):
+    def __init__(self, pixel_x, pixel_y):
+        super().__init__(int(pixel_x / TILE_SIZE), int(pixel_y / TILE_SIZE), TIPO_BALA)
+        self.pixel_x = pixel_x
+        self.pixel_y = pixel_y
+        self.direccion_vector = RIGHT
+        self.propietario_id = None
+        self.tipo_propietario = TIPO_JUGADOR
+
+
+def _medir(construir, n):
+    # Bytes reservados por construir(n) divididos entre n; descuenta la lista contenedora
+    gc.collect()
+    tracemalloc.start()
+    antes = tracemalloc.get_traced_memory()[0]
+    resultado = construir(n)
+    usado = tracemalloc.get_traced_memory()[0] - antes
+    tracemalloc.stop()
+    if isinstance(resultado, list): usado -= sys.getsizeof(resultado)
+    del resultado
+    return usado / n
+
+
+def _crear_balas(n):
+    ids = AsignadorIds()
+    pool = PoolBalas(n)
+    for i in range(n):
+        pool.crear(i * 0.5 + 20.25, 100.5, RIGHT, None, TIPO_JUGADOR, ids.nuevo())
+    return pool
+
+
+def medir_por_objeto(n):
+    ids = AsignadorIds(10 ** 6) # Fuera de la caché de enteros pequeños, como en una partida larga
+    filas = [
+        ("muro", _medir(lambda k: [_ObjetoAnterior(i % 20, i // 20, TIPO_MURO) for i in range(k)], n),
+         _medir(lambda k: bytearray(k), n)),
+        ("jugador", _medir(lambda k: [_JugadorAnterior(i % 20, i // 20) for i in range(k)], n),
+         _medir(lambda k: [TanqueJugadorModel(i % 20, i // 20, id_obj=ids.nuevo()) for i in range(k)], n)),
+        ("enemigo", _medir(lambda k: [_EnemigoAnterior(i % 20, i // 20) for i in range(k)], n),
+         _medir(lambda k: [TanqueEnemigoModel(i % 20, i // 20, TIPO_ENEMIGO_NORMAL, id_obj=ids.nuevo()) for i in range(k)], n)),
+        ("objetivo", _medir(lambda k: [_ObjetoAnterior(i % 20, i // 20, TIPO_OBJETIVO1) for i in range(k)], n),
+         _medir(lambda k: [ObjetivoPrimarioModel(i % 20, i // 20, TIPO_OBJETIVO1, id_obj=ids.nuevo()) for i in range(k)], n)),
+        ("bala", _medir(lambda k: [_BalaAnterior(i * 0.5 + 20.25, 100.5) for i in range(k)], n),
+         _medir(_crear_balas, n)),
+    ]
+    return {nombre: {"antes": antes, "ahora": ahora} for nombre, antes, ahora in filas}
+
+
+def estimar_niveles(por_objeto):
+    niveles = []
+    for ruta in sorted(glob.glob(os.path.join(EDITOR_NIVELES_PATH, "*.txt"))):
+        motor = MotorJuego()
+        with open(os.devnull, 'w') as salida_nula, redirect_stdout(salida_nula):
+            if not motor.cargar_nivel(ruta): continue
+        muros = sum(1 for hay in motor.ocupacion.muros if hay)
+        enemigos = len(motor.enemigos)
+        objetivos = len(motor.objetivos)
+        celdas = motor.ocupacion.ancho * motor.ocupacion.alto
+        antes = (muros * por_objeto["muro"]["antes"] + enemigos * por_objeto["enemigo"]["antes"]
+                 + objetivos * por_objeto["objetivo"]["antes"] + por_objeto["jugador"]["antes"])
+        ahora = (celdas * por_objeto["muro"]["ahora"] + enemigos * por_objeto["enemigo"]["ahora"]
+                 + objetivos * por_objeto["objetivo"]["ahora"] + por_objeto["jugador"]["ahora"])
+        niveles.append({"nivel": os.path.basename(ruta)[:-4], "muros": muros, "enemigos": enemigos,
+                        "objetivos": objetivos, "antes_kb": antes / 1024, "ahora_kb": ahora / 1024})
+    return niveles
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Memoria por objeto de los modelos")
+    parser.add_argument("--n", type=int, default=20000, help="objetos creados por medición")
+    args = parser.parse_args(argv)
+
+    por_objeto = medir_por_objeto(args.n)
+    print(f"{'objeto':<10}{'antes B':>10}{'ahora B':>10}{'ahorro':>9}")
+    for nombre, medida in por_objeto.items():
+        ahorro = 1 - medida["ahora"] / medida["antes"] if medida["antes"] else 0.0
+        print(f"{nombre:<10}{medida['antes']:>10.0f}{medida['ahora']:>10.0f}{ahorro:>9.0%}")
+
+    print()
+    print(f"{'nivel':<20}{'muros':>6}{'enem':>6}{'obj':>5}{'antes KB':>10}{'ahora KB':>10}")
+    for nivel in estimar_niveles(por_objeto):
+        print(f"{nivel['nivel']:<20}{nivel['muros']:>6}{nivel['enemigos']:>6}{nivel['objetivos']:>5}"
+              f"{nivel['antes_kb']:>10.1f}{nivel['ahora_kb']:>10.1f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# benchmarks/bench_motor.py
+# Mide cómo escala MotorJuego.actualizar_estado con el tamaño y la densidad del
+# nivel: genera mapas de prueba (muros, 10/100/1000 enemigos, muchas balas,
+# mundos de 100x100 y 300x300 casillas) y además corre los niveles procedurales
+# y los de niveles_editados.
+# Con --repeticiones también vuelve a jugar partidas grabadas por el juego
+# (backend/repeticion.py): entradas de personas reales en vez de un bot.
+# Por escenario reporta ticks/s, latencia p50/p99 por tick, búsquedas A* y
+# recálculos del campo de flujo por tick y pico de memoria, y lo guarda en JSON.
+# Uso: python -m benchmarks.bench_motor [--ticks N] [--salida archivo.json] [--rapido]
+#      [--repeticiones archivo.rep|carpeta ...]
+import argparse
+import glob
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from contextlib import redirect_stdout
+
+from constantes import (
+    GRID_WIDTH, GRID_HEIGHT, EDITOR_NIVELES_PATH,
+    EDITOR_CHAR_VACIO, EDITOR_CHAR_MURO, EDITOR_CHAR_JUGADOR,
+    EDITOR_CHAR_ENEMIGO_NORMAL, EDITOR_CHAR_ENEMIGO_RAPIDO, EDITOR_CHAR_ENEMIGO_FUERTE,
+    EDITOR_CHAR_OBJETIVO1, EDITOR_CHAR_OBJETIVO2
+)
+from backend.motor_juego import MotorJuego
+from backend.simulacion import PoliticaAleatoria, TIEMPO_DELTA_TICK_MS
+from backend.repeticion import ReproductorRepeticion, EXTENSION_REPETICION
+
+# (nombre, densidad de muros internos, enemigos pedidos, probabilidad de disparo del jugador)
+ESCENARIOS_GENERADOS = [
+    ("abierto_10", 0.0, 10, 0.2),
+    ("abierto_100", 0.0, 100, 0.2),
+    ("muros_10", 0.25, 10, 0.2),
+    ("muros_100", 0.25, 100, 0.2),
+    ("lleno_1000", 0.10, 1000, 0.2),
+    ("balas_100", 0.0, 100, 1.0),
+]
+# (nombre, lado del mapa, densidad de muros, enemigos, probabilidad de disparo):
+# mundos más grandes que la pantalla
+ESCENARIOS_GRANDES = [
+    ("grande_100x100", 100, 0.25, 100, 0.2),
+    ("grande_300x300", 300, 0.25, 1000, 0.2),
+]
+TICKS_MEDICION_MEMORIA = 300
+CARACTERES_ENEMIGO = (EDITOR_CHAR_ENEMIGO_NORMAL, EDITOR_CHAR_ENEMIGO_RAPIDO, EDITOR_CHAR_ENEMIGO_FUERTE)
+
+
+def generar_nivel(ancho, alto, densidad_muros, enemigos, semilla, objetivos=2):
+    # Devuelve las líneas de un mapa en formato del editor. Si no caben todos los
+    # enemigos pedidos se colocan tantos como casillas libres haya.
+    rng = random.Random(semilla)
+    celdas = [[EDITOR_CHAR_VACIO] * ancho for _ in range(alto)]
+    for x in range(ancho):
+        celdas[0][x] = celdas[alto - 1][x] = EDITOR_CHAR_MURO
+    for y in range(alto):
+        celdas[y][0] = celdas[y][ancho - 1] = EDITOR_CHAR_MURO
+
+    interiores = [(x, y) for y in range(1, alto - 1) for x in range(1, ancho - 1)]
+    rng.shuffle(interiores)
+    jugador_x, jugador_y = interiores.pop()
+    celdas[jugador_y][jugador_x] = EDITOR_CHAR_JUGADOR
+    for _ in range(int(len(interiores) * densidad_muros)):
+        x, y = interiores.pop()
+        celdas[y][x] = EDITOR_CHAR_MURO
+    for i in range(min(objetivos, len(interiores))):
+        x, y = interiores.pop()
+        celdas[y][x] = EDITOR_CHAR_OBJETIVO1 if i % 2 == 0 else EDITOR_CHAR_OBJETIVO2
+    colocados = 0
+    while interiores and colocados < enemigos:
+        x, y = interiores.pop()
+        celdas[y][x] = rng.choice(CARACTERES_ENEMIGO)
+        colocados += 1
+    return ["".join(fila) for fila in celdas], colocados
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados: return 0.0
+    indice = min(len(valores_ordenados) - 1, int(round(p / 100.0 * (len(valores_ordenados) - 1))))
+    return valores_ordenados[indice]
+
+
+def _preparar_motor(nivel, usar_campo_flujo, semilla):
+    motor = MotorJuego(semilla=semilla)
+    motor.usar_campo_flujo = usar_campo_flujo
+    if not motor.cargar_nivel(nivel): return None
+    # El jugador no muere para que todos los ticks midan el mismo trabajo
+    jugador = motor.objetos_del_juego.get(motor.jugador_id)
+    if jugador: jugador.vidas = 10 ** 9
+    return motor
+
+
+def correr_escenario(nombre, nivel, ticks, usar_campo_flujo, semilla, prob_disparo=0.2, extra=None):
+    with open(os.devnull, 'w') as salida_nula, redirect_stdout(salida_nula):
+        motor = _preparar_motor(nivel, usar_campo_flujo, semilla)
+        if motor is None: return None
+        politica = PoliticaAleatoria(semilla=semilla, prob_disparo=prob_disparo)
+        enemigos_iniciales = len(motor.enemigos)
+        busquedas_antes = motor.buscador_rutas.busquedas
+        expansiones_antes = motor.buscador_rutas.expansiones_totales
+        recalculos_antes = motor.campo_flujo.recalculos
+
+        latencias = []
+        balas_max = 0
+        inicio_total = time.perf_counter()
+        for tick in range(ticks):
+            acciones = politica(motor, tick)
+            inicio = time.perf_counter()
+            motor.actualizar_estado(acciones, TIEMPO_DELTA_TICK_MS)
+            latencias.append(time.perf_counter() - inicio)
+            if tick % 10 == 0:
+                balas_max = max(balas_max, len(motor.balas))
+        duracion_total = time.perf_counter() - inicio_total
+
+        # Segunda pasada, más corta, solo para el pico de memoria (tracemalloc ralentiza)
+        tracemalloc.start()
+        motor_memoria = _preparar_motor(nivel, usar_campo_flujo, semilla)
+        politica_memoria = PoliticaAleatoria(semilla=semilla, prob_disparo=prob_disparo)
+        for tick in range(min(ticks, TICKS_MEDICION_MEMORIA)):
+            motor_memoria.actualizar_estado(politica_memoria(motor_memoria, tick), TIEMPO_DELTA_TICK_MS)
+        _, pico_memoria = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    resultado = _resultado(nombre, motor, latencias, enemigos_iniciales, balas_max, pico_memoria, duracion_total,
+                           busquedas_antes, expansiones_antes, recalculos_antes)
+    if extra: resultado.update(extra)
+    return resultado
+
+
+def correr_repeticion(ruta, ticks=None):
+    # Las entradas, niveles y semillas salen de la repetición; el jugador no se
+    # hace inmortal ni se cambian las rutas porque la partida se desincronizaría
+    nombre = "rep_" + os.path.basename(ruta)[:-len(EXTENSION_REPETICION)]
+    with open(os.devnull, 'w') as salida_nula, redirect_stdout(salida_nula):
+        reproductor = ReproductorRepeticion(ruta, intervalo_claves=0)
+        ticks = min(ticks or reproductor.total_ticks, reproductor.total_ticks)
+        if ticks == 0: return None
+        motor = reproductor.motor
+        latencias = []
+        balas_max = enemigos_max = 0
+        inicio_total = time.perf_counter()
+        while reproductor.tick < ticks:
+            reproductor.avanzar(min(10, ticks - reproductor.tick), latencias)
+            balas_max = max(balas_max, len(motor.balas))
+            enemigos_max = max(enemigos_max, len(motor.enemigos))
+        duracion_total = time.perf_counter() - inicio_total
+
+        tracemalloc.start()
+        reproductor_memoria = ReproductorRepeticion(ruta, intervalo_claves=0)
+        reproductor_memoria.avanzar(min(ticks, TICKS_MEDICION_MEMORIA))
+        _, pico_memoria = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    resultado = _resultado(nombre, motor, latencias, enemigos_max, balas_max, pico_memoria, duracion_total, 0, 0, 0)
+    resultado["niveles"] = len(reproductor.niveles)
+    resultado["desincronizaciones"] = reproductor.desincronizaciones
+    return resultado
+
+
+def _resultado(nombre, motor, latencias, enemigos, balas_max, pico_memoria, duracion_total,
+               busquedas_antes, expansiones_antes, recalculos_antes):
+    ticks = len(latencias)
+    latencias.sort()
+    suma_latencias = sum(latencias)
+    return {
+        "escenario": nombre,
+        "rutas": "campo_flujo" if motor.usar_campo_flujo else "a_estrella",
+        "ticks": ticks,
+        "grid": [motor.ocupacion.ancho, motor.ocupacion.alto],
+        "enemigos": enemigos,
+        "balas_max": balas_max,
+        "ticks_por_segundo": ticks / suma_latencias if suma_latencias > 0 else 0.0,
+        "latencia_p50_ms": _percentil(latencias, 50) * 1000,
+        "latencia_p99_ms": _percentil(latencias, 99) * 1000,
+        "latencia_max_ms": latencias[-1] * 1000 if latencias else 0.0,
+        "a_estrella_por_tick": (motor.buscador_rutas.busquedas - busquedas_antes) / ticks,
+        "expansiones_por_tick": (motor.buscador_rutas.expansiones_totales - expansiones_antes) / ticks,
+        "campo_flujo_por_tick": (motor.campo_flujo.recalculos - recalculos_antes) / ticks,
+        "pico_memoria_kb": pico_memoria / 1024,
+        "duracion_s": duracion_total,
+    }
+
+
+def _escenarios(directorio_temporal, rapido):
+    escenarios = []
+    generados = [(nombre, GRID_WIDTH, GRID_HEIGHT, densidad, enemigos, prob_disparo)
+                 for nombre, densidad, enemigos, prob_disparo in ESCENARIOS_GENERADOS]
+    generados += [(nombre, lado, lado, densidad, enemigos, prob_disparo)
+                  for nombre, lado, densidad, enemigos, prob_disparo in ESCENARIOS_GRANDES]
+    for nombre, ancho, alto, densidad, enemigos, prob_disparo in generados:
+        if rapido and enemigos > 100: continue
+        lineas, colocados = generar_nivel(ancho, alto, densidad, enemigos, semilla=len(nombre))
+        ruta = os.path.join(directorio_temporal, nombre + ".txt")
+        with open(ruta, 'w') as f:
+            f.write("\n".join(lineas) + "\n")
+        escenarios.append((nombre, ruta, prob_disparo, {"enemigos_pedidos": enemigos}))
+    for numero_nivel in (1, 2, 3):
+        escenarios.append((f"procedural_{numero_nivel}", numero_nivel, 0.2, None))
+    for ruta in sorted(glob.glob(os.path.join(EDITOR_NIVELES_PATH, "*.txt"))):
+        escenarios.append((os.path.basename(ruta)[:-4], ruta, 0.2, None))
+    return escenarios
+
+
+def _rutas_repeticiones(entradas):
+    rutas = []
+    for entrada in entradas:
+        if os.path.isdir(entrada): rutas.extend(sorted(glob.glob(os.path.join(entrada, "*" + EXTENSION_REPETICION))))
+        else: rutas.append(entrada)
+    return rutas
+
+
+def _imprimir_fila(r):
+    print(f"{r['escenario'][:25]:<26}{r['rutas']:<13}{r['enemigos']:>5}{r['balas_max']:>6}{r['ticks_por_segundo']:>10.0f}"
+          f"{r['latencia_p50_ms']:>9.3f}{r['latencia_p99_ms']:>9.3f}{r['a_estrella_por_tick']:>9.2f}{r['pico_memoria_kb']:>9.0f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark de ticks del motor")
+    parser.add_argument("--ticks", type=int, default=1000)
+    parser.add_argument("--salida", default="bench_motor.json")
+    parser.add_argument("--rutas", choices=["campo_flujo", "a_estrella", "ambos"], default="ambos")
+    parser.add_argument("--semilla", type=int, default=1234)
+    parser.add_argument("--rapido", action="store_true", help="omite los escenarios de más de 100 enemigos")
+    parser.add_argument("--repeticiones", nargs="+", default=[],
+                        help="repeticiones (o carpetas con ellas) a medir además de los escenarios")
+    args = parser.parse_args(argv)
+
+    modos = {"campo_flujo": [True], "a_estrella": [False], "ambos": [True, False]}[args.rutas]
+    resultados = []
+    print(f"{'escenario':<26}{'rutas':<13}{'enem':>5}{'balas':>6}{'ticks/s':>10}{'p50 ms':>9}{'p99 ms':>9}{'A*/tick':>9}{'mem KB':>9}")
+    with tempfile.TemporaryDirectory() as directorio_temporal:
+        for nombre, nivel, prob_disparo, extra in _escenarios(directorio_temporal, args.rapido):
+            for usar_campo_flujo in modos:
+                r = correr_escenario(nombre, nivel, args.ticks, usar_campo_flujo, args.semilla, prob_disparo, extra)
+                if r is None:
+                    print(f"{nombre:<26}no se pudo cargar")
+                    continue
+                resultados.append(r)
+                _imprimir_fila(r)
+    # En las repeticiones se miden todos sus ticks (--ticks no se aplica) y solo
+    # con las rutas con que se grabaron
+    for ruta in _rutas_repeticiones(args.repeticiones):
+        r = correr_repeticion(ruta)
+        if r is None:
+            print(f"{os.path.basename(ruta):<26}repetición vacía")
+            continue
+        resultados.append(r)
+        _imprimir_fila(r)
+        if r["desincronizaciones"]: print(f"  ¡{r['desincronizaciones']} desincronizaciones: el motor ya no reproduce esta partida!")
+
+    with open(args.salida, 'w') as f:
+        json.dump({"ticks": args.ticks, "semilla": args.semilla, "resultados": resultados}, f, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+# benchmarks/bench_protocolo.py
+# Compara bytes por mensaje y CPU de codificar+decodificar de los 'game_update'
+# en JSON (como antes) y con el protocolo binario de protocolo_red.py, sobre una
+# traza sintética de un jugador que se mueve, gira y dispara.
+# Uso: python -m benchmarks.bench_protocolo [--mensajes N] [--lote K]
+import argparse
+import json
+import random
+import sys
+import time
+
+from constantes import DIRECTIONS, TIPO_JUGADOR, GRID_WIDTH, GRID_HEIGHT, TILE_SIZE, TIEMPO_TICK_LOGICA_MS
+from protocolo_red import SesionProtocolo
+
+
+def generar_traza(n, semilla=1):
+    rng = random.Random(semilla)
+    x, y, direccion = GRID_WIDTH // 2, GRID_HEIGHT // 2, DIRECTIONS[0]
+    id_hex = format(rng.getrandbits(128), '032x')
+    traza = []
+    for tick in range(n):
+        # Un tanque cambia de casilla cada pocos ticks y gira de vez en cuando
+        if rng.random() < 0.05: direccion = rng.choice(DIRECTIONS)
+        if tick % 4 == 0:
+            x = min(max(1, x + direccion[0]), GRID_WIDTH - 2)
+            y = min(max(1, y + direccion[1]), GRID_HEIGHT - 2)
+        traza.append({"type": "game_update", "id": id_hex, "tipo": TIPO_JUGADOR,
+                      "x_tile": x, "y_tile": y, "pixel_x": x * TILE_SIZE, "pixel_y": y * TILE_SIZE,
+                      "direccion": direccion, "disparo": rng.random() < 0.03,
+                      "t": tick * TIEMPO_TICK_LOGICA_MS, "secuencia": tick})
+    return traza
+
+
+def medir_json(traza):
+    inicio = time.perf_counter()
+    total = 0
+    for mensaje in traza:
+        texto = json.dumps(mensaje)
+        total += len(texto.encode())
+        json.loads(texto)
+    return total, time.perf_counter() - inicio
+
+
+def medir_binario(traza, lote):
+    # Dos extremos que se mandan la misma traza: el ack de cada uno va en la
+    # cabecera de sus propias tramas, como en una partida
+    a, b = SesionProtocolo(1), SesionProtocolo(2)
+    inicio = time.perf_counter()
+    total = 0
+    recibidos = 0
+    for i, mensaje in enumerate(traza, 1):
+        a.agregar(mensaje)
+        b.agregar(mensaje)
+        if i % lote == 0 or i == len(traza):
+            trama_a, trama_b = a.cerrar_trama(), b.cerrar_trama()
+            total += len(trama_a) + len(trama_b)
+            recibidos += len(b.decodificar(trama_a)) + len(a.decodificar(trama_b))
+    assert recibidos == 2 * len(traza)
+    return total / 2, (time.perf_counter() - inicio) / 2
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Tamaño y coste del protocolo de red")
+    parser.add_argument("--mensajes", type=int, default=50000)
+    parser.add_argument("--lote", type=int, default=1, help="game_update por trama binaria")
+    args = parser.parse_args(argv)
+
+    traza = generar_traza(args.mensajes)
+    bytes_json, t_json = medir_json(traza)
+    bytes_bin, t_bin = medir_binario(traza, args.lote)
+    n = len(traza)
+    print(f"{'formato':<10}{'B/msg':>8}{'us/msg':>9}")
+    print(f"{'json':<10}{bytes_json / n:>8.1f}{t_json / n * 1e6:>9.2f}")
+    print(f"{'binario':<10}{bytes_bin / n:>8.1f}{t_bin / n * 1e6:>9.2f}")
+    print(f"bytes x{bytes_json / bytes_bin:.1f} menos, cpu x{t_json / t_bin:.1f} menos (lote de {args.lote})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,89 @@
+# benchmarks/bench_rutas.py
+# Compara el A* original del motor (rutas copiadas en cada entrada del heap)
+# con BuscadorAEstrella sobre los mapas de niveles_editados.
+# Uso (desde la raíz del proyecto): python -m benchmarks.bench_rutas [consultas_por_mapa]
+import contextlib
+import glob
+import heapq
+import io
+import os
+import random
+import sys
+import time
+
+from constantes import DIRECTIONS, EDITOR_NIVELES_PATH
+from backend.motor_juego import MotorJuego
+
+
+def a_estrella_original(ocupacion, inicio, fin):
+    # Copia del _encontrar_ruta_a_estrella anterior a backend/rutas.py
+    frontera = [(0, 0, inicio, [])]
+    visitados = set()
+    visitados.add(inicio)
+
+    while frontera:
+        _, costo_actual, pos_actual, camino = heapq.heappop(frontera)
+
+        if pos_actual == fin:
+            return camino + [pos_actual]
+
+        for direccion in DIRECTIONS:
+            vecino = (pos_actual[0] + direccion[0], pos_actual[1] + direccion[1])
+
+            if ocupacion.es_transitable(vecino[0], vecino[1]) and vecino not in visitados:
+                visitados.add(vecino)
+                nuevo_costo = costo_actual + 1
+
+                heuristica = abs(vecino[0] - fin[0]) + abs(vecino[1] - fin[1])
+                costo_total_estimado = nuevo_costo + heuristica
+
+                heapq.heappush(frontera, (costo_total_estimado, nuevo_costo, vecino, camino + [pos_actual]))
+
+    return None
+
+
+def _consultas_para_mapa(ocupacion, cantidad, semilla):
+    libres = [(x, y) for y in range(ocupacion.alto) for x in range(ocupacion.ancho) if ocupacion.es_transitable(x, y)]
+    rng = random.Random(semilla)
+    return [(rng.choice(libres), rng.choice(libres)) for _ in range(cantidad)]
+
+
+def _medir(funcion, consultas):
+    inicio = time.perf_counter()
+    rutas = [funcion(a, b) for a, b in consultas]
+    return time.perf_counter() - inicio, rutas
+
+
+def main(consultas_por_mapa=500):
+    rutas_mapas = sorted(glob.glob(os.path.join(EDITOR_NIVELES_PATH, "*.txt")))
+    if not rutas_mapas:
+        print(f"No hay mapas en {EDITOR_NIVELES_PATH}")
+        return 1
+
+    print(f"{'mapa':<28}{'original ms':>13}{'nuevo ms':>11}{'speedup':>9}{'exp/búsq':>10}{'difieren':>10}")
+    for ruta_mapa in rutas_mapas:
+        motor = MotorJuego()
+        with contextlib.redirect_stdout(io.StringIO()):
+            if not motor.cargar_nivel(ruta_mapa): continue
+        ocupacion = motor.ocupacion
+        consultas = _consultas_para_mapa(ocupacion, consultas_por_mapa, semilla=len(ruta_mapa))
+
+        buscador = motor.buscador_rutas
+        # Presupuesto ilimitado para comparar longitudes de ruta con el original
+        sin_limite = ocupacion.ancho * ocupacion.alto + 1
+        t_original, rutas_original = _medir(lambda a, b: a_estrella_original(ocupacion, a, b), consultas)
+        expansiones_antes = buscador.expansiones_totales
+        t_nuevo, rutas_nuevas = _medir(lambda a, b: buscador.buscar(a, b, sin_limite), consultas)
+        expansiones_media = (buscador.expansiones_totales - expansiones_antes) / len(consultas)
+
+        # Solo cuenta como diferencia una longitud distinta (puede haber varias rutas óptimas)
+        difieren = sum(1 for r1, r2 in zip(rutas_original, rutas_nuevas)
+                       if (r1 is None) != (r2 is None) or (r1 and len(r1) != len(r2)))
+        nombre = os.path.basename(ruta_mapa)
+        print(f"{nombre:<28}{t_original * 1000 / len(consultas):>13.4f}{t_nuevo * 1000 / len(consultas):>11.4f}"
+              f"{t_original / t_nuevo:>9.2f}{expansiones_media:>10.1f}{difieren:>10}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 500))
@@ -0,0 +1,147 @@
+# benchmarks/carga_relay.py
+# Prueba de carga del relay local: arranca servidor_relay.py en otro proceso,
+# abre dos clientes Network (sin pygame) por sala, los une con 'join' y les
+# hace mandar 'game_update' a la frecuencia pedida. Mide mensajes/s
+# entregados, percentiles de latencia de reenvío (envío -> llegada al otro
+# cliente de la sala) y memoria del relay por sala (VmRSS de /proc, Linux).
+# Los clientes corren en este mismo proceso, así que con muchas salas el
+# generador de carga también compite por la CPU: se indica lo enviado para
+# comparar.
+# Uso: python -m benchmarks.carga_relay [--salas 10,100,1000] [--hz 10] [--duracion 5]
+import argparse
+import contextlib
+import io
+import os
+import socket
+import subprocess
+import sys
+import time
+
+from constantes import PUERTO_RELAY_LOCAL, TIPO_JUGADOR, RIGHT
+from network import Network
+
+RAIZ_PROYECTO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class ClienteCarga(Network):
+    # Network que en vez de encolar lo recibido apunta la latencia de cada mensaje
+    def __init__(self, url):
+        # Sin límite de tasa ni supresión: el generador decide cuándo se envía
+        super().__init__(url, binario=False, tasa_envio_hz=0, solo_cambios=False)
+        self.latencias = []
+
+    def _encolar(self, data):
+        self.mensajes_recibidos += 1
+        t_envio = data.get("t_envio")
+        if t_envio is not None: self.latencias.append(time.perf_counter() - t_envio)
+
+
+def _memoria_proceso_kb(pid):
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"): return int(linea.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def _esperar_puerto(puerto, limite_s=5.0):
+    fin = time.monotonic() + limite_s
+    while time.monotonic() < fin:
+        try:
+            with socket.create_connection(("127.0.0.1", puerto), timeout=0.2): return True
+        except OSError:
+            time.sleep(0.05)
+    return False
+
+
+def _esperar(condicion, limite_s):
+    fin = time.monotonic() + limite_s
+    while time.monotonic() < fin:
+        if condicion(): return True
+        time.sleep(0.05)
+    return False
+
+
+def _percentil(valores_ordenados, p):
+    if not valores_ordenados: return 0.0
+    return valores_ordenados[min(len(valores_ordenados) - 1, int(len(valores_ordenados) * p))]
+
+
+def medir_salas(n_salas, hz, duracion_s, puerto):
+    servidor = subprocess.Popen([sys.executable, os.path.join(RAIZ_PROYECTO, "servidor_relay.py"), "--puerto", str(puerto)],
+                                cwd=RAIZ_PROYECTO, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    clientes = []
+    try:
+        if not _esperar_puerto(puerto): raise RuntimeError("El relay no arrancó")
+        memoria_base_kb = _memoria_proceso_kb(servidor.pid)
+        url = f"ws://127.0.0.1:{puerto}"
+        with contextlib.redirect_stdout(io.StringIO()):
+            for sala in range(n_salas):
+                for _ in range(2):
+                    cliente = ClienteCarga(url)
+                    cliente.connect(f"carga-{sala}")
+                    clientes.append(cliente)
+            _esperar(lambda: all(c.is_connected for c in clientes), 10 + n_salas / 50)
+            conectados = sum(1 for c in clientes if c.is_connected)
+            # Margen para que el relay procese los 'join'
+            time.sleep(0.5)
+            memoria_kb = _memoria_proceso_kb(servidor.pid)
+
+            periodo = 1.0 / hz
+            enviados = 0
+            inicio = time.perf_counter()
+            siguiente = inicio
+            while time.perf_counter() - inicio < duracion_s:
+                for cliente in clientes:
+                    cliente.send({"type": "game_update", "id": id(cliente), "tipo": TIPO_JUGADOR,
+                                  "x_tile": 1, "y_tile": 1, "direccion": RIGHT, "disparo": False,
+                                  "t_envio": time.perf_counter()})
+                    cliente.enviar_lote()
+                    enviados += 1
+                siguiente += periodo
+                espera = siguiente - time.perf_counter()
+                if espera > 0: time.sleep(espera)
+            duracion_real = time.perf_counter() - inicio
+            time.sleep(0.5)
+            for cliente in clientes: cliente.disconnect()
+    finally:
+        servidor.terminate()
+        servidor.wait(timeout=5)
+
+    latencias = sorted(l for c in clientes for l in c.latencias)
+    recibidos = sum(c.mensajes_recibidos for c in clientes)
+    return {
+        "salas": n_salas,
+        "conectados": conectados,
+        "clientes": len(clientes),
+        "enviados_s": enviados / duracion_real,
+        "entregados_s": recibidos / duracion_real,
+        "p50_ms": _percentil(latencias, 0.50) * 1000,
+        "p95_ms": _percentil(latencias, 0.95) * 1000,
+        "p99_ms": _percentil(latencias, 0.99) * 1000,
+        "kb_por_sala": ((memoria_kb - memoria_base_kb) / n_salas) if memoria_kb and memoria_base_kb else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prueba de carga del relay local")
+    parser.add_argument("--salas", default="10,100,1000", help="lista de números de salas")
+    parser.add_argument("--hz", type=float, default=10, help="game_update por segundo y cliente")
+    parser.add_argument("--duracion", type=float, default=5, help="segundos de envío por medición")
+    parser.add_argument("--puerto", type=int, default=PUERTO_RELAY_LOCAL)
+    args = parser.parse_args(argv)
+
+    print(f"{'salas':>6}{'env/s':>10}{'entr/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'KB/sala':>9}")
+    for n_salas in (int(n) for n in args.salas.split(",")):
+        r = medir_salas(n_salas, args.hz, args.duracion, args.puerto)
+        kb = f"{r['kb_por_sala']:>9.1f}" if r["kb_por_sala"] is not None else f"{'-':>9}"
+        aviso = "" if r["conectados"] == r["clientes"] else f"  (conectados {r['conectados']}/{r['clientes']})"
+        print(f"{r['salas']:>6}{r['enviados_s']:>10.0f}{r['entregados_s']:>10.0f}{r['p50_ms']:>9.2f}"
+              f"{r['p95_ms']:>9.2f}{r['p99_ms']:>9.2f}{kb}{aviso}", flush=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,8 +4,14 @@
 SCREEN_WIDTH = 800
 SCREEN_HEIGHT = 600
 TILE_SIZE = 40
+# Tamaño por defecto del mundo (niveles procedurales, mapas nuevos del editor y
+# mínimo de los de texto). Un nivel puede ser más grande: la cámara lo recorre
 GRID_WIDTH = SCREEN_WIDTH // TILE_SIZE
 GRID_HEIGHT = SCREEN_HEIGHT // TILE_SIZE
+# El fondo (cuadrícula y muros) se dibuja por bloques de LADO_BLOQUE_FONDO casillas
+# y se guardan los MAX_BLOQUES_FONDO usados más recientemente (frontend/vista.py)
+LADO_BLOQUE_FONDO = 16
+MAX_BLOQUES_FONDO = 12
 
 # Colores (pueden ser útiles para debug o elementos simples)
 BLACK = (133, 162, 180)
@@ -35,6 +41,10 @@ VICTORIA_FINAL = "victoria_final" # <--- AÑADE ESTA LÍNEA
 PAUSA = "pausa" # <--- NUEVO ESTADO
 EDITOR_NIVELES = "editor_niveles" # Para el futuro [32]
 
+# Eventos que emite el motor (ver MotorJuego.tomar_eventos)
+EVENTO_OBJETIVO_DESTRUIDO = "objetivo_destruido"
+EVENTO_OBJETIVOS_COMPLETADOS = "objetivos_completados"
+
 # Identificadores de tipo de objeto (para el modelo)
 TIPO_JUGADOR = "jugador"
 TIPO_ENEMIGO_NORMAL = "enemigo_normal"
@@ -80,12 +90,20 @@ CADENCIA_DISPARO_JUGADOR = 200 #ms
 VELOCIDAD_BALA = 0.3 # Tiles por tick de lógica (no píxeles por frame)
 MAX_NIVELES = 3
 
+# Bucle de paso fijo: la lógica corre a ~30 Hz y el render interpola entre ticks
+TIEMPO_TICK_LOGICA_MS = 33
+MAX_TICKS_LOGICA_POR_FRAME = 5 # Si un frame tarda más, el retraso restante se descarta
+FPS_RENDER_MAXIMO = 60
+
 # Nombres de eventos personalizados (si los usas con Pygame)
 EVENTO_SIGUIENTE_NIVEL = None # Se definirá en main.py
 
 # Constantes para el Editor de Niveles
 EDITOR_NIVELES_PATH = "niveles_editados/" # Carpeta para guardar/cargar niveles
 DEFAULT_EDITOR_FILENAME = "nivel_editado"
+# Formatos de nivel: texto del editor y binario compacto para mapas grandes (backend/niveles.py)
+EDITOR_EXTENSION_TEXTO = ".txt"
+EDITOR_EXTENSION_BINARIA = ".nvb"
 EDITOR_CHAR_VACIO = ' '
 EDITOR_CHAR_MURO = 'W'
 EDITOR_CHAR_JUGADOR = 'P'
@@ -100,13 +118,13 @@ EDITOR_DISPLAY_TILE_SIZE = 20
 EDITOR_GRID_WIDTH = SCREEN_WIDTH // EDITOR_DISPLAY_TILE_SIZE
 EDITOR_GRID_HEIGHT = SCREEN_HEIGHT // EDITOR_DISPLAY_TILE_SIZE # Esto puede ser mucho si la pantalla es grande
 
-# Ajustamos para que la cuadrícula del editor coincida con la del juego
-# Si EDITOR_DISPLAY_TILE_SIZE es más pequeño, se mostrará una porción más grande del mapa
-# o el mapa completo si GRID_WIDTH * EDITOR_DISPLAY_TILE_SIZE <= SCREEN_WIDTH
-# Por simplicidad, mantendremos la misma cantidad de tiles que el juego.
-# El editor mostrará la misma cantidad de celdas que el juego.
-EDITOR_TILES_PER_SCREEN_WIDTH = GRID_WIDTH 
-EDITOR_TILES_PER_SCREEN_HEIGHT = GRID_HEIGHT
+# El editor muestra una ventana del mapa (que puede ser más grande que la
+# pantalla) y la desplaza siguiendo al cursor; abajo queda el panel de mensajes
+EDITOR_ALTO_PANEL_INFO = 100
+EDITOR_TILES_PER_SCREEN_WIDTH = SCREEN_WIDTH // EDITOR_DISPLAY_TILE_SIZE
+EDITOR_TILES_PER_SCREEN_HEIGHT = (SCREEN_HEIGHT - EDITOR_ALTO_PANEL_INFO) // EDITOR_DISPLAY_TILE_SIZE
+# Lado máximo de un mapa en el editor (el binario .nvb admite hasta 65535)
+EDITOR_MAX_LADO_MAPA = 1000
 
 # Mapeo de caracteres a tipos de objeto y viceversa (útil para el editor y carga)
 EDITOR_CHAR_TO_TYPE = {
@@ -144,12 +162,59 @@ OBJECTIVE_PATROL_RADIUS = 5 # Radio de patrulla alrededor del objetivo primario
 DFS_ACTIVATION_RANGE_SQ = DFS_ACTIVATION_RANGE * DFS_ACTIVATION_RANGE
 OBJECTIVE_PATROL_MAX_DISTANCE_SQ = (OBJECTIVE_PATROL_RADIUS + 1) * (OBJECTIVE_PATROL_RADIUS + 1) # Un poco más para que intente entrar
 OBJECTIVE_PATROL_MIN_DISTANCE_SQ = (OBJECTIVE_PATROL_RADIUS - 1) * (OBJECTIVE_PATROL_RADIUS - 1) # Un poco menos para que intente salir si está muy cerca
+# Máximo de nodos que expande una búsqueda A* antes de devolver una ruta parcial
+MAX_EXPANSIONES_A_ESTRELLA = 1000
+# Archivo donde F4 vuelca el historial del perfilador del motor (F3 lo activa)
+ARCHIVO_PERFIL_MOTOR = "perfil_motor.jsonl"
 # constantes.py
 
 # ... (todas tus constantes existentes) ...
 
 # Constantes para el modo Online
 WEBSOCKET_URL = "wss://battlecity-relay-544519459817.us-central1.run.app"
+# Manda los 'game_update' con el protocolo binario de protocolo_red.py en vez de
+# JSON. Los dos jugadores y el relay tienen que soportar tramas binarias.
+PROTOCOLO_RED_BINARIO = False
+# Envío (network.py): 'game_update' por segundo como máximo, cada cuánto se
+# repite uno aunque no haya cambiado nada y elementos pendientes en la cola del
+# hilo de envío antes de descartar los más viejos
+TASA_ENVIO_RED_HZ = 20
+LATIDO_ENVIO_RED_MS = 1000
+MAX_COLA_ENVIO_RED = 256
+# Mensajes recibidos que se guardan como mucho sin procesar (p. ej. en pausa);
+# al llenarse se descartan los más viejos
+MAX_MENSAJES_EN_COLA_RED = 1024
+# Sincronización del oponente (backend/sincronizacion.py): posiciones recibidas
+# que se guardan, retraso con el que se dibuja para poder interpolar entre dos
+# y tiempo máximo que se extrapola si los paquetes llegan tarde
+CAPACIDAD_INSTANTANEAS_RED = 32
+RETRASO_INTERPOLACION_RED_MS = 100
+MAX_EXTRAPOLACION_RED_MS = 250
+# Relay local (servidor_relay.py; para jugar contra él, WEBSOCKET_URL =
+# "ws://127.0.0.1:8765"): puerto por defecto y mensajes pendientes por
+# cliente antes de empezar a descartar los más viejos
+PUERTO_RELAY_LOCAL = 8765
+MAX_COLA_SALIDA_RELAY = 256
+# Servidor autoritativo (servidor_autoritativo.py; para jugar contra él,
+# WEBSOCKET_URL = "ws://127.0.0.1:8766" y SERVIDOR_RED_AUTORITATIVO = True: el
+# cliente no simula ni manda nada hasta recibir la 'bienvenida' con su tanque):
+# puerto, procesos que simulan salas (0 = uno por núcleo), instantáneas del
+# mundo por segundo, jugadores por sala y pausa antes de pasar de nivel o reintentar
+SERVIDOR_RED_AUTORITATIVO = False
+PUERTO_SERVIDOR_AUTORITATIVO = 8766
+TRABAJADORES_SERVIDOR = 0
+TASA_INSTANTANEAS_SERVIDOR_HZ = 20
+MAX_JUGADORES_POR_SALA = 4
+PAUSA_FIN_NIVEL_SERVIDOR_MS = 3000
+# Repeticiones (backend/repeticion.py): si main.py graba las partidas sin red
+# (desactivado por defecto: escribe y rota archivos en REPETICIONES_PATH),
+# dónde, cuántas conserva (se borran las más viejas), cada cuántos ticks se
+# guarda un hash de control y cada cuántos el reproductor toma un fotograma clave
+GRABAR_REPETICIONES = False
+REPETICIONES_PATH = "repeticiones/"
+MAX_REPETICIONES_GUARDADAS = 20
+TICKS_ENTRE_HASHES_REPETICION = 30
+TICKS_ENTRE_CLAVES_REPETICION = 300
 
 # constantes.py
 
@@ -7,22 +7,31 @@ from constantes import (
     EDITOR_CHAR_OBJETIVO1, EDITOR_CHAR_OBJETIVO2,
     EDITOR_DISPLAY_TILE_SIZE, GRID_WIDTH, GRID_HEIGHT, # Usamos las dimensiones de la cuadrícula del juego
     EDITOR_COLOR_CURSOR, EDITOR_COLOR_TEXTO_INFO, EDITOR_COLOR_FONDO_INPUT, EDITOR_COLOR_TEXTO_INPUT,
-    EDITOR_PLACABLE_CHARS, EDITOR_NIVELES_PATH, DEFAULT_EDITOR_FILENAME, SCREEN_HEIGHT, SCREEN_WIDTH
+    EDITOR_PLACABLE_CHARS, EDITOR_NIVELES_PATH, DEFAULT_EDITOR_FILENAME, SCREEN_HEIGHT, SCREEN_WIDTH,
+    EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA,
+    EDITOR_TILES_PER_SCREEN_WIDTH, EDITOR_TILES_PER_SCREEN_HEIGHT, EDITOR_MAX_LADO_MAPA
 )
+from backend.niveles import compilar_nivel, escribir_nivel_binario, leer_nivel_binario, resolver_ruta_nivel, niveles_guardados
+from frontend.camara import Camara
 
 class EditorManager:
     def __init__(self, fuente_grande, fuente_pequena):
         self.fuente_grande = fuente_grande
         self.fuente_pequena = fuente_pequena
         
-        self.grid_map_chars = [[EDITOR_CHAR_VACIO for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+        # El mapa puede ser más grande que la pantalla (Shift + flechas cambia su
+        # tamaño); la cámara, en casillas, sigue al cursor
+        self.grid_map_chars = self._mapa_vacio(GRID_WIDTH, GRID_HEIGHT)
         self.cursor_pos = [0, 0]  # Fila, Columna
+        self.camara = Camara(EDITOR_TILES_PER_SCREEN_WIDTH, EDITOR_TILES_PER_SCREEN_HEIGHT)
         
         self.placable_items = EDITOR_PLACABLE_CHARS
         self.current_item_idx = 0
         self.selected_char_to_place = self.placable_items[self.current_item_idx]
         
-        self.feedback_message = "Editor de Niveles. Flechas: Mover. Espacio: Colocar. Tab: Cambiar Tile. S: Guardar. L: Cargar."
+        self.feedback_message = "Flechas: Mover. Shift+Flechas: Tamaño. Espacio: Colocar. Tab: Tile. S: Guardar. L: Cargar. F: Formato."
+        # Extensión con la que se guarda: texto (.txt) o binario (.nvb, ver backend/niveles.py)
+        self.formato_guardado = EDITOR_EXTENSION_TEXTO
         self.is_typing_filename = False
         self.input_text = DEFAULT_EDITOR_FILENAME
         self.current_operation = None # "guardar" o "cargar"
@@ -31,6 +40,34 @@ class EditorManager:
         if not os.path.exists(EDITOR_NIVELES_PATH):
             os.makedirs(EDITOR_NIVELES_PATH)
 
+    @staticmethod
+    def _mapa_vacio(ancho, alto):
+        return [[EDITOR_CHAR_VACIO for _ in range(ancho)] for _ in range(alto)]
+
+    @property
+    def ancho_mapa(self):
+        return len(self.grid_map_chars[0])
+
+    @property
+    def alto_mapa(self):
+        return len(self.grid_map_chars)
+
+    def _colocar_jugador_por_defecto(self):
+        self.grid_map_chars[self.alto_mapa // 2][self.ancho_mapa // 2] = EDITOR_CHAR_JUGADOR
+
+    def redimensionar_mapa(self, ancho, alto):
+        # Crece o se recorta por la derecha y por abajo; nunca menos que la
+        # pantalla del juego (los niveles de texto miden al menos eso)
+        ancho = max(GRID_WIDTH, min(EDITOR_MAX_LADO_MAPA, ancho))
+        alto = max(GRID_HEIGHT, min(EDITOR_MAX_LADO_MAPA, alto))
+        filas = self.grid_map_chars[:alto]
+        for i, fila in enumerate(filas):
+            filas[i] = fila[:ancho] + [EDITOR_CHAR_VACIO] * (ancho - len(fila))
+        filas.extend([EDITOR_CHAR_VACIO] * ancho for _ in range(alto - len(filas)))
+        self.grid_map_chars = filas
+        self.cursor_pos[0] = min(self.cursor_pos[0], alto - 1)
+        self.cursor_pos[1] = min(self.cursor_pos[1], ancho - 1)
+
     def handle_input_filename(self, evento):
         if evento.type == pygame.KEYDOWN:
             if evento.key == pygame.K_RETURN:
@@ -39,16 +76,17 @@ class EditorManager:
                     self.feedback_message = "Nombre de archivo no puede estar vacío."
                     return None
                 
-                full_path = os.path.join(EDITOR_NIVELES_PATH, filename + ".txt")
-                
                 if self.current_operation == "guardar":
+                    full_path = os.path.join(EDITOR_NIVELES_PATH, filename + self.formato_guardado)
                     self.save_map_to_file(full_path)
-                    self.feedback_message = f"Nivel guardado como {filename}.txt"
+                    self.feedback_message = f"Nivel guardado como {filename}{self.formato_guardado}"
                 elif self.current_operation == "cargar":
+                    # El .txt o el .nvb, el que se haya guardado después
+                    full_path = resolver_ruta_nivel(filename)
                     if self.load_map_from_file(full_path):
-                        self.feedback_message = f"Nivel cargado desde {filename}.txt"
+                        self.feedback_message = f"Nivel cargado desde {os.path.basename(full_path)}"
                     else:
-                        self.feedback_message = f"Error al cargar {filename}.txt. ¿Existe?"
+                        self.feedback_message = f"Error al cargar {filename}. ¿Existe?"
                 
                 self.is_typing_filename = False
                 self.current_operation = None
@@ -71,14 +109,23 @@ class EditorManager:
             return self.handle_input_filename(evento)
 
         if evento.type == pygame.KEYDOWN:
-            if evento.key == pygame.K_UP:
+            if evento.mod & pygame.KMOD_SHIFT and evento.key in (pygame.K_UP, pygame.K_DOWN, pygame.K_LEFT, pygame.K_RIGHT):
+                # Shift + flechas: quitar o añadir una fila (abajo) o una columna (a la derecha)
+                ancho, alto = self.ancho_mapa, self.alto_mapa
+                if evento.key == pygame.K_UP: alto -= 1
+                elif evento.key == pygame.K_DOWN: alto += 1
+                elif evento.key == pygame.K_LEFT: ancho -= 1
+                else: ancho += 1
+                self.redimensionar_mapa(ancho, alto)
+                self.feedback_message = f"Tamaño del mapa: {self.ancho_mapa}x{self.alto_mapa}"
+            elif evento.key == pygame.K_UP:
                 self.cursor_pos[0] = max(0, self.cursor_pos[0] - 1)
             elif evento.key == pygame.K_DOWN:
-                self.cursor_pos[0] = min(GRID_HEIGHT - 1, self.cursor_pos[0] + 1)
+                self.cursor_pos[0] = min(self.alto_mapa - 1, self.cursor_pos[0] + 1)
             elif evento.key == pygame.K_LEFT:
                 self.cursor_pos[1] = max(0, self.cursor_pos[1] - 1)
             elif evento.key == pygame.K_RIGHT:
-                self.cursor_pos[1] = min(GRID_WIDTH - 1, self.cursor_pos[1] + 1)
+                self.cursor_pos[1] = min(self.ancho_mapa - 1, self.cursor_pos[1] + 1)
             
             elif evento.key == pygame.K_SPACE: # Colocar tile
                 self.place_selected_char()
@@ -89,18 +136,22 @@ class EditorManager:
                 self.selected_char_to_place = self.placable_items[self.current_item_idx]
                 self.feedback_message = f"Tile seleccionado: '{self.selected_char_to_place}'"
             
+            elif evento.key == pygame.K_f: # Cambiar formato de guardado
+                self.formato_guardado = EDITOR_EXTENSION_BINARIA if self.formato_guardado == EDITOR_EXTENSION_TEXTO else EDITOR_EXTENSION_TEXTO
+                self.feedback_message = f"Se guardará en formato {self.formato_guardado}"
+
             elif evento.key == pygame.K_s: # Guardar
                 self.is_typing_filename = True
                 self.current_operation = "guardar"
                 self.input_text = DEFAULT_EDITOR_FILENAME # Resetear a default o último usado
-                self.feedback_message = "GUARDAR: Ingrese nombre de archivo y presione Enter (sin .txt)."
+                self.feedback_message = f"GUARDAR: Ingrese nombre de archivo y presione Enter (sin {self.formato_guardado})."
                 return "iniciar_input_nombre_archivo"
 
             elif evento.key == pygame.K_l: # Cargar
                 self.is_typing_filename = True
                 self.current_operation = "cargar"
                 self.input_text = DEFAULT_EDITOR_FILENAME
-                self.feedback_message = "CARGAR: Ingrese nombre de archivo y presione Enter (sin .txt)."
+                self.feedback_message = "CARGAR: Ingrese nombre de archivo y presione Enter (sin extensión)."
                 return "iniciar_input_nombre_archivo"
         return None
 
@@ -108,36 +159,41 @@ class EditorManager:
         row, col = self.cursor_pos
         # Si se coloca un jugador, asegurarse de que solo haya uno
         if self.selected_char_to_place == EDITOR_CHAR_JUGADOR:
-            for r in range(GRID_HEIGHT):
-                for c in range(GRID_WIDTH):
-                    if self.grid_map_chars[r][c] == EDITOR_CHAR_JUGADOR:
-                        self.grid_map_chars[r][c] = EDITOR_CHAR_VACIO # Borrar jugador anterior
+            for fila in self.grid_map_chars:
+                if EDITOR_CHAR_JUGADOR in fila:
+                    fila[fila.index(EDITOR_CHAR_JUGADOR)] = EDITOR_CHAR_VACIO # Borrar jugador anterior
         self.grid_map_chars[row][col] = self.selected_char_to_place
 
     def load_map_from_file(self, filepath):
         try:
-            with open(filepath, 'r') as f:
-                lines = f.readlines()
-                new_grid = [[EDITOR_CHAR_VACIO for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
-                for r, line in enumerate(lines):
-                    if r < GRID_HEIGHT:
-                        for c, char_tile in enumerate(line.strip()):
-                            if c < GRID_WIDTH:
-                                if char_tile in EDITOR_PLACABLE_CHARS:
-                                    new_grid[r][c] = char_tile
-                                else: # Caracter desconocido, tratar como vacío
-                                    new_grid[r][c] = EDITOR_CHAR_VACIO
-                self.grid_map_chars = new_grid
-                # Validar si hay un jugador, si no, colocar uno por defecto
-                if not any(EDITOR_CHAR_JUGADOR in row for row in self.grid_map_chars):
-                    self.grid_map_chars[GRID_HEIGHT // 2][GRID_WIDTH // 2] = EDITOR_CHAR_JUGADOR
-                return True
+            if filepath.endswith(EDITOR_EXTENSION_BINARIA):
+                lines = leer_nivel_binario(filepath).a_lineas()
+            else:
+                with open(filepath, 'r') as f:
+                    lines = f.readlines()
+            # El mapa mide lo que el archivo (como mínimo la pantalla del juego)
+            ancho = max(GRID_WIDTH, min(EDITOR_MAX_LADO_MAPA, max((len(line.rstrip("\r\n")) for line in lines), default=0)))
+            alto = max(GRID_HEIGHT, min(EDITOR_MAX_LADO_MAPA, len(lines)))
+            new_grid = self._mapa_vacio(ancho, alto)
+            for r, line in enumerate(lines[:alto]):
+                for c, char_tile in enumerate(line.rstrip("\r\n")[:ancho]):
+                    if char_tile in EDITOR_PLACABLE_CHARS:
+                        new_grid[r][c] = char_tile
+                    else: # Caracter desconocido, tratar como vacío
+                        new_grid[r][c] = EDITOR_CHAR_VACIO
+            self.grid_map_chars = new_grid
+            self.cursor_pos = [min(self.cursor_pos[0], alto - 1), min(self.cursor_pos[1], ancho - 1)]
+            # Validar si hay un jugador, si no, colocar uno por defecto
+            if not any(EDITOR_CHAR_JUGADOR in row for row in self.grid_map_chars):
+                self._colocar_jugador_por_defecto()
+            return True
         except FileNotFoundError:
             print(f"Editor: Archivo no encontrado {filepath}")
             # Se podría inicializar un mapa vacío si no se encuentra
-            self.grid_map_chars = [[EDITOR_CHAR_VACIO for _ in range(GRID_WIDTH)] for _ in range(GRID_HEIGHT)]
+            self.grid_map_chars = self._mapa_vacio(GRID_WIDTH, GRID_HEIGHT)
+            self.cursor_pos = [0, 0]
             # Colocar jugador por defecto si se crea un nivel vacío al no encontrar el archivo
-            self.grid_map_chars[GRID_HEIGHT // 2][GRID_WIDTH // 2] = EDITOR_CHAR_JUGADOR
+            self._colocar_jugador_por_defecto()
 
             return False
         except Exception as e:
@@ -150,12 +206,16 @@ class EditorManager:
             if not any(EDITOR_CHAR_JUGADOR in row for row in self.grid_map_chars):
                 # Intentar colocar un jugador en el centro si no hay ninguno
                 # Podrías hacer esto más inteligente, buscando un espacio vacío
-                self.grid_map_chars[GRID_HEIGHT // 2][GRID_WIDTH // 2] = EDITOR_CHAR_JUGADOR
+                self._colocar_jugador_por_defecto()
                 print("Advertencia: No se encontró jugador en el mapa al guardar. Se añadió uno por defecto.")
 
-            with open(filepath, 'w') as f:
-                for r in range(GRID_HEIGHT):
-                    f.write("".join(self.grid_map_chars[r]) + "\n")
+            lineas = ["".join(fila) + "\n" for fila in self.grid_map_chars]
+            if filepath.endswith(EDITOR_EXTENSION_BINARIA):
+                nombre = os.path.splitext(os.path.basename(filepath))[0]
+                escribir_nivel_binario(compilar_nivel(lineas), filepath, {"nombre": nombre})
+            else:
+                with open(filepath, 'w') as f:
+                    f.writelines(lineas)
             return True
         except Exception as e:
             print(f"Editor: Error al guardar el mapa: {e}")
@@ -163,27 +223,24 @@ class EditorManager:
             return False
     def get_saved_levels(self):
         """
-        Obtiene una lista de nombres de niveles guardados (sin extensión .txt)
-        desde la carpeta EDITOR_NIVELES_PATH.
+        Obtiene una lista de nombres de niveles guardados (sin extensión .txt
+        ni .nvb) desde la carpeta EDITOR_NIVELES_PATH.
         """
-        if not os.path.exists(EDITOR_NIVELES_PATH):
-            return []
-        
-        niveles = []
-        for filename in os.listdir(EDITOR_NIVELES_PATH):
-            if filename.endswith(".txt"):
-                niveles.append(filename[:-4]) # Quitar la extensión .txt
-        niveles.sort() # Ordenar alfabéticamente
-        return niveles
+        return niveles_guardados() # Ordenados alfabéticamente
     def draw(self, screen):
         screen.fill((30, 30, 30)) # Fondo oscuro para el editor
 
-        # Dibujar la cuadrícula del editor
-        for r in range(GRID_HEIGHT):
-            for c in range(GRID_WIDTH):
-                char_tile = self.grid_map_chars[r][c]
-                tile_rect = pygame.Rect(c * EDITOR_DISPLAY_TILE_SIZE, 
-                                        r * EDITOR_DISPLAY_TILE_SIZE,
+        # Dibujar solo las celdas que caen dentro de la cámara
+        camara = self.camara
+        camara.ajustar_mundo(self.ancho_mapa, self.alto_mapa)
+        camara.mostrar(self.cursor_pos[1], self.cursor_pos[0], 1, 1, margen=2)
+        col_inicio, fila_inicio, col_fin, fila_fin = camara.rango_casillas(1, self.ancho_mapa, self.alto_mapa)
+        for r in range(fila_inicio, fila_fin):
+            fila = self.grid_map_chars[r]
+            for c in range(col_inicio, col_fin):
+                char_tile = fila[c]
+                tile_rect = pygame.Rect((c - camara.x) * EDITOR_DISPLAY_TILE_SIZE, 
+                                        (r - camara.y) * EDITOR_DISPLAY_TILE_SIZE,
                                         EDITOR_DISPLAY_TILE_SIZE, EDITOR_DISPLAY_TILE_SIZE)
                 
                 # Color de fondo simple basado en el carácter (opcional)
@@ -202,8 +259,8 @@ class EditorManager:
                     screen.blit(text_surf, text_rect)
 
         # Dibujar cursor
-        cursor_screen_x = self.cursor_pos[1] * EDITOR_DISPLAY_TILE_SIZE
-        cursor_screen_y = self.cursor_pos[0] * EDITOR_DISPLAY_TILE_SIZE
+        cursor_screen_x = (self.cursor_pos[1] - camara.x) * EDITOR_DISPLAY_TILE_SIZE
+        cursor_screen_y = (self.cursor_pos[0] - camara.y) * EDITOR_DISPLAY_TILE_SIZE
         pygame.draw.rect(screen, EDITOR_COLOR_CURSOR, 
                          (cursor_screen_x, cursor_screen_y, EDITOR_DISPLAY_TILE_SIZE, EDITOR_DISPLAY_TILE_SIZE), 2)
 
@@ -213,7 +270,8 @@ class EditorManager:
         input_prompt_y_pos = feedback_y_pos - 60 # Un poco más arriba para el prompt de input
         
         # Tile seleccionado
-        selected_tile_text = f"Tile actual: [{self.selected_char_to_place}] (Tab para cambiar)"
+        selected_tile_text = (f"Tile actual: [{self.selected_char_to_place}] (Tab para cambiar)   "
+                              f"Mapa {self.ancho_mapa}x{self.alto_mapa}, cursor ({self.cursor_pos[0]}, {self.cursor_pos[1]})")
         selected_surf = self.fuente_pequena.render(selected_tile_text, True, EDITOR_COLOR_TEXTO_INFO)
         screen.blit(selected_surf, (10, feedback_y_pos - 30))
         
@@ -0,0 +1,52 @@
+# frontend/camara.py
+# Cámara 2D sobre un mundo más grande que la ventana (niveles de cualquier
+# tamaño, ver backend/niveles.py). Guarda la esquina superior izquierda de la
+# vista en coordenadas del mundo y nunca muestra nada fuera del mundo; si el
+# mundo es más chico que la vista queda pegada a (0, 0), como antes.
+# No depende de pygame: la usan la vista del juego (en píxeles) y el editor
+# (en casillas del editor).
+
+
+class Camara:
+    def __init__(self, ancho_vista, alto_vista):
+        self.ancho_vista = ancho_vista
+        self.alto_vista = alto_vista
+        self.ancho_mundo = ancho_vista
+        self.alto_mundo = alto_vista
+        self.x = 0
+        self.y = 0
+
+    def ajustar_mundo(self, ancho_mundo, alto_mundo):
+        self.ancho_mundo = ancho_mundo
+        self.alto_mundo = alto_mundo
+        self._limitar()
+
+    def centrar_en(self, x, y):
+        # Sigue a un punto (el centro del jugador): queda en el medio de la vista
+        self.x = int(x) - self.ancho_vista // 2
+        self.y = int(y) - self.alto_vista // 2
+        self._limitar()
+
+    def mostrar(self, x, y, ancho, alto, margen=0):
+        # Se mueve lo mínimo para que el rectángulo (más el margen) quede a la
+        # vista; sirve para el cursor del editor
+        if x - margen < self.x: self.x = x - margen
+        elif x + ancho + margen > self.x + self.ancho_vista: self.x = x + ancho + margen - self.ancho_vista
+        if y - margen < self.y: self.y = y - margen
+        elif y + alto + margen > self.y + self.alto_vista: self.y = y + alto + margen - self.alto_vista
+        self._limitar()
+
+    def _limitar(self):
+        self.x = max(0, min(self.x, self.ancho_mundo - self.ancho_vista))
+        self.y = max(0, min(self.y, self.alto_mundo - self.alto_vista))
+
+    def es_visible(self, x, y, ancho, alto):
+        return x < self.x + self.ancho_vista and self.x < x + ancho and y < self.y + self.alto_vista and self.y < y + alto
+
+    def rango_casillas(self, lado_casilla, ancho_casillas, alto_casillas):
+        # (x0, y0, x1, y1) de las casillas que toca la vista, x1 e y1 excluidos
+        x0 = self.x // lado_casilla
+        y0 = self.y // lado_casilla
+        x1 = min(ancho_casillas, -(-(self.x + self.ancho_vista) // lado_casilla))
+        y1 = min(alto_casillas, -(-(self.y + self.alto_vista) // lado_casilla))
+        return x0, y0, x1, y1
@@ -3,6 +3,7 @@ import pygame
 import os
 from constantes import (
     SCREEN_WIDTH, SCREEN_HEIGHT, TILE_SIZE, BLACK, WHITE, GREY, GREEN, RED, GOLD, BLUE,
+    GRID_WIDTH, GRID_HEIGHT, LADO_BLOQUE_FONDO, MAX_BLOQUES_FONDO,
     PLAYER_TANK_IMG, ENEMY_NORMAL_IMG, ENEMY_RAPIDO_IMG, ENEMY_FUERTE_IMG,
     BULLET_IMG, WALL_IMG, TARGET1_IMG, TARGET2_IMG,
     ENEMY_DESTRUCTION_IMAGE_PATH,
@@ -14,6 +15,7 @@ from constantes import (
     EDITOR_PLACABLE_CHARS
 )
 from frontend.ui_elementos import Boton
+from frontend.camara import Camara
 from editor_manager import EditorManager
 
 class VistaJuego:
@@ -26,10 +28,19 @@ class VistaJuego:
         self.fuente_mensajes = pygame.font.Font(None, 72)
         self.fuente_editor_info = pygame.font.Font(None, 28)
         self.fuente_selector_nivel = pygame.font.Font(None, 40)
+        self.fuente_perfil = pygame.font.Font(None, 20)
         self.assets = self._cargar_assets()
 
         self.sprites_visuales = pygame.sprite.Group()
         self.objetos_visuales_map = {}
+        # El mundo puede ser más grande que la ventana: la cámara sigue al jugador
+        # y solo se dibuja lo que cae dentro de ella
+        self.camara = Camara(SCREEN_WIDTH, SCREEN_HEIGHT)
+        # Fondo (cuadrícula y muros) por bloques ya dibujados: (bloque x, bloque y) ->
+        # Surface, del menos al más usado. Se vacía cuando cambia version_muros
+        self.bloques_fondo = {}
+        self.muros_por_bloque = {}
+        self.version_fondo_nivel = None
 
         self.editor_manager = None
 
@@ -111,22 +122,27 @@ class VistaJuego:
         return surf
         
     def actualizar_objetos_visuales(self, estado_del_modelo):
+        # Solo se crean, giran y dibujan los sprites de lo que se ve; los de
+        # fuera de la cámara se guardan sin dibujar hasta que vuelven a entrar
+        camara = self.camara
         ids_modelos_actuales = {obj_info["id"] for obj_info in estado_del_modelo["objetos"]}
         for obj_id_modelo, sprite_visual in list(self.objetos_visuales_map.items()):
             if obj_id_modelo not in ids_modelos_actuales:
                 sprite_visual.kill(); del self.objetos_visuales_map[obj_id_modelo]
-        
+
+        self.sprites_visuales.empty()
+        visibles = []
         for obj_info in estado_del_modelo["objetos"]:
+            pixel_x, pixel_y = obj_info["pixel_x"], obj_info["pixel_y"]
+            if not camara.es_visible(pixel_x, pixel_y, TILE_SIZE, TILE_SIZE): continue
             obj_id_modelo = obj_info["id"]
-            if obj_id_modelo not in self.objetos_visuales_map:
+            sprite_visual = self.objetos_visuales_map.get(obj_id_modelo)
+            if sprite_visual is None:
                 imagen_base = self._get_imagen_para_objeto(obj_info["tipo"])
                 sprite_visual = ObjetoVisualSprite(imagen_base); self.objetos_visuales_map[obj_id_modelo] = sprite_visual
-                self.sprites_visuales.add(sprite_visual)
-            else:
-                sprite_visual = self.objetos_visuales_map[obj_id_modelo]
 
-            # --- AHORA USAMOS PIXEL_X y PIXEL_Y ---
-            sprite_visual.rect.topleft = (obj_info["pixel_x"], obj_info["pixel_y"])
+            # --- AHORA USAMOS PIXEL_X y PIXEL_Y (relativos a la cámara) ---
+            sprite_visual.rect.topleft = (pixel_x - camara.x, pixel_y - camara.y)
             
             if obj_info["direccion"]:
                 angulo = 0; dx, dy = obj_info["direccion"]
@@ -135,6 +151,18 @@ class VistaJuego:
                 elif dx == -1: angulo = 180
                 elif dx == 1: angulo = 0
                 sprite_visual.rotar(angulo)
+            visibles.append(sprite_visual)
+        self.sprites_visuales.add(visibles)
+
+    def _actualizar_camara(self, estado_del_modelo):
+        ancho_mundo = estado_del_modelo.get("ancho", GRID_WIDTH) * TILE_SIZE
+        alto_mundo = estado_del_modelo.get("alto", GRID_HEIGHT) * TILE_SIZE
+        self.camara.ajustar_mundo(ancho_mundo, alto_mundo)
+        jugador_id = estado_del_modelo.get("jugador_id")
+        for obj_info in estado_del_modelo["objetos"]:
+            if obj_info["id"] == jugador_id or (jugador_id is None and obj_info["tipo"] == TIPO_JUGADOR):
+                self.camara.centrar_en(obj_info["pixel_x"] + TILE_SIZE // 2, obj_info["pixel_y"] + TILE_SIZE // 2)
+                break
 
     def _actualizar_visibilidad_botones(self, estado_global_juego):
         es_menu_inicio = (estado_global_juego == MENU_INICIO)
@@ -207,6 +235,27 @@ class VistaJuego:
         nivel_texto_renderizado = self.fuente_hud.render(texto_nivel_para_mostrar, True, WHITE)
         self.screen.blit(nivel_texto_renderizado, (SCREEN_WIDTH - nivel_texto_renderizado.get_width() - 10, 10))
 
+        if estado_del_modelo.get('objetivos_totales'):
+            objetivos_texto = self.fuente_hud.render(
+                f"Objetivos: {estado_del_modelo['objetivos_vivos']}/{estado_del_modelo['objetivos_totales']}", True, WHITE)
+            self.screen.blit(objetivos_texto, ((SCREEN_WIDTH - objetivos_texto.get_width()) // 2, 10))
+
+    def _dibujar_perfil(self, perfil):
+        # Overlay de depuración (F3): ms por fase del tick y contadores medios
+        lineas = [f"Perfil ({perfil['ticks']} ticks)   media / p99 ms"]
+        for clave, tiempos in perfil.items():
+            if clave.endswith("_ms"):
+                lineas.append(f"{clave[:-3]:<14} {tiempos['media']:.3f} / {tiempos['p99']:.3f}")
+        for clave, valor in perfil.items():
+            if not clave.endswith("_ms") and clave != "ticks":
+                lineas.append(f"{clave}: {valor:.1f}")
+        alto_linea = self.fuente_perfil.get_linesize()
+        fondo = pygame.Surface((290, alto_linea * len(lineas) + 10), pygame.SRCALPHA)
+        fondo.fill((0, 0, 0, 170))
+        self.screen.blit(fondo, (10, 50))
+        for i, linea in enumerate(lineas):
+            self.screen.blit(self.fuente_perfil.render(linea, True, WHITE), (15, 55 + i * alto_linea))
+
     def _dibujar_selector_nivel_editado(self):
         overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         overlay.fill((0, 0, 0, 230))
@@ -274,24 +323,72 @@ class VistaJuego:
         self.boton_crear_sala.dibujar(self.screen)
         self.boton_volver_de_online.dibujar(self.screen)
 
+    def _bloque_fondo(self, bloque_x, bloque_y, ancho_tiles, alto_tiles):
+        clave = (bloque_x, bloque_y)
+        bloque = self.bloques_fondo.pop(clave, None)
+        if bloque is None:
+            lado = LADO_BLOQUE_FONDO
+            ancho = min(lado, ancho_tiles - bloque_x * lado) * TILE_SIZE
+            alto = min(lado, alto_tiles - bloque_y * lado) * TILE_SIZE
+            bloque = pygame.Surface((ancho, alto))
+            bloque.fill(BLACK)
+            for x in range(0, ancho, TILE_SIZE): pygame.draw.line(bloque, GREY, (x, 0), (x, alto))
+            for y in range(0, alto, TILE_SIZE): pygame.draw.line(bloque, GREY, (0, y), (ancho, y))
+            img_muro = self.assets[WALL_IMG]
+            origen_x, origen_y = bloque_x * lado * TILE_SIZE, bloque_y * lado * TILE_SIZE
+            for x_tile, y_tile in self.muros_por_bloque.get(clave, ()):
+                bloque.blit(img_muro, (x_tile * TILE_SIZE - origen_x, y_tile * TILE_SIZE - origen_y))
+            bloque = bloque.convert()
+            if len(self.bloques_fondo) >= MAX_BLOQUES_FONDO:
+                del self.bloques_fondo[next(iter(self.bloques_fondo))]
+        # Vuelve al final: el primero del diccionario es el que lleva más sin usarse
+        self.bloques_fondo[clave] = bloque
+        return bloque
+
+    def _dibujar_fondo_nivel(self, estado_del_modelo):
+        version_muros = estado_del_modelo.get("version_muros")
+        if version_muros != self.version_fondo_nivel:
+            # Los muros se reparten por bloque una vez por versión, no en cada frame
+            lado = LADO_BLOQUE_FONDO
+            muros_por_bloque = {}
+            for x_tile, y_tile in estado_del_modelo.get("muros", ()):
+                muros_por_bloque.setdefault((x_tile // lado, y_tile // lado), []).append((x_tile, y_tile))
+            self.muros_por_bloque = muros_por_bloque
+            self.bloques_fondo = {}
+            self.version_fondo_nivel = version_muros
+
+        ancho_tiles = estado_del_modelo.get("ancho", GRID_WIDTH)
+        alto_tiles = estado_del_modelo.get("alto", GRID_HEIGHT)
+        camara = self.camara
+        x0, y0, x1, y1 = camara.rango_casillas(TILE_SIZE, ancho_tiles, alto_tiles)
+        if x1 <= x0 or y1 <= y0: return
+        lado = LADO_BLOQUE_FONDO
+        lado_px = lado * TILE_SIZE
+        for bloque_y in range(y0 // lado, (y1 - 1) // lado + 1):
+            for bloque_x in range(x0 // lado, (x1 - 1) // lado + 1):
+                self.screen.blit(self._bloque_fondo(bloque_x, bloque_y, ancho_tiles, alto_tiles),
+                                 (bloque_x * lado_px - camara.x, bloque_y * lado_px - camara.y))
+
     def dibujar_estado_juego(self, estado_del_modelo, estado_global_juego):
         self._actualizar_visibilidad_botones(estado_global_juego)
         pygame.display.set_caption(f"Tank Attack MVC - {estado_global_juego.replace('_',' ').title()}")
 
         self.screen.fill(BLACK)
         if estado_global_juego == JUGANDO or estado_global_juego == PAUSA:
-            for x in range(0, SCREEN_WIDTH, TILE_SIZE): pygame.draw.line(self.screen, GREY, (x, 0), (x, SCREEN_HEIGHT))
-            for y in range(0, SCREEN_HEIGHT, TILE_SIZE): pygame.draw.line(self.screen, GREY, (0, y), (SCREEN_WIDTH, y))
             if estado_del_modelo:
+                self._actualizar_camara(estado_del_modelo)
+                self._dibujar_fondo_nivel(estado_del_modelo)
                 self.actualizar_objetos_visuales(estado_del_modelo)
             self.sprites_visuales.draw(self.screen)
             if estado_del_modelo: self._dibujar_hud(estado_del_modelo)
+            if estado_del_modelo and estado_del_modelo.get("perfil"): self._dibujar_perfil(estado_del_modelo["perfil"])
             if estado_del_modelo and "enemigos_destruyendose" in estado_del_modelo:
                 img_explosion = self.assets.get(ENEMY_DESTRUCTION_IMAGE_PATH)
                 if img_explosion:
                     for destruccion_info in estado_del_modelo["enemigos_destruyendose"]:
                         x_pos = destruccion_info["x_tile"] * TILE_SIZE; y_pos = destruccion_info["y_tile"] * TILE_SIZE
-                        self.screen.blit(img_explosion, (x_pos, y_pos))
+                        if self.camara.es_visible(x_pos, y_pos, TILE_SIZE, TILE_SIZE):
+                            self.screen.blit(img_explosion, (x_pos - self.camara.x, y_pos - self.camara.y))
 
         if estado_global_juego == PAUSA:
             overlay = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA); overlay.fill((0, 0, 0, 180)); self.screen.blit(overlay, (0,0))
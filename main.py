@@ -8,13 +8,20 @@ from constantes import (
     MENU_MUSIC_PATH, AMBIENT_LEVEL_MUSIC_PATH, GENERAL_TANK_MOVING_SOUND_PATH, PLAYER_SHOOT_SOUND_PATH,
     PLAYER_FINAL_DESTRUCTION_SOUND_PATH, GAME_OVER_SCREEN_MUSIC_PATH,
     LEVEL_COMPLETE_MUSIC_PATH, FINAL_VICTORY_MUSIC_PATH, ENEMY_DESTRUCTION_IMAGE_PATH,
-    EDITOR_NIVELES_PATH, DEFAULT_EDITOR_FILENAME, WEBSOCKET_URL
+    EDITOR_NIVELES_PATH, DEFAULT_EDITOR_FILENAME, WEBSOCKET_URL, ARCHIVO_PERFIL_MOTOR,
+    EVENTO_OBJETIVOS_COMPLETADOS, TIEMPO_TICK_LOGICA_MS, MAX_TICKS_LOGICA_POR_FRAME, FPS_RENDER_MAXIMO,
+    GRABAR_REPETICIONES, SERVIDOR_RED_AUTORITATIVO
 )
 from backend.motor_juego import MotorJuego
+from backend.instantanea_mundo import InterpoladorMundo
+from backend.repeticion import abrir_grabacion
+from backend.niveles import resolver_ruta_nivel
 from frontend.vista import VistaJuego
 from network import Network
 
 EVENTO_SIGUIENTE_NIVEL = pygame.USEREVENT + 1
+# Acciones de una sola pulsación: se guardan hasta que las consuma un tick lógico
+ACCIONES_DE_UN_TICK = ("disparar", "detenerse")
 
 def main():
     pygame.init(); pygame.mixer.init(); pygame.mixer.set_num_channels(16)
@@ -32,7 +39,14 @@ def main():
     
     # --- NUEVO: Gestor de red ---
     network = Network(WEBSOCKET_URL)
+    # Con un servidor autoritativo (servidor_autoritativo.py) el mundo llega en
+    # instantáneas y aquí solo se mandan las entradas
+    mundo_servidor = None
+    secuencia_entrada = 0
     # ---
+    # Repetición de la partida sin red en curso (backend/repeticion.py); se
+    # abre al cargar el primer nivel y se cierra al volver al menú
+    grabador = None
 
     running = True
     estado_global_juego = ""; nuevo_estado_global_juego = MENU_INICIO; estado_previo_pausa = JUGANDO
@@ -41,11 +55,19 @@ def main():
     sonido_ambiente_tanques_canal = None; sonido_ambiente_tanques_activo = False; MASTER_VOLUME_AMBIENTE_TANQUES = 0.3
     
     motor.nivel_actual_numero = 0
+    acumulador_logica_ms = 0
+    acciones_jugador = {}
 
     while running:
         estado_anterior_real_para_sonidos = estado_global_juego
         if nuevo_estado_global_juego is not None:
             estado_global_juego = nuevo_estado_global_juego; nuevo_estado_global_juego = None
+            if estado_global_juego == MENU_INICIO:
+                if grabador is not None: grabador.cerrar(); grabador = None
+                # La partida online termina al volver al menú: la siguiente puede ser sin red (y grabarse)
+                # y no debe dibujar lo último que mandó el servidor
+                if network.ws is not None: network.disconnect()
+                mundo_servidor = None
             # --- Lógica de Música ---
             if pygame.mixer.get_init():
                 if musica_menu_reproduciendo and estado_global_juego != MENU_INICIO: pygame.mixer.music.stop(); musica_menu_reproduciendo = False
@@ -90,8 +112,12 @@ def main():
                          except pygame.error as e: print(f"Error música menú (editor): {e}")
 
 
-        acciones_jugador = {}
+        if estado_global_juego == JUGANDO:
+            acciones_jugador = {clave: valor for clave, valor in acciones_jugador.items() if clave in ACCIONES_DE_UN_TICK}
+        else:
+            acciones_jugador = {}
         accion_ui_raw = None
+        alfa_render = 1.0
 
         for evento in pygame.event.get():
             if evento.type == pygame.QUIT: running = False
@@ -105,6 +131,12 @@ def main():
                         nuevo_estado_global_juego = PAUSA; estado_previo_pausa = JUGANDO
                     elif evento.key == pygame.K_SPACE: acciones_jugador["disparar"] = True
                     elif evento.key == pygame.K_x: acciones_jugador["detenerse"] = True
+                    elif evento.key == pygame.K_F3:
+                        if motor.perfilador is None: motor.activar_perfilado()
+                        else: motor.desactivar_perfilado()
+                    elif evento.key == pygame.K_F4 and motor.perfilador is not None:
+                        ticks_volcados = motor.perfilador.volcar(ARCHIVO_PERFIL_MOTOR)
+                        print(f"Perfil del motor: {ticks_volcados} ticks guardados en {ARCHIVO_PERFIL_MOTOR}")
             elif estado_global_juego == PAUSA:
                  if evento.type == pygame.KEYDOWN and evento.key == pygame.K_ESCAPE:
                     nuevo_estado_global_juego = estado_previo_pausa
@@ -149,14 +181,15 @@ def main():
                 nuevo_estado_global_juego = CARGANDO_NIVEL
             elif nombre_accion == "unirse_sala":
                 if datos_accion:
-                    network.connect(datos_accion)
-                    motor.nivel_actual_numero = 1 
+                    # Se pide el nivel 1; si la sala ya existe se juega el suyo
+                    network.connect(datos_accion, nivel=1)
+                    motor.nivel_actual_numero = 1
                     nuevo_estado_global_juego = CARGANDO_NIVEL
             elif nombre_accion == "abrir_menu_online":
                 pass
             elif nombre_accion == "jugar_nivel_especifico":
                 if datos_accion:
-                    motor.nivel_actual_numero = os.path.join(EDITOR_NIVELES_PATH, datos_accion + ".txt")
+                    motor.nivel_actual_numero = resolver_ruta_nivel(datos_accion)
                     nuevo_estado_global_juego = CARGANDO_NIVEL
                     if hasattr(vista, 'mostrando_selector_nivel_editado'):
                         vista.mostrando_selector_nivel_editado = False
@@ -186,6 +219,10 @@ def main():
             elif nombre_accion == "salir_juego": running = False
         
         if estado_global_juego == CARGANDO_NIVEL:
+            # Sin red cada nivel empieza de una semilla nueva: nivel + semilla + entradas lo reproducen.
+            # Se mira en cada carga: disconnect() deja ws en None al salir de una partida online
+            sin_red = network.ws is None
+            if sin_red: motor.reiniciar_simulacion()
             if isinstance(motor.nivel_actual_numero, int):
                 if 0 < motor.nivel_actual_numero <= MAX_NIVELES:
                     if motor.cargar_nivel(motor.nivel_actual_numero):
@@ -202,36 +239,80 @@ def main():
                     nuevo_estado_global_juego = MENU_INICIO; motor.nivel_actual_numero = 0
             else:
                  nuevo_estado_global_juego = MENU_INICIO; motor.nivel_actual_numero = 0
+            if sin_red and GRABAR_REPETICIONES and nuevo_estado_global_juego == JUGANDO:
+                if grabador is None: grabador = abrir_grabacion()
+                grabador.registrar_nivel(motor)
         
         elif estado_global_juego == JUGANDO:
-            tiempo_delta_ms = clock.get_time()
-            resultado_actualizacion = motor.actualizar_estado(acciones_jugador, tiempo_delta_ms)
-            
-            if network.is_connected:
-                jugador_local = motor.objetos_del_juego.get(motor.jugador_id)
-                if jugador_local:
-                    estado_local = {
-                        "type": "game_update",
-                        "id": jugador_local.id.hex,
-                        "tipo": TIPO_JUGADOR,
-                        "x_tile": jugador_local.x_tile,
-                        "y_tile": jugador_local.y_tile,
-                        "direccion": jugador_local.direccion_actual,
-                        "disparo": acciones_jugador.get("disparar", False)
-                    }
-                    network.send(estado_local)
-                
-                mensaje_remoto = network.get_message()
-                if mensaje_remoto and mensaje_remoto.get('type') == 'game_update':
-                    motor.actualizar_estado_remoto(mensaje_remoto)
+            # Paso fijo: la lógica avanza en ticks de TIEMPO_TICK_LOGICA_MS sin importar los FPS
+            # del render. Al entrar (tras cargar o reanudar) no se cuenta el tiempo de espera.
+            if estado_anterior_real_para_sonidos == JUGANDO: acumulador_logica_ms += clock.get_time()
+            else: acumulador_logica_ms = TIEMPO_TICK_LOGICA_MS
+            resultado_actualizacion = JUGANDO
+            ticks_en_frame = 0
+            if mundo_servidor is not None and not network.is_connected:
+                # Conexión perdida con el servidor autoritativo: sin él no hay partida
+                print("Red: se perdió la conexión con el servidor. Volviendo al menú.")
+                mundo_servidor = None
+                resultado_actualizacion = MENU_INICIO
+                acumulador_logica_ms = 0
+            while acumulador_logica_ms >= TIEMPO_TICK_LOGICA_MS and ticks_en_frame < MAX_TICKS_LOGICA_POR_FRAME:
+                if network.is_connected:
+                    # Todo lo recibido hasta ahora, con las posiciones atrasadas ya combinadas
+                    for mensaje_remoto in network.tomar_mensajes():
+                        tipo_mensaje = mensaje_remoto.get('type')
+                        if tipo_mensaje == 'game_update':
+                            motor.actualizar_estado_remoto(mensaje_remoto)
+                        elif tipo_mensaje == 'bienvenida':
+                            if mundo_servidor is None: mundo_servidor = InterpoladorMundo()
+                            mundo_servidor.asignar_tanque(mensaje_remoto.get('tanque'))
+                        elif tipo_mensaje == 'instantanea' and mundo_servidor is not None:
+                            mundo_servidor.agregar(mensaje_remoto, pygame.time.get_ticks())
+
+                if mundo_servidor is None and SERVIDOR_RED_AUTORITATIVO and network.ws is not None:
+                    # Hasta la 'bienvenida' no hay tanque propio: ni motor local ni 'game_update'
+                    acumulador_logica_ms -= TIEMPO_TICK_LOGICA_MS
+                    ticks_en_frame += 1
+                elif mundo_servidor is not None:
+                    secuencia_entrada += 1
+                    network.send({"type": "entrada", "secuencia": secuencia_entrada,
+                                  "mover": acciones_jugador.get("mover"),
+                                  "disparar": acciones_jugador.get("disparar", False),
+                                  "detenerse": acciones_jugador.get("detenerse", False)})
+                    # El tanque propio se mueve ya en local; cada instantánea lo reconcilia
+                    mundo_servidor.registrar_entrada(secuencia_entrada, acciones_jugador)
+                    resultado_actualizacion = mundo_servidor.tomar_resultado()
+                    acumulador_logica_ms -= TIEMPO_TICK_LOGICA_MS
+                    ticks_en_frame += 1
+                else:
+                    resultado_actualizacion = motor.actualizar_estado(acciones_jugador, TIEMPO_TICK_LOGICA_MS)
+                    if grabador is not None: grabador.registrar_tick(acciones_jugador, motor)
+                    acumulador_logica_ms -= TIEMPO_TICK_LOGICA_MS
+                    ticks_en_frame += 1
+                    for evento_motor in motor.tomar_eventos():
+                        if evento_motor["tipo"] == EVENTO_OBJETIVOS_COMPLETADOS:
+                            print(f"Todos los objetivos destruidos en el tick {evento_motor['tick']}")
+
+                    if network.is_connected:
+                        estado_local = motor.estado_red_jugador(acciones_jugador.get("disparar", False))
+                        if estado_local: network.send(estado_local)
+                for clave in ACCIONES_DE_UN_TICK: acciones_jugador.pop(clave, None)
+                if resultado_actualizacion != JUGANDO: break
+            # Los updates de este frame salen juntos (solo con el protocolo binario)
+            if network.is_connected: network.enviar_lote()
+            if ticks_en_frame == MAX_TICKS_LOGICA_POR_FRAME:
+                acumulador_logica_ms = min(acumulador_logica_ms, TIEMPO_TICK_LOGICA_MS)
+            alfa_render = min(1.0, acumulador_logica_ms / TIEMPO_TICK_LOGICA_MS)
 
             if resultado_actualizacion != JUGANDO: nuevo_estado_global_juego = resultado_actualizacion
         
         elif estado_global_juego == EDITOR_NIVELES:
             pass
 
-        if estado_global_juego != EDITOR_NIVELES and not (estado_global_juego == MENU_INICIO and vista.mostrando_selector_nivel_editado):
-            estado_para_vista = motor.get_estado_para_vista()
+        if mundo_servidor is not None and estado_global_juego in (JUGANDO, PAUSA):
+            estado_para_vista = mundo_servidor.estado_para_vista(pygame.time.get_ticks()) or motor.get_estado_para_vista(alfa_render)
+        elif estado_global_juego != EDITOR_NIVELES and not (estado_global_juego == MENU_INICIO and vista.mostrando_selector_nivel_editado):
+            estado_para_vista = motor.get_estado_para_vista(alfa_render)
         else:
             estado_para_vista = None
 
@@ -241,7 +322,7 @@ def main():
                 for obj_vista in estado_para_vista["objetos"]:
                     if obj_vista["tipo"] == TIPO_JUGADOR: player_x_tile_vista = obj_vista["x_tile"]; player_found_in_vista = True; break
             if player_found_in_vista and player_x_tile_vista is not None:
-                player_screen_x = player_x_tile_vista * TILE_SIZE
+                player_screen_x = player_x_tile_vista * TILE_SIZE - vista.camara.x
                 pan_factor = (player_screen_x - (SCREEN_WIDTH / 2)) / (SCREEN_WIDTH / 2); pan_factor = max(-1.0, min(1.0, pan_factor))
                 vol_izq_pan = 1.0; vol_der_pan = 1.0
                 if pan_factor < 0: vol_der_pan = 1.0 + pan_factor
@@ -252,9 +333,11 @@ def main():
             elif sonido_ambiente_tanques_canal: sonido_ambiente_tanques_canal.set_volume(MASTER_VOLUME_AMBIENTE_TANQUES)
 
         vista.dibujar_estado_juego(estado_para_vista, estado_global_juego)
-        clock.tick(30)
+        clock.tick(FPS_RENDER_MAXIMO)
 
+    if grabador is not None: grabador.cerrar()
     if network.is_connected:
+        print(f"Red: {network.estadisticas_recepcion()}")
         network.disconnect()
     if pygame.mixer.get_init():
         if sonido_ambiente_tanques_canal: sonido_ambiente_tanques_canal.stop()
@@ -2,17 +2,63 @@
 import websocket
 import threading
 import json
+import time
 from collections import deque
 
+from constantes import (
+    PROTOCOLO_RED_BINARIO, MAX_MENSAJES_EN_COLA_RED,
+    TASA_ENVIO_RED_HZ, LATIDO_ENVIO_RED_MS, MAX_COLA_ENVIO_RED
+)
+from protocolo_red import SesionProtocolo, ErrorProtocolo
+
+# Marcas en la cola de envío
+_CERRAR_TRAMA = object()
+_FIN_ENVIO = object()
+
+
+def _clave_estado(data):
+    # Lo que tiene que cambiar para que un 'game_update' merezca enviarse
+    return (data.get("x_tile"), data.get("y_tile"), data.get("pixel_x"), data.get("pixel_y"),
+            tuple(data.get("direccion") or ()))
+
+
 class Network:
-    def __init__(self, url):
+    def __init__(self, url, binario=PROTOCOLO_RED_BINARIO, tasa_envio_hz=TASA_ENVIO_RED_HZ, solo_cambios=True):
         self.url = url
         self.ws = None
         self.thread = None
         self.is_connected = False
-        self.received_messages = deque()
+        self.received_messages = deque(maxlen=MAX_MENSAJES_EN_COLA_RED)
+        # Contadores de la recepción (ver estadisticas_recepcion())
+        self.mensajes_recibidos = 0
+        self.mensajes_combinados = 0
+        self.mensajes_desbordados = 0
+        # Mensajes que llegaron a juntarse en la cola entre dos tomar_mensajes()
+        self.profundidad_max_cola = 0
+        # Con el protocolo binario los 'game_update' se acumulan y se mandan en
+        # una sola trama con enviar_lote(); el resto de mensajes sigue en JSON
+        self.protocolo = SesionProtocolo() if binario else None
+        # Lo usan el hilo de envío (codificar) y el de websocket (decodificar)
+        self._cerrojo_protocolo = threading.Lock()
 
-    def connect(self, room_code):
+        # Envío: send() no serializa ni toca el socket. Los 'game_update' se
+        # limitan a tasa_envio_hz (gana el último) y, con solo_cambios, los que no
+        # cambian nada no se mandan salvo cada LATIDO_ENVIO_RED_MS; los disparos
+        # salen en el momento. Un hilo propio serializa y escribe desde una cola acotada.
+        self.intervalo_envio_s = 1.0 / tasa_envio_hz if tasa_envio_hz else 0.0
+        self.solo_cambios = solo_cambios
+        self._actualizacion_pendiente = None
+        self._ultimo_envio = 0.0
+        self._ultimo_estado_enviado = None
+        self._repeticion_enviada = False
+        self._cola_envio = deque()
+        self._condicion_envio = threading.Condition()
+        self._hilo_envio = None
+        self.envios = 0
+        self.envios_suprimidos = 0
+        self.envios_descartados = 0
+
+    def connect(self, room_code, nivel=None):
         self.ws = websocket.WebSocketApp(self.url,
                                          on_open=self.on_open,
                                          on_message=self.on_message,
@@ -22,24 +68,45 @@ class Network:
         self.thread = threading.Thread(target=self.ws.run_forever)
         self.thread.daemon = True
         self.thread.start()
+        if self._hilo_envio is None:
+            self._hilo_envio = threading.Thread(target=self._bucle_envio, daemon=True)
+            self._hilo_envio.start()
         
-        # Guardamos el código de la sala para el mensaje de 'join'
+        # Guardamos el código de la sala para el mensaje de 'join'. El nivel solo
+        # lo usa el servidor autoritativo, y solo si la sala es nueva: quien se
+        # une a una sala que ya existe juega el nivel que tenga
         self.room_code = room_code
+        self.nivel = nivel
 
     def on_open(self, ws):
         print("Conexión establecida.")
         self.is_connected = True
         # Unirse a la sala
         join_message = {"type": "join", "room": self.room_code}
+        if self.nivel is not None: join_message["nivel"] = self.nivel
+        if self.protocolo: join_message["sesion"] = self.protocolo.sesion
         self.send(join_message)
 
     def on_message(self, ws, message):
+        if isinstance(message, bytes):
+            if self.protocolo is None: return
+            try:
+                with self._cerrojo_protocolo: mensajes = self.protocolo.decodificar(message)
+                for data in mensajes: self._encolar(data)
+            except ErrorProtocolo as e:
+                print(f"Error decodificando trama binaria: {e}")
+            return
         try:
-            data = json.loads(message)
-            self.received_messages.append(data)
+            self._encolar(json.loads(message))
         except json.JSONDecodeError:
             print(f"Error decodificando mensaje: {message}")
 
+    def _encolar(self, data):
+        # La cola tiene maxlen: si está llena, append() tira el mensaje más viejo
+        if len(self.received_messages) == self.received_messages.maxlen: self.mensajes_desbordados += 1
+        self.received_messages.append(data)
+        self.mensajes_recibidos += 1
+
     def on_error(self, ws, error):
         print(f"Error de conexión: {error}")
         self.is_connected = False
@@ -49,17 +116,131 @@ class Network:
         self.is_connected = False
 
     def send(self, data):
-        if self.is_connected and self.ws:
-            try:
-                self.ws.send(json.dumps(data))
-            except Exception as e:
-                print(f"Error al enviar datos: {e}")
-    
+        if not self.is_connected: return
+        if data.get("type") != "game_update":
+            self._encolar_envio(data)
+            return
+        if data.get("disparo"):
+            # Un disparo es un evento: sale ya, sin esperar al siguiente envío
+            self._actualizacion_pendiente = None
+            self._marcar_enviado(data, time.monotonic())
+            self._encolar_envio(data)
+            if self.protocolo: self._encolar_envio(_CERRAR_TRAMA)
+            return
+        self._actualizacion_pendiente = data
+
+    def enviar_lote(self):
+        # Se llama una vez por frame: manda la última actualización pendiente si ya
+        # toca según la tasa de envío y, con el protocolo binario, cierra la trama
+        # (o manda solo el ack si no hay nada)
+        pendiente = self._actualizacion_pendiente
+        if pendiente is not None:
+            ahora = time.monotonic()
+            transcurrido = ahora - self._ultimo_envio
+            if transcurrido >= self.intervalo_envio_s:
+                self._actualizacion_pendiente = None
+                # Tras un cambio se manda una vez el estado repetido: así el otro
+                # extremo ve velocidad cero y no sigue extrapolando
+                if (not self.solo_cambios or not self._repeticion_enviada
+                        or _clave_estado(pendiente) != self._ultimo_estado_enviado
+                        or transcurrido * 1000 >= LATIDO_ENVIO_RED_MS):
+                    self._marcar_enviado(pendiente, ahora)
+                    self._encolar_envio(pendiente)
+                else:
+                    self.envios_suprimidos += 1
+        if self.protocolo and self.is_connected: self._encolar_envio(_CERRAR_TRAMA)
+
+    def _marcar_enviado(self, data, ahora):
+        clave = _clave_estado(data)
+        self._repeticion_enviada = clave == self._ultimo_estado_enviado
+        self._ultimo_envio = ahora
+        self._ultimo_estado_enviado = clave
+        self.envios += 1
+
+    def _encolar_envio(self, elemento):
+        with self._condicion_envio:
+            if len(self._cola_envio) >= MAX_COLA_ENVIO_RED:
+                # Si la red se atasca se pierde lo más viejo, nunca se bloquea el juego
+                self._cola_envio.popleft()
+                self.envios_descartados += 1
+            self._cola_envio.append(elemento)
+            self._condicion_envio.notify()
+
+    def _bucle_envio(self):
+        while True:
+            with self._condicion_envio:
+                while not self._cola_envio: self._condicion_envio.wait()
+                elementos = list(self._cola_envio)
+                self._cola_envio.clear()
+            for elemento in elementos:
+                if elemento is _FIN_ENVIO: return
+                try:
+                    self._enviar_elemento(elemento)
+                except Exception as e:
+                    print(f"Error al enviar datos: {e}")
+
+    def _enviar_elemento(self, elemento):
+        if not (self.is_connected and self.ws): return
+        if elemento is _CERRAR_TRAMA:
+            with self._cerrojo_protocolo:
+                trama = self.protocolo.cerrar_trama() or self.protocolo.trama_de_ack()
+            if trama: self.ws.send(trama, opcode=websocket.ABNF.OPCODE_BINARY)
+        elif self.protocolo and elemento.get("type") == "game_update":
+            with self._cerrojo_protocolo: trama = self.protocolo.agregar(elemento)
+            if trama: self.ws.send(trama, opcode=websocket.ABNF.OPCODE_BINARY)
+        else:
+            self.ws.send(json.dumps(elemento))
+
     def get_message(self):
         if self.received_messages:
             return self.received_messages.popleft()
         return None
 
+    def tomar_mensajes(self):
+        # Vacía la cola y combina los 'game_update' atrasados: de cada emisor solo
+        # queda el último sin disparo, pero los que traen disparo se conservan en
+        # orden (son eventos, no posiciones). El resto de mensajes pasa tal cual.
+        pendientes = []
+        while True:
+            try: pendientes.append(self.received_messages.popleft())
+            except IndexError: break
+        if len(pendientes) > self.profundidad_max_cola: self.profundidad_max_cola = len(pendientes)
+
+        mensajes = []
+        ultimo_por_emisor = {}
+        for data in pendientes:
+            if data.get('type') == 'game_update':
+                emisor = data.get('id')
+                anterior = ultimo_por_emisor.pop(emisor, None)
+                if anterior is not None:
+                    mensajes[anterior] = None
+                    self.mensajes_combinados += 1
+                if not data.get('disparo'): ultimo_por_emisor[emisor] = len(mensajes)
+            mensajes.append(data)
+        return [data for data in mensajes if data is not None]
+
+    def estadisticas_recepcion(self):
+        return {
+            "recibidos": self.mensajes_recibidos,
+            "combinados": self.mensajes_combinados,
+            "desbordados": self.mensajes_desbordados,
+            # Lo que hay ahora sin leer (0 justo después de tomar_mensajes())
+            "profundidad_cola": len(self.received_messages),
+            "profundidad_max_cola": self.profundidad_max_cola,
+            "enviados": self.envios,
+            "suprimidos": self.envios_suprimidos,
+            "descartados_envio": self.envios_descartados,
+        }
+
     def disconnect(self):
+        if self._hilo_envio is not None:
+            # Lo que ya estaba en la cola sale antes de cerrar
+            self._encolar_envio(_FIN_ENVIO)
+            self._hilo_envio.join(timeout=1.0)
+            self._hilo_envio = None
         if self.ws:
-            self.ws.close()
\ No newline at end of file
+            self.ws.close()
+        # Sin ws se puede volver a conectar; lo que quedó sin leer era de esta sala
+        self.ws = None
+        self.is_connected = False
+        self.received_messages.clear()
\ No newline at end of file
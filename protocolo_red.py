@@ -0,0 +1,233 @@
+# protocolo_red.py
+# Protocolo binario para los mensajes 'game_update' de Network.
+# Cada trama WebSocket binaria lleva una cabecera fija y un lote de
+# actualizaciones; cada actualización se codifica como delta por campos contra
+# el último estado que el otro extremo confirmó (ack). Si no hay base común se
+# manda completa. Los ids de jugador son ids de sesión de 16 bits en vez del
+# hex del uuid, y los tipos y direcciones viajan como índices de tabla.
+# Una actualización con disparo también va completa: un delta cuya base el
+# receptor ya no tiene se descarta, y un disparo perdido no lo repara la
+# trama siguiente.
+#
+# Trama:        versión B | sesión H | ack_sesión H | ack H | n_mensajes B
+# Mensaje:      secuencia H | máscara B | [base H si no es completo] | campos | t, entrada
+# Campos (en este orden, si su bit está en la máscara):
+#   x_tile H, y_tile H, dirección B, tipo B, pixel_x H, pixel_y H; el disparo
+#   es solo un bit. La marca de tiempo del emisor (t, ms) y la secuencia de
+#   entrada van siempre: absolutas (I) en un mensaje completo y como
+#   diferencia con la base (H) en un delta.
+import random
+import struct
+
+from constantes import UP, DOWN, LEFT, RIGHT, STAY, TIPO_JUGADOR, TILE_SIZE
+
+# 2: píxeles, marca de tiempo y secuencia de entrada para la sincronización
+VERSION_PROTOCOLO = 2
+
+_CABECERA = struct.Struct("<BHHHB")
+_MENSAJE = struct.Struct("<HB")
+
+CAMPO_X = 0x01
+CAMPO_Y = 0x02
+CAMPO_DIRECCION = 0x04
+CAMPO_TIPO = 0x08
+CAMPO_PIXEL_X = 0x10
+CAMPO_PIXEL_Y = 0x20
+CAMPO_DISPARO = 0x40
+MENSAJE_COMPLETO = 0x80
+_CAMPOS = ((CAMPO_X, "H"), (CAMPO_Y, "H"), (CAMPO_DIRECCION, "B"), (CAMPO_TIPO, "B"),
+           (CAMPO_PIXEL_X, "H"), (CAMPO_PIXEL_Y, "H"))
+_TODOS_LOS_CAMPOS = CAMPO_X | CAMPO_Y | CAMPO_DIRECCION | CAMPO_TIPO | CAMPO_PIXEL_X | CAMPO_PIXEL_Y
+_N_CAMPOS = len(_CAMPOS)
+
+
+def _formato_mensaje(mascara):
+    # Un Struct por combinación de campos: cada mensaje se empaqueta y
+    # desempaqueta con una sola llamada
+    campos = "".join(tipo for bit, tipo in _CAMPOS if mascara & bit)
+    if mascara & MENSAJE_COMPLETO: return struct.Struct("<HB" + campos + "II")
+    return struct.Struct("<HBH" + campos + "HH")
+
+
+_FORMATOS = {mascara: _formato_mensaje(mascara) for mascara in range(0x100)}
+
+# Las tablas solo pueden crecer por el final sin cambiar VERSION_PROTOCOLO
+DIRECCIONES_RED = (STAY, UP, DOWN, LEFT, RIGHT)
+TIPOS_RED = (TIPO_JUGADOR,)
+_INDICE_DIRECCION = {direccion: i for i, direccion in enumerate(DIRECCIONES_RED)}
+_INDICE_TIPO = {tipo: i for i, tipo in enumerate(TIPOS_RED)}
+
+# Estados enviados/recibidos que se recuerdan para usarlos como base de deltas
+HISTORIAL_SECUENCIAS = 64
+MAX_MENSAJES_POR_TRAMA = 255
+
+
+class ErrorProtocolo(ValueError):
+    pass
+
+
+def nueva_sesion():
+    # Id de sesión aleatorio de 16 bits; el 0 queda reservado para "nadie"
+    return random.randint(1, 0xFFFF)
+
+
+def _es_mas_nueva(a, b):
+    # Comparación de secuencias de 16 bits con vuelta
+    return a != b and ((a - b) & 0xFFFF) < 0x8000
+
+
+def _estado_de_mensaje(mensaje):
+    # (x, y, dirección, tipo, pixel_x, pixel_y, t, entrada); los dos últimos no son campos
+    direccion = tuple(mensaje.get("direccion", STAY))
+    x_tile, y_tile = mensaje["x_tile"], mensaje["y_tile"]
+    pixel_x = mensaje.get("pixel_x", x_tile * TILE_SIZE)
+    pixel_y = mensaje.get("pixel_y", y_tile * TILE_SIZE)
+    return (x_tile, y_tile, _INDICE_DIRECCION.get(direccion, 0), _INDICE_TIPO.get(mensaje.get("tipo"), 0),
+            max(0, int(round(pixel_x))), max(0, int(round(pixel_y))),
+            int(mensaje.get("t") or 0) & 0xFFFFFFFF, int(mensaje.get("secuencia") or 0) & 0xFFFFFFFF)
+
+
+class SesionProtocolo:
+    # Estado de codificación y decodificación de un extremo de la sala
+
+    def __init__(self, sesion=None):
+        self.sesion = sesion or nueva_sesion()
+        self.secuencia = 0
+        # secuencia -> estado de lo enviado (ver _estado_de_mensaje)
+        self.enviados = {}
+        # Último ack recibido de cada sesión remota sobre nuestros mensajes
+        # (None si todavía no ha confirmado nada: entonces no se hacen deltas)
+        self.acks_remotos = {}
+        # sesión remota -> {secuencia: estado} y última secuencia recibida
+        self.recibidos = {}
+        self.ultima_recibida = {}
+        self.pendientes = []
+        self._ack_enviado = (0, 0)
+        self.bytes_enviados = 0
+        self.bytes_recibidos = 0
+
+    # --- Envío ---
+    def agregar(self, mensaje):
+        # Codifica un 'game_update' y lo deja en el lote hasta cerrar_trama()
+        estado = _estado_de_mensaje(mensaje)
+        self.secuencia = (self.secuencia + 1) & 0xFFFF
+        base = self._base_comun()
+        estado_base = self.enviados.get(base) if base is not None else None
+        if estado_base is not None:
+            avance_t = estado[-2] - estado_base[-2]
+            avance_entrada = estado[-1] - estado_base[-1]
+            # Las diferencias viajan en 16 bits sin signo
+            if not (0 <= avance_t <= 0xFFFF and 0 <= avance_entrada <= 0xFFFF): estado_base = None
+        # El disparo va siempre en un mensaje completo, que se decodifica sin base
+        if mensaje.get("disparo"): estado_base = None
+        if estado_base is None:
+            mascara = MENSAJE_COMPLETO | _TODOS_LOS_CAMPOS
+            valores = list(estado)
+        else:
+            mascara = 0
+            valores = [base]
+            for (bit, _), valor, valor_base in zip(_CAMPOS, estado, estado_base):
+                if valor != valor_base:
+                    mascara |= bit
+                    valores.append(valor)
+            valores.append(avance_t)
+            valores.append(avance_entrada)
+        if mensaje.get("disparo"): mascara |= CAMPO_DISPARO
+        self.pendientes.append(_FORMATOS[mascara].pack(self.secuencia, mascara, *valores))
+
+        self.enviados[self.secuencia] = estado
+        viejo = (self.secuencia - HISTORIAL_SECUENCIAS) & 0xFFFF
+        self.enviados.pop(viejo, None)
+        if len(self.pendientes) >= MAX_MENSAJES_POR_TRAMA: return self.cerrar_trama()
+        return None
+
+    def _base_comun(self):
+        # La base de un delta tiene que haberla recibido cada sesión remota: se usa
+        # el ack más antiguo, si todavía está en el historial
+        base = None
+        for ack in self.acks_remotos.values():
+            if ack is None: return None
+            if base is None or _es_mas_nueva(base, ack): base = ack
+        if base is None or ((self.secuencia - base) & 0xFFFF) >= HISTORIAL_SECUENCIAS: return None
+        return base
+
+    def cerrar_trama(self):
+        # Junta los mensajes pendientes en una trama; la cabecera lleva además el
+        # ack de lo último recibido para que el otro extremo pueda hacer deltas
+        # (uno solo: las salas son de dos jugadores)
+        if not self.pendientes: return None
+        trama = self._cabecera(len(self.pendientes)) + b"".join(self.pendientes)
+        self.pendientes = []
+        self.bytes_enviados += len(trama)
+        return trama
+
+    def trama_de_ack(self):
+        # Trama sin mensajes que solo confirma lo recibido; None si no hay nada nuevo
+        if next(iter(self.ultima_recibida.items()), (0, 0)) == self._ack_enviado: return None
+        trama = self._cabecera(0)
+        self.bytes_enviados += len(trama)
+        return trama
+
+    def _cabecera(self, n_mensajes):
+        ack_sesion, ack = self._ack_enviado = next(iter(self.ultima_recibida.items()), (0, 0))
+        return _CABECERA.pack(VERSION_PROTOCOLO, self.sesion, ack_sesion, ack, n_mensajes)
+
+    # --- Recepción ---
+    def decodificar(self, trama):
+        # Devuelve la lista de 'game_update' (dicts con la misma forma que los JSON)
+        if len(trama) < _CABECERA.size: raise ErrorProtocolo("Trama demasiado corta")
+        version, sesion, ack_sesion, ack, n_mensajes = _CABECERA.unpack_from(trama, 0)
+        if version != VERSION_PROTOCOLO: raise ErrorProtocolo(f"Versión de protocolo {version} no soportada")
+        self.bytes_recibidos += len(trama)
+        if sesion == self.sesion: return []
+        if ack_sesion == self.sesion: self.acks_remotos[sesion] = ack
+        else: self.acks_remotos.setdefault(sesion, None)
+
+        historial = self.recibidos.setdefault(sesion, {})
+        mensajes = []
+        desplazamiento = _CABECERA.size
+        try:
+            for _ in range(n_mensajes):
+                mascara = trama[desplazamiento + 2]
+                formato = _FORMATOS.get(mascara)
+                if formato is None: raise ErrorProtocolo(f"Máscara de campos desconocida {mascara:#x}")
+                secuencia, _, *valores = formato.unpack_from(trama, desplazamiento)
+                desplazamiento += formato.size
+                if mascara & MENSAJE_COMPLETO:
+                    estado = tuple(valores)
+                else:
+                    estado_base = historial.get(valores[0])
+                    if estado_base is None:
+                        # Base que ya no tenemos (p. ej. nos unimos tarde): el emisor
+                        # mandará uno completo en cuanto vea nuestro ack. Solo se
+                        # pierde posición: los disparos nunca van en un delta
+                        continue
+                    t = estado_base[-2] + valores[-2]
+                    entrada = estado_base[-1] + valores[-1]
+                    if len(valores) == 3:
+                        estado = estado_base[:_N_CAMPOS] + (t, entrada)
+                    else:
+                        campos = iter(valores[1:-2])
+                        estado = tuple(next(campos) if mascara & bit else valor_base
+                                       for (bit, _), valor_base in zip(_CAMPOS, estado_base)) + (t, entrada)
+                x, y, direccion, tipo, pixel_x, pixel_y, t, entrada = estado
+                historial[secuencia] = estado
+                historial.pop((secuencia - HISTORIAL_SECUENCIAS) & 0xFFFF, None)
+                ultima = self.ultima_recibida.get(sesion)
+                if ultima is None or _es_mas_nueva(secuencia, ultima): self.ultima_recibida[sesion] = secuencia
+                mensajes.append({
+                    "type": "game_update",
+                    "id": sesion,
+                    "tipo": TIPOS_RED[tipo] if tipo < len(TIPOS_RED) else None,
+                    "x_tile": x,
+                    "y_tile": y,
+                    "pixel_x": pixel_x,
+                    "pixel_y": pixel_y,
+                    "direccion": DIRECCIONES_RED[direccion] if direccion < len(DIRECCIONES_RED) else STAY,
+                    "disparo": bool(mascara & CAMPO_DISPARO),
+                    "t": t,
+                    "secuencia": entrada,
+                })
+        except (struct.error, IndexError) as e:
+            raise ErrorProtocolo(f"Trama truncada: {e}") from e
+        return mensajes
@@ -0,0 +1,439 @@
+# servidor_autoritativo.py
+# Servidor autoritativo: cada sala es un MotorJuego sin pygame que simula el
+# servidor; los clientes solo mandan sus entradas y dibujan las instantáneas
+# del mundo que reciben (backend/instantanea_mundo.py). Así enemigos, balas y
+# objetivos son los mismos para todos y caben más de dos jugadores por sala.
+#
+# - El proceso principal (asyncio) atiende los WebSocket con el mismo
+#   framing que servidor_relay.py y reparte las salas entre procesos
+#   trabajadores (el menos cargado), con los que habla por un Pipe. Las
+#   órdenes a cada trabajador las escribe un hilo propio: Pipe.send bloquea
+#   si el buffer está lleno (p. ej. el trabajador mandando los muros de un
+#   mapa grande) y el bucle de asyncio no puede quedarse esperando.
+# - Cada trabajador simula sus salas con un planificador por plazos: cada
+#   sala tiene su próximo tick y su próxima instantánea, y el trabajador
+#   duerme en poll() hasta el plazo más cercano o hasta que llegue una orden.
+#   Una sala que se atrasa recupera como mucho MAX_TICKS_LOGICA_POR_FRAME
+#   ticks y descarta el resto, sin frenar a las demás.
+# - Las instantáneas se serializan a JSON en el trabajador; el principal solo
+#   arma la trama y la copia a cada cliente de la sala.
+#
+# Mensajes del cliente: {"type": "join", "room": código, "nivel": 1 o nombre}
+# (nombre de un nivel de niveles_editados; cualquier otra cosa juega el nivel 1)
+# y {"type": "entrada", "secuencia": n, "mover": [dx, dy] o null,
+# "disparar": bool, "detenerse": bool}. El servidor responde al unirse (y en
+# cada cambio de nivel) con {"type": "bienvenida", "tanque": id} y manda
+# {"type": "instantanea", ...} a TASA_INSTANTANEAS_SERVIDOR_HZ.
+# Uso: python servidor_autoritativo.py [--host H] [--puerto P] [--trabajadores N] [--estadisticas SEG]
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+
+from constantes import (
+    PUERTO_SERVIDOR_AUTORITATIVO, TRABAJADORES_SERVIDOR, TASA_INSTANTANEAS_SERVIDOR_HZ,
+    MAX_JUGADORES_POR_SALA, PAUSA_FIN_NIVEL_SERVIDOR_MS, TIEMPO_TICK_LOGICA_MS,
+    MAX_TICKS_LOGICA_POR_FRAME, DIRECTIONS, JUGANDO, NIVEL_COMPLETADO, VICTORIA_FINAL,
+    MAX_NIVELES, EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA
+)
+from backend.motor_juego import MotorJuego
+from backend.niveles import niveles_guardados
+from backend.instantanea_mundo import instantanea_mundo
+from servidor_relay import (
+    ClienteRelay, MensajeDemasiadoGrande, trama_websocket, trama_cierre, leer_mensaje, handshake_websocket,
+    escribir_cliente, cerrar_cliente, OPCODE_TEXTO, OPCODE_CIERRE, OPCODE_PING, OPCODE_PONG,
+    CIERRE_MENSAJE_DEMASIADO_GRANDE
+)
+
+# Acciones de una sola pulsación: se guardan hasta que las consuma un tick
+ACCIONES_DE_UN_TICK = ("disparar", "detenerse")
+SEGUNDOS_ENTRE_ESTADISTICAS_TRABAJADOR = 1.0
+
+
+# --- Trabajador: simulación de salas ---
+
+class SalaServidor:
+    def __init__(self, codigo, nivel, ahora):
+        self.codigo = codigo
+        self.motor = MotorJuego()
+        self.nivel = nivel
+        # cliente -> id de su tanque (None si la sala está llena), en orden de llegada
+        self.tanques = {}
+        # cliente -> acciones pendientes, última secuencia de entrada recibida y
+        # la última que ya entró en un tick (el ack de las instantáneas)
+        self.acciones = {}
+        self.secuencias = {}
+        self.aplicadas = {}
+        self.estado = JUGANDO
+        self.reanudar_en = None
+        self.muros_enviados = None
+        self.proximo_tick = ahora
+        self.proxima_instantanea = ahora
+        self.ticks_descartados = 0
+        self.cargado = self.motor.cargar_nivel(nivel)
+
+    def unir(self, cliente, conexion):
+        self.tanques[cliente] = None
+        self.acciones[cliente] = {}
+        self.secuencias[cliente] = 0
+        self.aplicadas[cliente] = 0
+        self._asignar_tanque(cliente)
+        # El que llega necesita los muros: van en la siguiente instantánea
+        self.muros_enviados = None
+        self._dar_bienvenida(cliente, conexion)
+
+    def salir(self, cliente):
+        tanque_id = self.tanques.pop(cliente, None)
+        self.acciones.pop(cliente, None)
+        self.secuencias.pop(cliente, None)
+        self.aplicadas.pop(cliente, None)
+        # El tanque principal se queda (sin él no hay nivel) para el próximo que llegue
+        if tanque_id is not None and tanque_id != self.motor.jugador_id:
+            self.motor.quitar_jugador_remoto(tanque_id)
+
+    def _asignar_tanque(self, cliente):
+        motor = self.motor
+        if motor.jugador_id is not None and motor.jugador_id not in self.tanques.values():
+            self.tanques[cliente] = motor.jugador_id
+        elif sum(1 for tanque_id in self.tanques.values() if tanque_id is not None) < MAX_JUGADORES_POR_SALA:
+            self.tanques[cliente] = motor.agregar_jugador_remoto()
+
+    def _dar_bienvenida(self, cliente, conexion):
+        conexion.send(("a_cliente", cliente, json.dumps({
+            "type": "bienvenida", "sala": self.codigo, "tanque": self.tanques.get(cliente),
+            "tick_ms": TIEMPO_TICK_LOGICA_MS, "tasa_instantaneas": TASA_INSTANTANEAS_SERVIDOR_HZ,
+        })))
+
+    def entrada(self, cliente, mensaje):
+        acciones = self.acciones.get(cliente)
+        if acciones is None: return
+        secuencia = mensaje.get("secuencia", 0)
+        # Las que llegan desordenadas no pisan a las nuevas
+        if not isinstance(secuencia, int) or secuencia <= self.secuencias[cliente]: return
+        self.secuencias[cliente] = secuencia
+        mover = mensaje.get("mover")
+        mover = tuple(mover) if isinstance(mover, list) else None
+        if mover in DIRECTIONS: acciones["mover"] = mover
+        else: acciones.pop("mover", None)
+        for clave in ACCIONES_DE_UN_TICK:
+            if mensaje.get(clave): acciones[clave] = True
+
+    def proximo_plazo(self):
+        # En la pausa de fin de nivel no se simula ni se manda nada
+        if self.reanudar_en is not None: return self.reanudar_en
+        return min(self.proximo_tick, self.proxima_instantanea)
+
+    def avanzar(self, ahora, conexion):
+        # Devuelve los ticks simulados
+        if self.reanudar_en is not None:
+            if ahora >= self.reanudar_en: self._siguiente_nivel(ahora, conexion)
+            return 0
+        intervalo = TIEMPO_TICK_LOGICA_MS / 1000.0
+        ticks = 0
+        while self.proximo_tick <= ahora and ticks < MAX_TICKS_LOGICA_POR_FRAME:
+            self._tick()
+            self.proximo_tick += intervalo
+            ticks += 1
+            if self.estado != JUGANDO:
+                self.reanudar_en = ahora + PAUSA_FIN_NIVEL_SERVIDOR_MS / 1000.0
+                self.proxima_instantanea = ahora
+                break
+        if self.proximo_tick <= ahora:
+            # Sala atrasada: se descarta lo que no se pudo recuperar
+            self.ticks_descartados += int((ahora - self.proximo_tick) / intervalo) + 1
+            self.proximo_tick = ahora + intervalo
+        if ahora >= self.proxima_instantanea:
+            self._enviar_instantanea(conexion)
+            self.proxima_instantanea = max(self.proxima_instantanea + 1.0 / TASA_INSTANTANEAS_SERVIDOR_HZ, ahora)
+        return ticks
+
+    def _tick(self):
+        motor = self.motor
+        acciones_principal = {}
+        acciones_remotas = {}
+        for cliente, tanque_id in self.tanques.items():
+            if tanque_id is None: continue
+            if tanque_id == motor.jugador_id: acciones_principal = self.acciones[cliente]
+            else: acciones_remotas[tanque_id] = self.acciones[cliente]
+        self.estado = motor.actualizar_estado(acciones_principal, TIEMPO_TICK_LOGICA_MS, acciones_remotas)
+        for cliente, acciones in self.acciones.items():
+            for clave in ACCIONES_DE_UN_TICK: acciones.pop(clave, None)
+            self.aplicadas[cliente] = self.secuencias[cliente]
+
+    def _enviar_instantanea(self, conexion):
+        motor = self.motor
+        incluir_muros = self.muros_enviados != motor.ocupacion.version_muros
+        entradas = {tanque_id: self.aplicadas[cliente] for cliente, tanque_id in self.tanques.items() if tanque_id is not None}
+        instantanea = instantanea_mundo(motor, self.estado, entradas, incluir_muros)
+        self.muros_enviados = motor.ocupacion.version_muros
+        conexion.send(("instantanea", self.codigo, json.dumps(instantanea, separators=(",", ":"))))
+
+    def _siguiente_nivel(self, ahora, conexion):
+        # Se pasa de nivel o se repite el mismo; tras la victoria final se vuelve al primero
+        if isinstance(self.nivel, int):
+            if self.estado == NIVEL_COMPLETADO: self.nivel += 1
+            elif self.estado == VICTORIA_FINAL: self.nivel = 1
+        self.cargado = self.motor.cargar_nivel(self.nivel)
+        self.estado = JUGANDO
+        self.reanudar_en = None
+        self.proximo_tick = ahora
+        self.muros_enviados = None
+        clientes = list(self.tanques)
+        for cliente in clientes: self.tanques[cliente] = None
+        for cliente in clientes:
+            self._asignar_tanque(cliente)
+            self._dar_bienvenida(cliente, conexion)
+
+
+def ejecutar_trabajador(conexion):
+    # Bucle de un proceso trabajador: órdenes del principal por 'conexion'
+    # ("unir", sala, cliente, nivel) / ("entrada", sala, cliente, mensaje) /
+    # ("salir", sala, cliente) / None para terminar
+    salas = {}
+    ticks = 0
+    segundos_ocupado = 0.0
+    proximas_estadisticas = time.monotonic() + SEGUNDOS_ENTRE_ESTADISTICAS_TRABAJADOR
+    while True:
+        ahora = time.monotonic()
+        plazo = min((sala.proximo_plazo() for sala in salas.values()), default=proximas_estadisticas)
+        if conexion.poll(max(0.0, min(plazo, proximas_estadisticas) - ahora)):
+            while conexion.poll():
+                try: orden = conexion.recv()
+                except EOFError: return
+                if orden is None: return
+                _atender_orden(salas, orden, conexion)
+
+        inicio = time.monotonic()
+        for sala in salas.values(): ticks += sala.avanzar(inicio, conexion)
+        fin = time.monotonic()
+        segundos_ocupado += fin - inicio
+        if fin >= proximas_estadisticas:
+            conexion.send(("estadisticas", {
+                "salas": len(salas), "ticks": ticks, "ocupado_ms": round(segundos_ocupado * 1000),
+                "ticks_descartados": sum(sala.ticks_descartados for sala in salas.values()),
+            }))
+            ticks, segundos_ocupado = 0, 0.0
+            proximas_estadisticas = fin + SEGUNDOS_ENTRE_ESTADISTICAS_TRABAJADOR
+
+
+def _atender_orden(salas, orden, conexion):
+    tipo, codigo = orden[0], orden[1]
+    sala = salas.get(codigo)
+    if tipo == "entrada":
+        if sala is not None: sala.entrada(orden[2], orden[3])
+    elif tipo == "unir":
+        if sala is None:
+            sala = SalaServidor(codigo, orden[3], time.monotonic())
+            if not sala.cargado:
+                print(f"Trabajador: no se pudo cargar el nivel {orden[3]!r} para la sala {codigo}")
+                sala = SalaServidor(codigo, 1, time.monotonic())
+            salas[codigo] = sala
+        sala.unir(orden[2], conexion)
+    elif tipo == "salir":
+        if sala is None: return
+        sala.salir(orden[2])
+        if not sala.tanques: del salas[codigo]
+
+
+# --- Proceso principal: WebSocket y reparto de salas ---
+
+def _enviar_ordenes(conexion, cola):
+    # Hilo de envío de un trabajador: puede bloquearse en send() sin frenar el
+    # bucle de asyncio, que sigue vaciando lo que manda el trabajador
+    while True:
+        orden = cola.get()
+        try: conexion.send(orden)
+        except (BrokenPipeError, OSError): return
+        if orden is None: return
+
+
+def nivel_permitido(nivel):
+    # El nivel lo elige el cliente: solo niveles procedurales (1..MAX_NIVELES)
+    # o el nombre de un nivel de niveles_editados, nunca una ruta
+    if isinstance(nivel, int) and not isinstance(nivel, bool):
+        return min(max(nivel, 1), MAX_NIVELES)
+    if isinstance(nivel, str):
+        nombre, extension = os.path.splitext(nivel)
+        if extension not in ("", EDITOR_EXTENSION_TEXTO, EDITOR_EXTENSION_BINARIA): nombre = nivel
+        if nombre in niveles_guardados(): return nombre
+    return 1
+
+
+class ServidorAutoritativo:
+    def __init__(self, n_trabajadores):
+        # spawn: los trabajadores no heredan el bucle de asyncio ni los sockets
+        contexto = multiprocessing.get_context("spawn")
+        self.trabajadores = []
+        # Por trabajador: cola de órdenes pendientes y el hilo que las envía
+        self.colas_trabajadores = []
+        self.hilos_envio = []
+        for _ in range(n_trabajadores):
+            conexion_principal, conexion_trabajador = contexto.Pipe()
+            proceso = contexto.Process(target=ejecutar_trabajador, args=(conexion_trabajador,), daemon=True)
+            proceso.start()
+            conexion_trabajador.close()
+            self.trabajadores.append((proceso, conexion_principal))
+            cola = queue.SimpleQueue()
+            hilo = threading.Thread(target=_enviar_ordenes, args=(conexion_principal, cola), daemon=True)
+            hilo.start()
+            self.colas_trabajadores.append(cola)
+            self.hilos_envio.append(hilo)
+        self.salas_por_trabajador = [0] * n_trabajadores
+        # código -> (índice del trabajador, {id de cliente: ClienteRelay})
+        self.salas = {}
+        self.clientes = {}
+        self.siguiente_cliente = 1
+        self.conexiones = 0
+        self.instantaneas = 0
+        self.estadisticas_trabajadores = [{} for _ in range(n_trabajadores)]
+
+    def arrancar(self, loop):
+        for indice, (_, conexion) in enumerate(self.trabajadores):
+            loop.add_reader(conexion.fileno(), self._leer_trabajador, indice)
+
+    def detener(self):
+        # None termina el trabajador y, después de enviarlo, su hilo de envío
+        for cola in self.colas_trabajadores: cola.put(None)
+        for hilo in self.hilos_envio: hilo.join(timeout=2.0)
+        for proceso, _ in self.trabajadores: proceso.join(timeout=2.0)
+
+    def estadisticas(self):
+        return {
+            "conexiones": self.conexiones,
+            "salas": len(self.salas),
+            "instantaneas": self.instantaneas,
+            "trabajadores": self.estadisticas_trabajadores,
+        }
+
+    def _leer_trabajador(self, indice):
+        conexion = self.trabajadores[indice][1]
+        while conexion.poll():
+            try: mensaje = conexion.recv()
+            except EOFError:
+                asyncio.get_event_loop().remove_reader(conexion.fileno())
+                print(f"Servidor: el trabajador {indice} terminó")
+                return
+            tipo = mensaje[0]
+            if tipo == "instantanea":
+                sala = self.salas.get(mensaje[1])
+                if sala is None: continue
+                trama = trama_websocket(OPCODE_TEXTO, mensaje[2].encode())
+                for cliente in sala[1].values(): cliente.encolar(trama)
+                self.instantaneas += 1
+            elif tipo == "a_cliente":
+                cliente = self.clientes.get(mensaje[1])
+                if cliente is not None: cliente.encolar(trama_websocket(OPCODE_TEXTO, mensaje[2].encode()))
+            elif tipo == "estadisticas":
+                self.estadisticas_trabajadores[indice] = mensaje[1]
+
+    def _enviar_a_trabajador(self, codigo, orden):
+        sala = self.salas.get(codigo)
+        if sala is not None: self.colas_trabajadores[sala[0]].put(orden)
+
+    def _unir(self, cliente_id, cliente, codigo, nivel):
+        self._salir(cliente_id, cliente)
+        if codigo not in self.salas:
+            indice = min(range(len(self.trabajadores)), key=self.salas_por_trabajador.__getitem__)
+            self.salas_por_trabajador[indice] += 1
+            self.salas[codigo] = (indice, {})
+        self.salas[codigo][1][cliente_id] = cliente
+        cliente.sala = codigo
+        self._enviar_a_trabajador(codigo, ("unir", codigo, cliente_id, nivel))
+
+    def _salir(self, cliente_id, cliente):
+        sala = self.salas.get(cliente.sala)
+        if sala is None: return
+        self._enviar_a_trabajador(cliente.sala, ("salir", cliente.sala, cliente_id))
+        sala[1].pop(cliente_id, None)
+        if not sala[1]:
+            self.salas_por_trabajador[sala[0]] -= 1
+            del self.salas[cliente.sala]
+        cliente.sala = None
+
+    async def atender(self, lector, escritor):
+        aceptado = False
+        try:
+            aceptado = await handshake_websocket(lector, escritor)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            # Handshake rechazado, basura o cortado a medias: el socket no se queda abierto
+            if not aceptado: escritor.close()
+        if not aceptado: return
+        cliente = ClienteRelay(escritor)
+        cliente_id = self.siguiente_cliente
+        self.siguiente_cliente += 1
+        self.clientes[cliente_id] = cliente
+        tarea_escritura = asyncio.ensure_future(escribir_cliente(cliente))
+        self.conexiones += 1
+        try:
+            while True:
+                opcode, datos = await leer_mensaje(lector)
+                if opcode == OPCODE_CIERRE:
+                    cliente.encolar(trama_websocket(OPCODE_CIERRE, datos[:2]))
+                    break
+                if opcode == OPCODE_PING:
+                    cliente.encolar(trama_websocket(OPCODE_PONG, datos))
+                    continue
+                # Aquí solo se habla JSON; las tramas binarias de Network no aplican
+                if opcode != OPCODE_TEXTO: continue
+                try: mensaje = json.loads(datos)
+                except ValueError: continue
+                if not isinstance(mensaje, dict): continue
+                tipo = mensaje.get("type")
+                if tipo == "entrada":
+                    if cliente.sala is not None:
+                        self._enviar_a_trabajador(cliente.sala, ("entrada", cliente.sala, cliente_id, mensaje))
+                elif tipo == "join":
+                    self._unir(cliente_id, cliente, str(mensaje.get("room")), nivel_permitido(mensaje.get("nivel", 1)))
+        except MensajeDemasiadoGrande:
+            cliente.encolar(trama_cierre(CIERRE_MENSAJE_DEMASIADO_GRANDE))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._salir(cliente_id, cliente)
+            del self.clientes[cliente_id]
+            self.conexiones -= 1
+            await cerrar_cliente(cliente, tarea_escritura)
+
+
+async def servir(host, puerto, n_trabajadores, segundos_estadisticas=0, listo=None):
+    servidor_autoritativo = ServidorAutoritativo(n_trabajadores)
+    servidor_autoritativo.arrancar(asyncio.get_running_loop())
+    try:
+        servidor = await asyncio.start_server(servidor_autoritativo.atender, host, puerto, backlog=4096)
+        print(f"Servidor autoritativo escuchando en ws://{host}:{puerto} con {n_trabajadores} trabajadores")
+        if listo is not None: listo(servidor_autoritativo)
+        async with servidor:
+            if segundos_estadisticas > 0:
+                while True:
+                    await asyncio.sleep(segundos_estadisticas)
+                    print(f"Servidor: {servidor_autoritativo.estadisticas()}", flush=True)
+            else:
+                await servidor.serve_forever()
+    finally:
+        servidor_autoritativo.detener()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Servidor autoritativo del modo online")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO_SERVIDOR_AUTORITATIVO)
+    parser.add_argument("--trabajadores", type=int, default=TRABAJADORES_SERVIDOR, help="procesos de simulación (0 = uno por núcleo)")
+    parser.add_argument("--estadisticas", type=float, default=0, help="imprime contadores cada N segundos")
+    args = parser.parse_args(argv)
+    n_trabajadores = args.trabajadores or os.cpu_count() or 1
+    try:
+        asyncio.run(servir(args.host, args.puerto, n_trabajadores, args.estadisticas))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,255 @@
+# servidor_relay.py
+# Relay WebSocket local (solo biblioteca estándar: asyncio) que habla el mismo
+# protocolo que el relay de WEBSOCKET_URL: un cliente manda {"type": "join",
+# "room": código} y a partir de ahí todo lo que envía (texto o binario) se
+# reenvía tal cual al resto de la sala.
+# Cada cliente tiene una cola de salida acotada y una tarea escritora; si un
+# cliente lento la llena se descartan sus mensajes más viejos en vez de
+# acumular memoria o frenar a los demás (contrapresión). Un mensaje de más
+# de MAX_TAMANO_MENSAJE (sumando sus fragmentos) cierra la conexión con 1009.
+# Uso: python servidor_relay.py [--host H] [--puerto P] [--estadisticas SEG]
+import argparse
+import asyncio
+import base64
+import hashlib
+import json
+import struct
+import sys
+from collections import deque
+
+from constantes import PUERTO_RELAY_LOCAL, MAX_COLA_SALIDA_RELAY
+
+_GUID_WEBSOCKET = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+OPCODE_CONTINUACION = 0x0
+OPCODE_TEXTO = 0x1
+OPCODE_BINARIO = 0x2
+OPCODE_CIERRE = 0x8
+OPCODE_PING = 0x9
+OPCODE_PONG = 0xA
+MAX_TAMANO_MENSAJE = 1 << 20
+CIERRE_MENSAJE_DEMASIADO_GRANDE = 1009
+
+
+class MensajeDemasiadoGrande(ConnectionError):
+    pass
+
+
+def trama_websocket(opcode, datos):
+    # Las tramas del servidor van sin máscara
+    n = len(datos)
+    if n < 126: cabecera = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 65536: cabecera = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else: cabecera = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return cabecera + datos
+
+
+def trama_cierre(codigo):
+    return trama_websocket(OPCODE_CIERRE, struct.pack("!H", codigo))
+
+
+def _desenmascarar(datos, mascara):
+    # XOR de todo el bloque como un entero grande: mucho más rápido que byte a byte
+    n = len(datos)
+    if not n: return datos
+    clave = (mascara * (n // 4 + 1))[:n]
+    return (int.from_bytes(datos, "big") ^ int.from_bytes(clave, "big")).to_bytes(n, "big")
+
+
+async def leer_mensaje(lector):
+    # Devuelve (opcode, datos) de un mensaje completo (juntando fragmentos).
+    # El tope vale para el mensaje entero: si no, infinitas tramas de
+    # continuación harían crecer partes sin límite
+    opcode_mensaje, partes, total = None, [], 0
+    while True:
+        b0, b1 = await lector.readexactly(2)
+        fin, opcode = b0 & 0x80, b0 & 0x0F
+        longitud = b1 & 0x7F
+        if longitud == 126: longitud, = struct.unpack("!H", await lector.readexactly(2))
+        elif longitud == 127: longitud, = struct.unpack("!Q", await lector.readexactly(8))
+        if opcode < OPCODE_CIERRE:
+            total += longitud
+            if total > MAX_TAMANO_MENSAJE: raise MensajeDemasiadoGrande("Mensaje demasiado grande")
+        elif longitud > 125: raise ConnectionError("Trama de control demasiado grande")
+        mascara = await lector.readexactly(4) if b1 & 0x80 else None
+        datos = await lector.readexactly(longitud)
+        if mascara: datos = _desenmascarar(datos, mascara)
+        if opcode >= OPCODE_CIERRE:
+            # Las de control pueden llegar entre fragmentos
+            return opcode, datos
+        if opcode != OPCODE_CONTINUACION: opcode_mensaje = opcode
+        partes.append(datos)
+        if fin: return opcode_mensaje, b"".join(partes)
+
+
+async def handshake_websocket(lector, escritor):
+    peticion = await lector.readuntil(b"\r\n\r\n")
+    cabeceras = {}
+    for linea in peticion.decode("latin-1").split("\r\n")[1:]:
+        if ":" in linea:
+            nombre, valor = linea.split(":", 1)
+            cabeceras[nombre.strip().lower()] = valor.strip()
+    clave = cabeceras.get("sec-websocket-key")
+    if not clave or cabeceras.get("upgrade", "").lower() != "websocket":
+        escritor.write(b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\n\r\n")
+        return False
+    aceptacion = base64.b64encode(hashlib.sha1(clave.encode() + _GUID_WEBSOCKET).digest())
+    escritor.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\nConnection: Upgrade\r\n"
+                   b"Sec-WebSocket-Accept: " + aceptacion + b"\r\n\r\n")
+    return True
+
+
+async def escribir_cliente(cliente):
+    # Tarea escritora: vuelca la cola de golpe y espera a que el socket drene antes de seguir
+    escritor = cliente.escritor
+    while True:
+        await cliente.hay_datos.wait()
+        cliente.hay_datos.clear()
+        cola = cliente.cola
+        while cola: escritor.write(cola.popleft())
+        await escritor.drain()
+
+
+async def cerrar_cliente(cliente, tarea_escritura):
+    # Deja salir lo pendiente (p. ej. la trama de cierre) antes de cerrar
+    if cliente.cola:
+        try: await asyncio.wait_for(asyncio.shield(_vaciar(cliente)), 1.0)
+        except (asyncio.TimeoutError, ConnectionError): pass
+    tarea_escritura.cancel()
+    # Se espera a la tarea para que su error (si lo hubo) no quede sin recoger
+    try: await tarea_escritura
+    except (asyncio.CancelledError, ConnectionError): pass # Lo normal: cancelada o cliente desconectado
+    except Exception as e: print(f"Error escribiendo a un cliente: {e!r}")
+    cliente.escritor.close()
+
+
+async def _vaciar(cliente):
+    while cliente.cola: cliente.escritor.write(cliente.cola.popleft())
+    await cliente.escritor.drain()
+
+
+class ClienteRelay:
+    __slots__ = ("escritor", "sala", "cola", "hay_datos", "descartados")
+
+    def __init__(self, escritor):
+        self.escritor = escritor
+        self.sala = None
+        self.cola = deque()
+        self.hay_datos = asyncio.Event()
+        self.descartados = 0
+
+    def encolar(self, trama):
+        if len(self.cola) >= MAX_COLA_SALIDA_RELAY:
+            self.cola.popleft()
+            self.descartados += 1
+        self.cola.append(trama)
+        self.hay_datos.set()
+
+
+class ServidorRelay:
+    def __init__(self):
+        self.salas = {}
+        self.mensajes_entrada = 0
+        self.mensajes_salida = 0
+        self.descartados = 0
+        self.conexiones = 0
+
+    def estadisticas(self):
+        return {
+            "conexiones": self.conexiones,
+            "salas": len(self.salas),
+            "mensajes_entrada": self.mensajes_entrada,
+            "mensajes_salida": self.mensajes_salida,
+            "descartados": self.descartados + sum(c.descartados for sala in self.salas.values() for c in sala),
+        }
+
+    def _unir(self, cliente, sala):
+        self._salir(cliente)
+        cliente.sala = sala
+        self.salas.setdefault(sala, set()).add(cliente)
+
+    def _salir(self, cliente):
+        miembros = self.salas.get(cliente.sala)
+        if miembros is None: return
+        miembros.discard(cliente)
+        self.descartados += cliente.descartados
+        cliente.descartados = 0
+        if not miembros: del self.salas[cliente.sala]
+        cliente.sala = None
+
+    async def atender(self, lector, escritor):
+        aceptado = False
+        try:
+            aceptado = await handshake_websocket(lector, escritor)
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            # Handshake rechazado, basura o cortado a medias: el socket no se queda abierto
+            if not aceptado: escritor.close()
+        if not aceptado: return
+        cliente = ClienteRelay(escritor)
+        tarea_escritura = asyncio.ensure_future(escribir_cliente(cliente))
+        self.conexiones += 1
+        try:
+            while True:
+                opcode, datos = await leer_mensaje(lector)
+                if opcode == OPCODE_CIERRE:
+                    cliente.encolar(trama_websocket(OPCODE_CIERRE, datos[:2]))
+                    break
+                if opcode == OPCODE_PING:
+                    cliente.encolar(trama_websocket(OPCODE_PONG, datos))
+                    continue
+                if opcode not in (OPCODE_TEXTO, OPCODE_BINARIO): continue
+                self.mensajes_entrada += 1
+                # Solo se decodifica el JSON de lo que puede ser un 'join'; el resto se reenvía sin mirar
+                if opcode == OPCODE_TEXTO and b'"join"' in datos:
+                    try: mensaje = json.loads(datos)
+                    except ValueError: mensaje = None
+                    if isinstance(mensaje, dict) and mensaje.get("type") == "join":
+                        self._unir(cliente, str(mensaje.get("room")))
+                        continue
+                miembros = self.salas.get(cliente.sala)
+                if not miembros: continue
+                trama = trama_websocket(opcode, datos)
+                for otro in miembros:
+                    if otro is not cliente:
+                        otro.encolar(trama)
+                        self.mensajes_salida += 1
+        except MensajeDemasiadoGrande:
+            cliente.encolar(trama_cierre(CIERRE_MENSAJE_DEMASIADO_GRANDE))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._salir(cliente)
+            self.conexiones -= 1
+            await cerrar_cliente(cliente, tarea_escritura)
+
+
+async def servir(host, puerto, segundos_estadisticas=0, listo=None):
+    servidor_relay = ServidorRelay()
+    servidor = await asyncio.start_server(servidor_relay.atender, host, puerto, backlog=4096)
+    print(f"Relay escuchando en ws://{host}:{puerto}")
+    if listo is not None: listo(servidor_relay)
+    async with servidor:
+        if segundos_estadisticas > 0:
+            while True:
+                await asyncio.sleep(segundos_estadisticas)
+                print(f"Relay: {servidor_relay.estadisticas()}", flush=True)
+        else:
+            await servidor.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Relay WebSocket local para el modo online")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=PUERTO_RELAY_LOCAL)
+    parser.add_argument("--estadisticas", type=float, default=0, help="imprime contadores cada N segundos")
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(servir(args.host, args.puerto, args.estadisticas))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())